@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+back_annotate.py
+Copy footprint placement from a .kicad_pcb back into the pcb_position of each
+component in silixon_pcb.json.
+
+The board is streamed in chunks and cut at footprint starts; from each footprint
+only its reference, (at x y [rot]) and (layer ...) are taken out with a regex.
+Pads, graphics and everything else are never tokenized. Components are matched by
+uid through a dict index, and their pcb_position is updated in place:
+  x, y      board mm -> siliXon units (0.1 mm)
+  rotation  degrees, 0..360
+  layer     F.Cu -> "top", B.Cu -> "bottom"
+Other pcb_position keys (z, ...) are kept. The JSON is only rewritten when
+something moved.
+"""
+
+import argparse
+import json
+import os
+import re
+from typing import Iterator
+
+
+# silixon_pcb.json positions are in 0.1 mm
+UNITS_PER_MM = 10
+LAYER_SIDES = {"F.Cu": "top", "B.Cu": "bottom"}
+
+CHUNK_SIZE = 1 << 20
+
+# Footprints are top-level items: they start a line or follow the previous item's ")".
+# Their own (at ...), (layer ...) and reference come before their pads, so the first
+# match after the footprint start is the right one.
+FOOTPRINT_RE = re.compile(r'(?:^|(?<=\)))[ \t]*\(footprint[\s"]', re.MULTILINE)
+AT_RE = re.compile(r'\(at\s+(-?[\d.]+)\s+(-?[\d.]+)(?:\s+(-?[\d.]+))?')
+LAYER_RE = re.compile(r'\(layer\s+"?([^")\s]+)')
+REF_RE = re.compile(r'\(property\s+"Reference"\s+"((?:[^"\\]|\\.)*)"|\(fp_text\s+reference\s+"?([^"\s)]+)')
+
+
+def _units(mm: float) -> int | float:
+    value = round(mm * UNITS_PER_MM, 3)
+    return int(value) if value == int(value) else value
+
+
+def _placement(text: str) -> tuple[str, dict] | None:
+    ref = REF_RE.search(text)
+    at = AT_RE.search(text)
+    if ref is None or at is None:
+        return None
+    layer = LAYER_RE.search(text)
+    rot = float(at.group(3) or 0) % 360
+    return ref.group(1) or ref.group(2), {
+        "x": _units(float(at.group(1))),
+        "y": _units(float(at.group(2))),
+        "rotation": int(rot) if rot == int(rot) else rot,
+        "layer": LAYER_SIDES.get(layer.group(1), "top") if layer else "top",
+    }
+
+
+def iter_placements(pcb_path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[tuple[str, dict]]:
+    """
+    Yield (reference, {"x", "y", "rotation", "layer"}) for each footprint of a board.
+    Only the text from one footprint start to the next is held at a time.
+    """
+    with open(pcb_path, "r", encoding="utf-8") as f:
+        buf = ""
+        while True:
+            chunk = f.read(chunk_size)
+            buf += chunk
+            starts = [m.start() for m in FOOTPRINT_RE.finditer(buf)]
+            if not chunk:
+                ends = starts[1:] + [len(buf)]
+            elif not starts:
+                buf = buf[buf.rfind("\n") + 1:]   # a footprint line may start in the next chunk
+                continue
+            else:
+                ends = starts[1:]   # the last footprint may go on in the next chunk
+            for start, end in zip(starts, ends):
+                hit = _placement(buf[start:end])
+                if hit is not None:
+                    yield hit
+            if not chunk:
+                break
+            buf = buf[starts[-1]:]
+
+
+def back_annotate(design: dict, pcb_path: str) -> tuple[list[str], list[str], list[str]]:
+    """
+    Update design["components"][*]["pcb_position"] in place from the board.
+    Returns (refs that moved, board refs with no component, components not on the board).
+    """
+    by_uid = {c.get("uid"): c for c in design.get("components", [])}
+    moved, unknown, seen = [], [], set()
+    for ref, placement in iter_placements(pcb_path):
+        comp = by_uid.get(ref)
+        if comp is None:
+            unknown.append(ref)
+            continue
+        seen.add(ref)
+        position = comp.setdefault("pcb_position", {})
+        if any(position.get(key) != val for key, val in placement.items()):
+            position.update(placement)
+            moved.append(ref)
+    missing = [uid for uid in by_uid if uid not in seen]
+    return moved, unknown, missing
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Back-annotate footprint positions from a .kicad_pcb into silixon_pcb.json.")
+    ap.add_argument("-i", "--input", default="output.kicad_pcb", help="Board edited in pcbnew")
+    ap.add_argument("--pcb", default="silixon_pcb.json", help="siliXon design JSON to update")
+    ap.add_argument("-n", "--dry-run", action="store_true", help="Report changes without writing")
+    args = ap.parse_args()
+
+    with open(args.pcb, "r", encoding="utf-8") as f:
+        design = json.load(f)
+    moved, unknown, missing = back_annotate(design, args.input)
+
+    for ref in unknown:
+        print(f"{ref}: on the board but not in {args.pcb}")
+    for ref in missing:
+        print(f"{ref}: not placed on the board")
+    if moved and not args.dry_run:
+        tmp = f"{args.pcb}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(design, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, args.pcb)
+    action = "would update" if args.dry_run else "updated"
+    print(f"{len(moved)} components {action}: {', '.join(moved)}" if moved else "Positions already in sync")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+board_preview.py
+Render a quick-look preview of a generated .kicad_pcb to SVG or PNG for batch QA.
+
+Draws: Edge.Cuts outline, footprint boxes, pads (front / back), tracks, vias and the
+ratsnest of every net. Geometry is batched per style: all pads of one layer become a
+single SVG <path>, all tracks of one layer and width another, and so on, so the file
+has a handful of elements regardless of board size. The PNG writer is pure stdlib
+(zlib) and fills shapes a scanline span at a time.
+"""
+
+import argparse
+import math
+import struct
+import zlib
+from collections import defaultdict
+from pathlib import Path
+
+from kicad_board import board_bbox, load_board, outline_segments
+
+# ---------------------------- Configuration ---------------------------- #
+
+COLORS = {
+    "background": "#001023",
+    "outline": "#d0d2cd",
+    "footprint": "#8a8a8a",
+    "F.Cu": "#c83434",
+    "B.Cu": "#4d7fc4",
+    "via": "#c2c2c2",
+    "ratsnest": "#f0f0a0",
+}
+
+MARGIN = 2.0         # mm around the board bbox
+MST_MAX_PINS = 64    # larger nets get a sorted chain instead of an exact MST
+
+# ---------------------------- Geometry ---------------------------- #
+
+def pad_side(pad: dict) -> str:
+    layers = pad["layers"]
+    if any(l in ("*.Cu", "F&B.Cu") for l in layers) or ("F.Cu" in layers and "B.Cu" in layers):
+        return "both"
+    return "B.Cu" if "B.Cu" in layers else "F.Cu"
+
+
+def ratsnest(board: dict) -> list[tuple[float, float, float, float]]:
+    """Unrouted-looking airwires: a minimum spanning tree per net (chain for huge nets)."""
+    by_net: dict[int, list[tuple[float, float]]] = defaultdict(list)
+    for fp in board["footprints"]:
+        for pad in fp["pads"]:
+            if pad["net"]:
+                by_net[pad["net"]].append((pad["x"], pad["y"]))
+
+    lines = []
+    for pts in by_net.values():
+        n = len(pts)
+        if n < 2:
+            continue
+        if n > MST_MAX_PINS:
+            pts = sorted(pts)
+            lines.extend((*pts[i], *pts[i + 1]) for i in range(n - 1))
+            continue
+        # Prim's algorithm, O(n^2) on small nets
+        best = {i: (math.dist(pts[0], pts[i]), 0) for i in range(1, n)}
+        while best:
+            i = min(best, key=lambda k: best[k][0])
+            _, j = best.pop(i)
+            lines.append((*pts[j], *pts[i]))
+            for k, (d, _) in best.items():
+                dk = math.dist(pts[i], pts[k])
+                if dk < d:
+                    best[k] = (dk, i)
+    return lines
+
+
+def footprint_boxes(board: dict) -> list[tuple[float, float, float, float]]:
+    """Per footprint, the pad bounding box grown by 0.5 mm (a stand-in for the courtyard)."""
+    boxes = []
+    for fp in board["footprints"]:
+        if not fp["pads"]:
+            continue
+        xs = [p["x"] - p["w"] / 2 for p in fp["pads"]] + [p["x"] + p["w"] / 2 for p in fp["pads"]]
+        ys = [p["y"] - p["h"] / 2 for p in fp["pads"]] + [p["y"] + p["h"] / 2 for p in fp["pads"]]
+        boxes.append((min(xs) - 0.5, min(ys) - 0.5, max(xs) + 0.5, max(ys) + 0.5))
+    return boxes
+
+# ---------------------------- SVG ---------------------------- #
+
+def _f(v: float) -> str:
+    return f"{v:.3f}".rstrip("0").rstrip(".")
+
+
+def render_svg(board: dict, out_path: str) -> None:
+    x0, y0, x1, y1 = board_bbox(board)
+    x0, y0, x1, y1 = x0 - MARGIN, y0 - MARGIN, x1 + MARGIN, y1 + MARGIN
+    w, h = x1 - x0, y1 - y0
+
+    # One path per style
+    pads: dict[str, list[str]] = defaultdict(list)
+    for fp in board["footprints"]:
+        for p in fp["pads"]:
+            side = pad_side(p)
+            px, py, pw, ph = p["x"], p["y"], p["w"], p["h"]
+            if p["shape"] in ("circle", "oval") and abs(pw - ph) < 1e-9:
+                r = pw / 2
+                d = f"M{_f(px - r)} {_f(py)}a{_f(r)} {_f(r)} 0 1 0 {_f(2 * r)} 0a{_f(r)} {_f(r)} 0 1 0 {_f(-2 * r)} 0z"
+            else:
+                d = f"M{_f(px - pw / 2)} {_f(py - ph / 2)}h{_f(pw)}v{_f(ph)}h{_f(-pw)}z"
+            pads[side].append(d)
+
+    tracks: dict[tuple[str, float], list[str]] = defaultdict(list)
+    for s in board["segments"]:
+        tracks[(s["layer"], s["width"])].append(f"M{_f(s['x1'])} {_f(s['y1'])}L{_f(s['x2'])} {_f(s['y2'])}")
+
+    vias = [f"M{_f(v['x'] - v['size'] / 2)} {_f(v['y'])}a{_f(v['size'] / 2)} {_f(v['size'] / 2)} 0 1 0 {_f(v['size'])} 0"
+            f"a{_f(v['size'] / 2)} {_f(v['size'] / 2)} 0 1 0 {_f(-v['size'])} 0z" for v in board["vias"]]
+
+    outline = []
+    for item in board["outline"]:
+        outline.extend(f"M{_f(a)} {_f(b)}L{_f(c)} {_f(d)}" for a, b, c, d in outline_segments(item))
+
+    boxes = [f"M{_f(a)} {_f(b)}H{_f(c)}V{_f(d)}H{_f(a)}z" for a, b, c, d in footprint_boxes(board)]
+    airwires = [f"M{_f(a)} {_f(b)}L{_f(c)} {_f(d)}" for a, b, c, d in ratsnest(board)]
+
+    with open(out_path, "w", encoding="utf-8") as f:
+        f.write(f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="{_f(x0)} {_f(y0)} {_f(w)} {_f(h)}" '
+                f'width="{_f(w * 10)}" height="{_f(h * 10)}">\n')
+        f.write(f'<rect x="{_f(x0)}" y="{_f(y0)}" width="{_f(w)}" height="{_f(h)}" fill="{COLORS["background"]}"/>\n')
+        if outline:
+            f.write(f'<path d="{"".join(outline)}" fill="none" stroke="{COLORS["outline"]}" stroke-width="0.15"/>\n')
+        for layer in ("B.Cu", "F.Cu"):
+            for (tl, width), ds in tracks.items():
+                if tl == layer:
+                    f.write(f'<path d="{"".join(ds)}" fill="none" stroke="{COLORS[layer]}" '
+                            f'stroke-width="{_f(width)}" stroke-linecap="round" opacity="0.85"/>\n')
+            if pads.get(layer):
+                f.write(f'<path d="{"".join(pads[layer])}" fill="{COLORS[layer]}"/>\n')
+        if pads.get("both"):
+            f.write(f'<path d="{"".join(pads["both"])}" fill="#c8a034"/>\n')
+        if vias:
+            f.write(f'<path d="{"".join(vias)}" fill="{COLORS["via"]}"/>\n')
+        if boxes:
+            f.write(f'<path d="{"".join(boxes)}" fill="none" stroke="{COLORS["footprint"]}" stroke-width="0.1"/>\n')
+        if airwires:
+            f.write(f'<path d="{"".join(airwires)}" fill="none" stroke="{COLORS["ratsnest"]}" stroke-width="0.08"/>\n')
+        f.write("</svg>\n")
+
+# ---------------------------- PNG ---------------------------- #
+
+class Raster:
+    """RGB canvas in board millimetres; shapes are filled one row span at a time."""
+
+    def __init__(self, bbox: tuple[float, float, float, float], px_per_mm: float):
+        self.x0, self.y0 = bbox[0], bbox[1]
+        self.k = px_per_mm
+        self.w = max(1, int((bbox[2] - bbox[0]) * px_per_mm) + 1)
+        self.h = max(1, int((bbox[3] - bbox[1]) * px_per_mm) + 1)
+        self.rows = [bytearray(self.w * 3) for _ in range(self.h)]
+
+    @staticmethod
+    def rgb(color: str) -> bytes:
+        return bytes.fromhex(color.lstrip("#"))
+
+    def fill(self, color: str) -> None:
+        line = self.rgb(color) * self.w
+        for row in self.rows:
+            row[:] = line
+
+    def _span(self, y: int, xa: int, xb: int, c: bytes) -> None:
+        if 0 <= y < self.h:
+            xa, xb = max(xa, 0), min(xb, self.w - 1)
+            if xa <= xb:
+                self.rows[y][xa * 3:(xb + 1) * 3] = c * (xb - xa + 1)
+
+    def rect(self, x: float, y: float, w: float, h: float, color: str) -> None:
+        c = self.rgb(color)
+        xa, xb = int((x - self.x0) * self.k), int((x + w - self.x0) * self.k)
+        for py in range(int((y - self.y0) * self.k), int((y + h - self.y0) * self.k) + 1):
+            self._span(py, xa, xb, c)
+
+    def disc(self, cx: float, cy: float, r: float, color: str) -> None:
+        c = self.rgb(color)
+        pcx, pcy, pr = (cx - self.x0) * self.k, (cy - self.y0) * self.k, max(r * self.k, 0.5)
+        for py in range(int(pcy - pr), int(pcy + pr) + 1):
+            dy = py - pcy
+            if abs(dy) <= pr:
+                dx = math.sqrt(pr * pr - dy * dy)
+                self._span(py, int(pcx - dx), int(pcx + dx), c)
+
+    def line(self, x1: float, y1: float, x2: float, y2: float, width: float, color: str) -> None:
+        # One span per pixel row: the part of the (thickened) segment that falls in that row
+        c = self.rgb(color)
+        half = width * self.k / 2
+        ax, ay = (x1 - self.x0) * self.k, (y1 - self.y0) * self.k
+        bx, by = (x2 - self.x0) * self.k, (y2 - self.y0) * self.k
+        dy = by - ay
+        for py in range(int(min(ay, by) - half), int(max(ay, by) + half) + 1):
+            if abs(dy) < 1e-9:
+                t0, t1 = 0.0, 1.0
+            else:
+                t0, t1 = sorted(((py - half - 0.5 - ay) / dy, (py + half + 0.5 - ay) / dy))
+                t0, t1 = max(t0, 0.0), min(t1, 1.0)
+                if t0 > t1:
+                    continue
+            xa, xb = ax + (bx - ax) * t0, ax + (bx - ax) * t1
+            self._span(py, int(min(xa, xb) - half), int(max(xa, xb) + half), c)
+
+    def write_png(self, out_path: str) -> None:
+        raw = b"".join(b"\x00" + bytes(row) for row in self.rows)
+        def chunk(tag: bytes, data: bytes) -> bytes:
+            return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+        with open(out_path, "wb") as f:
+            f.write(b"\x89PNG\r\n\x1a\n")
+            f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", self.w, self.h, 8, 2, 0, 0, 0)))
+            f.write(chunk(b"IDAT", zlib.compress(raw, 6)))
+            f.write(chunk(b"IEND", b""))
+
+
+def render_png(board: dict, out_path: str, px_per_mm: float = 10.0) -> None:
+    x0, y0, x1, y1 = board_bbox(board)
+    r = Raster((x0 - MARGIN, y0 - MARGIN, x1 + MARGIN, y1 + MARGIN), px_per_mm)
+    r.fill(COLORS["background"])
+    for item in board["outline"]:
+        for a, b, c, d in outline_segments(item):
+            r.line(a, b, c, d, 0.15, COLORS["outline"])
+    for layer in ("B.Cu", "F.Cu"):
+        for s in board["segments"]:
+            if s["layer"] == layer:
+                r.line(s["x1"], s["y1"], s["x2"], s["y2"], s["width"], COLORS[layer])
+    for fp in board["footprints"]:
+        for p in fp["pads"]:
+            side = pad_side(p)
+            color = "#c8a034" if side == "both" else COLORS[side]
+            if p["shape"] == "circle":
+                r.disc(p["x"], p["y"], p["w"] / 2, color)
+            else:
+                r.rect(p["x"] - p["w"] / 2, p["y"] - p["h"] / 2, p["w"], p["h"], color)
+    for v in board["vias"]:
+        r.disc(v["x"], v["y"], v["size"] / 2, COLORS["via"])
+    for a, b, c, d in footprint_boxes(board):
+        for seg in ((a, b, c, b), (c, b, c, d), (c, d, a, d), (a, d, a, b)):
+            r.line(*seg, 0.0, COLORS["footprint"])
+    for seg in ratsnest(board):
+        r.line(*seg, 0.0, COLORS["ratsnest"])
+    r.write_png(out_path)
+
+# ---------------------------- Main ---------------------------- #
+
+def render(pcb_path: str, out_path: str, px_per_mm: float = 10.0) -> None:
+    """Render pcb_path to out_path; the format follows the extension (.svg or .png)."""
+    board = load_board(pcb_path)
+    if Path(out_path).suffix.lower() == ".png":
+        render_png(board, out_path, px_per_mm)
+    else:
+        render_svg(board, out_path)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Render a .kicad_pcb preview (SVG or PNG).")
+    ap.add_argument("-i", "--input", required=True, help="Input .kicad_pcb")
+    ap.add_argument("-o", "--output", required=True, help="Output .svg or .png")
+    ap.add_argument("--dpmm", type=float, default=10.0, help="PNG resolution in pixels per mm")
+    args = ap.parse_args()
+
+    render(args.input, args.output, args.dpmm)
+    print(f"Wrote preview to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
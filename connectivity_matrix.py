@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+connectivity_matrix.py
+Component x net incidence of a design as CSR arrays, saved as .npz or a directory
+of .npy files for numerical tools (clustering, net criticality, test coverage).
+
+Rows are components (silixon_pcb.json order), columns are nets (the .net file's
+order: net code = index + 1). Arrays, named as scipy.sparse.save_npz names them so
+scipy.sparse.load_npz reads the matrix directly:
+    indptr       int64 [n_components + 1]   row i is indices[indptr[i]:indptr[i + 1]]
+    indices      int32 [n_pins]             net index of each connected pin
+    data         int8  [n_pins]             1
+    pin          int32 [n_pins]             pin index within its component (symbol / JSON pin order)
+    pin_numbers  <U    [n_pins]             pin number as written in the .net file
+    shape        int64 [2], format b"csr"
+    components   <U    [n_components]       references
+    nets         <U    [n_nets]             net names
+Connectivity follows parse_nets exactly: both walk the netlist records with
+silixon_to_kicad.iter_nodes (symbol pin numbers, net aliases).
+
+The .npy files are written by hand (format 1.0, data 64-byte aligned), so exporting
+needs no NumPy. Written as a directory, each array can be memory-mapped:
+    np.load("connectivity/indices.npy", mmap_mode="r")
+and load_npy maps one without NumPy, as a memoryview.
+"""
+
+import argparse
+import ast
+import mmap
+import os
+import struct
+import sys
+import time
+import zipfile
+from array import array
+from itertools import accumulate, chain
+from typing import Iterable
+
+from silixon_json_stream import iter_components
+from silixon_to_kicad import iter_nodes, pin_tables, read_netlist_records
+from symbol_lib import load_symbol_index
+
+NPY_MAGIC = b"\x93NUMPY\x01\x00"
+NPY_ALIGN = 64
+# array typecode -> npy descr
+INT_DESCR = {"b": "|i1", "i": "<i4", "q": "<i8"}
+DESCR_TYPECODE = {"|i1": "b", "<i4": "i", "<i8": "q"}
+
+
+def incidence(components: Iterable[dict], records: list[str], symbols: dict | None = None) -> dict:
+    """CSR incidence (see module docstring) of components and netlist records already in memory."""
+    components = list(components)
+    tables = pin_tables(components, records, symbols)
+    refs = [c.get("uid") for c in components]
+    row_of = {ref: row for row, ref in enumerate(refs)}
+
+    net_index: dict[str, int] = {}
+    row_nets: list[list[int]] = [[] for _ in refs]
+    row_pins: list[list[str]] = [[] for _ in refs]
+    seen: set[tuple[int, int, str]] = set()
+
+    for ref, net, pin_num in iter_nodes(tables, records):
+        row = row_of[ref]
+        col = net_index.setdefault(net, len(net_index))
+        if (row, col, pin_num) not in seen:
+            seen.add((row, col, pin_num))
+            row_nets[row].append(col)
+            row_pins[row].append(pin_num)
+
+    pin_numbers = list(chain.from_iterable(row_pins))
+    pin = array("i")
+    for ref, nums in zip(refs, row_pins):
+        numbers = tables[ref][2]
+        if numbers is None:
+            # JSON pins (and netlist-appended ones) are numbered 1..N in order
+            pin.extend(int(n) - 1 for n in nums)
+        else:
+            position = {n: i for i, n in enumerate(numbers)}
+            pin.extend(position[n] for n in nums)
+
+    return {
+        "indptr": array("q", accumulate(map(len, row_nets), initial=0)),
+        "indices": array("i", chain.from_iterable(row_nets)),
+        "data": array("b", [1]) * len(pin_numbers),
+        "pin": pin,
+        "pin_numbers": pin_numbers,
+        "shape": array("q", [len(refs), len(net_index)]),
+        "format": b"csr",
+        "components": refs,
+        "nets": list(net_index),
+    }
+
+
+def incidence_matrix(json_path: str, netlist_path: str = "silixon_netlist.txt",
+                     symbols: dict | None = None) -> dict:
+    """incidence of the design files (the connectivity parse_nets writes)."""
+    return incidence(iter_components(json_path), read_netlist_records(netlist_path), symbols)
+
+
+# ---------------------------- .npy / .npz ---------------------------- #
+
+def _npy_header(descr: str, shape: tuple[int, ...]) -> bytes:
+    header = f"{{'descr': '{descr}', 'fortran_order': False, 'shape': {shape!r}, }}"
+    # Pad with spaces so the data starts on an NPY_ALIGN boundary; the header ends with \n
+    size = len(NPY_MAGIC) + 2 + len(header) + 1
+    header += " " * (-size % NPY_ALIGN) + "\n"
+    return NPY_MAGIC + struct.pack("<H", len(header)) + header.encode("latin1")
+
+
+def npy_parts(value) -> tuple[bytes, bytes]:
+    """(header, data) of one incidence value: an int array, a list of str or bytes."""
+    if isinstance(value, array):
+        if sys.byteorder == "big":
+            value = array(value.typecode, value)
+            value.byteswap()
+        return _npy_header(INT_DESCR[value.typecode], (len(value),)), value.tobytes()
+    if isinstance(value, bytes):
+        return _npy_header(f"|S{len(value)}", ()), value
+    width = max(map(len, value), default=0) or 1
+    data = "".join(s.ljust(width, "\0") for s in value).encode("utf-32-le")
+    return _npy_header(f"<U{width}", (len(value),)), data
+
+
+def save_npz(matrix: dict, path: str, compress: bool = False) -> None:
+    """All arrays in one .npz (np.load / scipy.sparse.load_npz)."""
+    tmp = f"{path}.tmp"
+    with zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED,
+                         allowZip64=True) as zf:
+        for name, value in matrix.items():
+            with zf.open(f"{name}.npy", "w", force_zip64=True) as f:
+                for part in npy_parts(value):
+                    f.write(part)
+    os.replace(tmp, path)
+
+
+def save_npy_dir(matrix: dict, out_dir: str) -> None:
+    """One <name>.npy per array in out_dir, each loadable with mmap_mode."""
+    os.makedirs(out_dir, exist_ok=True)
+    for name, value in matrix.items():
+        path = os.path.join(out_dir, f"{name}.npy")
+        with open(f"{path}.tmp", "wb") as f:
+            for part in npy_parts(value):
+                f.write(part)
+        os.replace(f"{path}.tmp", path)
+
+
+def load_npy(path: str) -> memoryview:
+    """Memory-map a 1-D integer .npy (as written here) without NumPy."""
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if mm[:6] != NPY_MAGIC[:6]:
+        raise ValueError(f"{path}: not a .npy file")
+    (hlen,) = struct.unpack_from("<H", mm, 8)
+    header = ast.literal_eval(mm[10:10 + hlen].decode("latin1"))
+    typecode = DESCR_TYPECODE.get(header["descr"])
+    if typecode is None or header["fortran_order"] or len(header["shape"]) != 1:
+        raise ValueError(f"{path}: {header['descr']} {header['shape']} is not a 1-D integer array")
+    if sys.byteorder == "big" and typecode != "b":
+        raise ValueError(f"{path}: little-endian data cannot be mapped on this machine")
+    return memoryview(mm)[10 + hlen:].cast(typecode)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Export the component x net incidence as CSR .npz / .npy arrays.")
+    ap.add_argument("--pcb", default="silixon_pcb.json", help="siliXon design JSON")
+    ap.add_argument("--netlist", default="silixon_netlist.txt", help="siliXon SPICE-like netlist")
+    ap.add_argument("-o", "--output", default="connectivity.npz",
+                    help="Output .npz, or a directory for one memory-mappable .npy per array")
+    ap.add_argument("--compress", action="store_true", help="Deflate the .npz members")
+    ap.add_argument("--no-symbols", action="store_true", help="Number pins from the JSON, not the symbol libraries")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    matrix = incidence_matrix(args.pcb, args.netlist, None if args.no_symbols else load_symbol_index())
+    if args.output.endswith(".npz"):
+        save_npz(matrix, args.output, args.compress)
+    else:
+        save_npy_dir(matrix, args.output)
+    rows, cols = matrix["shape"]
+    print(f"{rows} components x {cols} nets, {len(matrix['indices'])} pins -> {args.output} "
+          f"({time.perf_counter() - t0:.2f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,21 +8,35 @@ into a KiCad 5 "export (version D)" netlist suitable for Read Netlist/PCB flow.
 Assumptions:
 - Supports C*, R*, RLED discrete lines:   <REF> <NET1> <NET2> <VALUE>
 - Supports XU2 (HD44780) and XU1 (LPC2148) blocks with line continuations "\".
-- Treats "0", "GND", "gnd", "VGND" as the GND net.
+- Treats "0", "GND", "gnd", "VGND" as the GND net, and merges nets shorted by
+  zero-volt sources or net-tie parts (net_alias).
 - Leaves VCC (5V) and VDD (3.3V) as distinct nets (as in your text).
 - Produces minimal libparts for Device:C, Device:R, LCD_HD44780, and LPC2148.
-- Generates deterministic tstamp placeholders.
+- Derives each component's tstamp from its ref, so output is byte-stable and an
+  unchanged output file is not rewritten.
 
-Adjust the pin maps or footprints below if needed.
+U1 / U2 pin numbers come from their library symbols (symbol_lib) when indexed;
+the pin tables below are the fallback. Adjust them or the footprints if needed.
 """
 
 import argparse
-import datetime
 import re
+import warnings
 from collections import defaultdict, OrderedDict
 
+from kicad_sexpr import quote
+from net_alias import DEFAULT_ALIASES, NetAliases, build_aliases
+from spice_include import resolve_records
+from stable_output import build_date, stable_hex, write_if_changed
+from symbol_lib import load_symbol_index, lookup_pins, pin_numbers
+
 # ---------------------------- Configuration ---------------------------- #
 
+# Symbols the two subcircuits are resolved through (symbol_lib); the tables below
+# are only used when the library is not indexed (no symbols/ directory)
+LCD_SYMBOL = "LCD_HD44780:LCD_HD44780"
+MCU_SYMBOL = "MCU_NXP_ARM:LPC2148"
+
 # LCD (HD44780) pin name -> pin number
 LCD_PINS = OrderedDict([
     ("VSS", "1"), ("VDD", "2"), ("VO", "3"),
@@ -63,70 +77,41 @@ LIB_URIS = {
 
 # ---------------------------- Helpers ---------------------------- #
 
-def sanitize_net(n: str) -> str:
-    """Normalize ground and trim."""
+def sanitize_net(n: str, aliases: NetAliases | None = None) -> str:
+    """Trim and resolve aliases (ground names, shorted nets) to the canonical net name."""
     if n is None:
         return "~"
-    n = n.strip()
-    if n in ("0", "GND", "gnd", "VGND"):
-        return "GND"
-    return n
-
-def strip_inline_comment(s: str) -> str:
-    """Remove inline '; ...' comments."""
-    return s.split(";", 1)[0]
-
-def read_records(lines):
-    """
-    Collapse multi-line blocks using trailing '\' and drop '*' comment lines.
-    Returns a list of logical records (strings).
-    """
-    recs, buf = [], ""
-    for raw in lines:
-        line = strip_inline_comment(raw.rstrip("\n"))
-        if not line.strip():
-            continue
-        if line.lstrip().startswith("*"):
-            continue
-        # handle continuation by trailing backslash
-        if line.rstrip().endswith("\\"):
-            line = line.rstrip()
-            line = line[:-1].rstrip()  # drop trailing '\'
-            buf += (line + " ")
-            continue
-        else:
-            buf += line
-            if buf.strip():
-                recs.append(" ".join(buf.split()))  # compress whitespace
-            buf = ""
-    if buf.strip():
-        recs.append(" ".join(buf.split()))
-    return recs
-
-def tstamp_gen(start_hex=0x5F000001):
-    """Simple incremental hex tstamp generator (string)."""
-    n = start_hex
-    while True:
-        yield f"{n:08X}"
-        n += 1
+    return (aliases or DEFAULT_ALIASES).canonical(n)
+
+def symbol_pin_map(symbols: dict | None, part: str, fallback: dict) -> dict:
+    """Pin name or number -> number of part from the symbol index, else the fallback table."""
+    pins = lookup_pins(symbols, part)
+    return pin_numbers(pins) if pins else dict(fallback)
+
+def component_tstamp(ref: str) -> str:
+    """8-digit hex tstamp derived from the ref, so it does not move when parts are added."""
+    return stable_hex("comp", ref).upper()
 
 # ---------------------------- Core parse ---------------------------- #
 
 class NetlistBuilder:
-    def __init__(self):
+    def __init__(self, aliases: NetAliases | None = None, symbols: dict | None = None):
+        # net name resolution (build_aliases over the input records)
+        self.aliases = aliases or DEFAULT_ALIASES
+        # subcircuit pin name -> number, from the symbol libraries when indexed
+        self.lcd_pins = symbol_pin_map(symbols, LCD_SYMBOL, LCD_PINS)
+        self.mcu_pins = symbol_pin_map(symbols, MCU_SYMBOL, MCU_PINS)
         # components: ref -> dict(meta)
         self.components = OrderedDict()
         # nets: name -> list of (ref, pin)
         self.nets = defaultdict(list)
-        # tstamp generator
-        self._ts = tstamp_gen()
 
     def add_r(self, ref, n1, n2, value):
         self.components.setdefault(ref, {
             "value": value, "footprint": FOOT_R,
             "lib": "Device", "part": "R",
             "desc": "Resistor",
-            "tstamp": next(self._ts)
+            "tstamp": component_tstamp(ref)
         })
         self._add_conn(n1, ref, "1")
         self._add_conn(n2, ref, "2")
@@ -136,7 +121,7 @@ class NetlistBuilder:
             "value": value, "footprint": FOOT_C,
             "lib": "Device", "part": "C",
             "desc": "Unpolarized capacitor",
-            "tstamp": next(self._ts)
+            "tstamp": component_tstamp(ref)
         })
         self._add_conn(n1, ref, "1")
         self._add_conn(n2, ref, "2")
@@ -148,7 +133,7 @@ class NetlistBuilder:
                 "footprint": FOOT_LCD,
                 "lib": "LCD_HD44780", "part": "LCD_HD44780",
                 "desc": "Alphanumeric LCD w/HD44780 controller",
-                "tstamp": next(self._ts)
+                "tstamp": component_tstamp("U2")
             }
 
     def ensure_mcu(self):
@@ -158,27 +143,30 @@ class NetlistBuilder:
                 "footprint": FOOT_MCU,
                 "lib": "MCU_NXP_ARM", "part": "LPC2148",
                 "desc": "NXP LPC2148 ARM7 MCU",
-                "tstamp": next(self._ts)
+                "tstamp": component_tstamp("U1")
             }
 
     def add_lcd_map(self, mapping: dict):
         """mapping: pin-name -> net-name"""
         self.ensure_lcd()
-        for pin_name, pin_num in LCD_PINS.items():
-            if pin_name in mapping:
-                net = sanitize_net(mapping[pin_name])
-                self._add_conn(net, "U2", pin_num)
+        for pin_name, net in mapping.items():
+            if pin_name in self.lcd_pins:
+                self._add_conn(sanitize_net(net, self.aliases), "U2", self.lcd_pins[pin_name])
+            else:
+                warnings.warn(f"U2: no pin {pin_name} on {LCD_SYMBOL}")
 
     def add_mcu_map(self, mapping: dict):
         """mapping: pin-name (e.g., P0.14) -> net-name"""
         self.ensure_mcu()
         for k, v in mapping.items():
-            if k in MCU_PINS:
-                net = sanitize_net(v)
-                self._add_conn(net, "U1", MCU_PINS[k])
+            if k in self.mcu_pins:
+                net = sanitize_net(v, self.aliases)
+                self._add_conn(net, "U1", self.mcu_pins[k])
+            else:
+                warnings.warn(f"U1: no pin {k} on {MCU_SYMBOL}")
 
     def _add_conn(self, net, ref, pin):
-        net = sanitize_net(net)
+        net = sanitize_net(net, self.aliases)
         self.nets[net].append((ref, pin))
 
 # ---------------------------- SPICE-ish parsing ---------------------------- #
@@ -241,8 +229,9 @@ def handle_record(rec, nb: NetlistBuilder):
 
 def kicad_netlist(nb: NetlistBuilder, title="8-bit LCD ↔ LPC2148 Interface",
                   sch_name="LCD_LPC2148.sch", tool="Eeschema (5.x)"):
-    now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    today = datetime.date.today().isoformat()
+    stamp = build_date()
+    now = stamp.strftime("%Y-%m-%d %H:%M:%S")
+    today = stamp.date().isoformat()
 
     # Component -> net connections already built.
     # Build a stable net order (GND first, then VCC, VDD, VO, then alpha)
@@ -257,10 +246,10 @@ def kicad_netlist(nb: NetlistBuilder, title="8-bit LCD ↔ LPC2148 Interface",
     comp_lines = []
     for ref, c in nb.components.items():
         comp_lines.append(f"""    (comp (ref {ref})
-      (value {c['value']})
+      (value {quote(c['value'])})
       (footprint {c['footprint']})
       (datasheet ~)
-      (libsource (lib {c['lib']}) (part {c['part']}) (description "{c['desc']}"))
+      (libsource (lib {c['lib']}) (part {c['part']}) (description {quote(c['desc'])}))
       (sheetpath (names /) (tstamps /))
       (tstamp {c['tstamp']}))""")
 
@@ -369,22 +358,21 @@ def main():
     ap.add_argument("--sch", default="LCD_LPC2148.sch", help="Source schematic name shown in netlist")
     args = ap.parse_args()
 
-    with open(args.input, "r", encoding="utf-8") as f:
-        lines = f.readlines()
-
-    nb = NetlistBuilder()
-    for rec in read_records(lines):
-        handle_record(rec, nb)
+    # .include / .lib files are inlined and .param expressions substituted
+    records = resolve_records(args.input)
+    nb = NetlistBuilder(build_aliases(records), load_symbol_index())
+    for rec in records:
+        handle_record(" ".join(rec.split()), nb)
 
     # Ensure required ties exist if user provided minimal lines:
     # (not strictly needed if source already includes them)
     # e.g., If RW or K mapped to 0, they are already connected via add_lcd_map.
 
     text = kicad_netlist(nb, title=args.title, sch_name=args.sch)
-    with open(args.output, "w", encoding="utf-8") as f:
-        f.write(text)
-
-    print(f"Wrote KiCad netlist to: {args.output}")
+    if write_if_changed(args.output, text):
+        print(f"Wrote KiCad netlist to: {args.output}")
+    else:
+        print(f"KiCad netlist unchanged: {args.output}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+design_patch.py
+Apply siliXon chat suggestions (jsonSuggestion / fileSuggestions) to an in-memory
+design and regenerate only the parts of the KiCad netlist they touch.
+
+Suggestions come in two shapes:
+- a JSON Patch list (RFC 6902: add / remove / replace / move / copy / test)
+- a whole silixon_pcb.json document, which is first diffed into such a list
+
+DesignSession holds the document and a silixon_to_kicad.Design built from it. Applying
+a patch tells the Design which components and keys it touched; the Design drops just
+their cached fragments (plus every net they are or were on) and rebuilds them on render.
+"""
+
+import argparse
+import copy
+import json
+import time
+from pathlib import Path
+
+from silixon_bom import load_bom
+from silixon_to_kicad import Design, read_netlist_records
+from stable_output import write_if_changed
+from symbol_lib import load_symbol_index
+
+
+class PatchError(ValueError):
+    pass
+
+# ---------------------------- JSON Patch ---------------------------- #
+
+def split_pointer(path: str) -> list[str]:
+    """JSON Pointer ("/components/3/value") -> ["components", "3", "value"]."""
+    if path == "":
+        return []
+    if not path.startswith("/"):
+        raise PatchError(f"invalid JSON pointer: {path!r}")
+    return [t.replace("~1", "/").replace("~0", "~") for t in path[1:].split("/")]
+
+
+def _index(container: list, token: str, allow_end: bool = False) -> int:
+    if token == "-" and allow_end:
+        return len(container)
+    if not token.isdigit() or (token != "0" and token.startswith("0")):
+        raise PatchError(f"invalid array index: {token!r}")
+    idx = int(token)
+    if idx > len(container) or (idx == len(container) and not allow_end):
+        raise PatchError(f"array index out of range: {token}")
+    return idx
+
+
+def _parent(doc, tokens: list[str]):
+    node = doc
+    for tok in tokens[:-1]:
+        if isinstance(node, list):
+            node = node[_index(node, tok)]
+        elif isinstance(node, dict) and tok in node:
+            node = node[tok]
+        else:
+            raise PatchError(f"path not found: /{'/'.join(tokens)}")
+    return node
+
+
+def _get(doc, tokens: list[str]):
+    if not tokens:
+        return doc
+    parent, key = _parent(doc, tokens), tokens[-1]
+    if isinstance(parent, list):
+        return parent[_index(parent, key)]
+    if isinstance(parent, dict) and key in parent:
+        return parent[key]
+    raise PatchError(f"path not found: /{'/'.join(tokens)}")
+
+
+def _add(doc, tokens: list[str], value):
+    if not tokens:
+        return value
+    parent, key = _parent(doc, tokens), tokens[-1]
+    if isinstance(parent, list):
+        parent.insert(_index(parent, key, allow_end=True), value)
+    elif isinstance(parent, dict):
+        parent[key] = value
+    else:
+        raise PatchError(f"cannot add below a scalar: /{'/'.join(tokens)}")
+    return doc
+
+
+def _remove(doc, tokens: list[str]):
+    if not tokens:
+        raise PatchError("cannot remove the whole document")
+    parent, key = _parent(doc, tokens), tokens[-1]
+    if isinstance(parent, list):
+        return parent.pop(_index(parent, key))
+    if isinstance(parent, dict) and key in parent:
+        return parent.pop(key)
+    raise PatchError(f"path not found: /{'/'.join(tokens)}")
+
+
+def apply_op(doc, op: dict):
+    """Apply one RFC 6902 operation to doc in place; returns the (possibly new) root."""
+    kind = op.get("op")
+    tokens = split_pointer(op.get("path", ""))
+    if kind == "add":
+        return _add(doc, tokens, copy.deepcopy(op["value"]))
+    if kind == "remove":
+        _remove(doc, tokens)
+        return doc
+    if kind == "replace":
+        if not tokens:
+            return copy.deepcopy(op["value"])
+        _get(doc, tokens)  # must exist
+        parent = _parent(doc, tokens)
+        key = tokens[-1]
+        parent[_index(parent, key) if isinstance(parent, list) else key] = copy.deepcopy(op["value"])
+        return doc
+    if kind in ("move", "copy"):
+        src = split_pointer(op["from"])
+        if kind == "move":
+            if tokens[:len(src)] == src and tokens != src:
+                raise PatchError(f"cannot move {op['from']} into itself")
+            value = _remove(doc, src)
+        else:
+            value = copy.deepcopy(_get(doc, src))
+        return _add(doc, tokens, value)
+    if kind == "test":
+        if _get(doc, tokens) != op.get("value"):
+            raise PatchError(f"test failed at {op.get('path')}")
+        return doc
+    raise PatchError(f"unknown op: {kind!r}")
+
+
+def apply_patch(doc, ops: list[dict]):
+    """
+    Apply a JSON Patch list to doc in place and return the resulting root.
+    Operations run in order; on PatchError the ones before it stay applied.
+    """
+    for op in ops:
+        doc = apply_op(doc, op)
+    return doc
+
+
+def _escape(token: str) -> str:
+    return token.replace("~", "~0").replace("/", "~1")
+
+
+def diff_design(old: dict, new: dict) -> list[dict]:
+    """
+    JSON Patch that turns design old into new.
+    Components are matched by uid, so reordering becomes move ops and an edited part
+    only gets replace ops for the keys that changed. Other top-level keys are replaced whole.
+    """
+    ops: list[dict] = []
+    for key in old:
+        if key not in new:
+            ops.append({"op": "remove", "path": f"/{_escape(key)}"})
+    for key, value in new.items():
+        if key == "components" and isinstance(old.get(key), list) and isinstance(value, list):
+            ops += _diff_components(old[key], value)
+        elif key not in old:
+            ops.append({"op": "add", "path": f"/{_escape(key)}", "value": value})
+        elif old[key] != value:
+            ops.append({"op": "replace", "path": f"/{_escape(key)}", "value": value})
+    return ops
+
+
+def _diff_components(old: list[dict], new: list[dict]) -> list[dict]:
+    ops: list[dict] = []
+    new_uids = {c.get("uid") for c in new}
+    current = [c.get("uid") for c in old]
+    by_uid = {c.get("uid"): c for c in old}
+
+    # Drop parts that are gone, highest index first so indices stay valid
+    for i in range(len(current) - 1, -1, -1):
+        if current[i] not in new_uids:
+            ops.append({"op": "remove", "path": f"/components/{i}"})
+            del current[i]
+
+    for i, comp in enumerate(new):
+        uid = comp.get("uid")
+        if i < len(current) and current[i] == uid:
+            pass
+        elif uid in by_uid and uid in current[i:]:
+            j = current.index(uid, i)
+            ops.append({"op": "move", "from": f"/components/{j}", "path": f"/components/{i}"})
+            current.insert(i, current.pop(j))
+        else:
+            ops.append({"op": "add", "path": f"/components/{i}", "value": comp})
+            current.insert(i, uid)
+            continue
+        before = by_uid[uid]
+        for key in before:
+            if key not in comp:
+                ops.append({"op": "remove", "path": f"/components/{i}/{_escape(key)}"})
+        for key, value in comp.items():
+            if key not in before:
+                ops.append({"op": "add", "path": f"/components/{i}/{_escape(key)}", "value": value})
+            elif before[key] != value:
+                ops.append({"op": "replace", "path": f"/components/{i}/{_escape(key)}", "value": value})
+    return ops
+
+
+def iter_suggestions(chat_path: str):
+    """Yield every design suggestion in chat_history.json: a patch list or a whole document."""
+    with open(chat_path, "r", encoding="utf-8") as f:
+        history = json.load(f)
+    for msg in history:
+        suggestion = msg.get("jsonSuggestion")
+        if suggestion is None:
+            suggestion = (msg.get("fileSuggestions") or {}).get("silixon_pcb.json")
+        if suggestion is not None:
+            yield suggestion
+
+# ---------------------------- Incremental session ---------------------------- #
+
+class DesignSession:
+    """
+    In-memory design document driving a silixon_to_kicad.Design.
+    apply() / accept() patch the document and tell the Design which components (and
+    which of their keys) changed, so only their fragments and nets are rebuilt;
+    render() returns the full KiCad netlist text.
+    """
+
+    def __init__(self, json_path: str = "silixon_pcb.json", netlist_path: str = "silixon_netlist.txt",
+                 bom_path: str | None = None, design: dict | None = None, symbols: dict | None = None):
+        if design is None:
+            with open(json_path, "r", encoding="utf-8") as f:
+                design = json.load(f)
+        self.design = design
+        self.model = Design(list(self.components()), read_netlist_records(netlist_path),
+                            load_bom(bom_path) if bom_path else None, symbols)
+
+    def components(self) -> list[dict]:
+        return self.design.get("components", [])
+
+    def resync(self) -> None:
+        """Drop every cached fragment and rebuild them from the current design."""
+        self.model.set_components(list(self.components()))
+        self.model.invalidate()
+
+    def _touched(self, tokens: list[str]) -> tuple[dict, str] | None:
+        """(component, key) a pointer below one component's key lands in, if any."""
+        if len(tokens) < 3 or tokens[0] != "components":
+            return None
+        comps = self.components()
+        if not isinstance(comps, list) or not tokens[1].isdigit() or int(tokens[1]) >= len(comps):
+            return None
+        comp = comps[int(tokens[1])]
+        return (comp, tokens[2]) if isinstance(comp, dict) else None
+
+    def apply(self, ops: list[dict]) -> set[str]:
+        """Apply a JSON Patch to the design; returns the uids whose fragments were rebuilt."""
+        # Whole components that are added, removed or moved need no touch: added ones are
+        # new dicts and set_components() sorts out the list
+        touched: list[tuple[dict, str]] = []
+        full = False
+        try:
+            for op in ops:
+                pointers = [split_pointer(op.get("path", ""))]
+                if "from" in op:
+                    pointers.append(split_pointer(op["from"]))
+                if any(len(t) < 2 and (not t or t[0] == "components") for t in pointers):
+                    full = True  # whole document or whole component list replaced
+                if op.get("op") != "test":
+                    touched += filter(None, map(self._touched, pointers))
+                self.design = apply_op(self.design, op)
+        finally:
+            # Ops applied before a failing one stay applied, so their fragments are refreshed too
+            rebuilt = self._sync(touched, full)
+        return rebuilt
+
+    def _sync(self, touched: list[tuple[dict, str]], full: bool) -> set[str]:
+        """Hand the patched component list and the edited keys to the Design."""
+        comps = list(self.components())
+        if full:
+            self.model.set_components(comps)
+            self.model.invalidate()
+            return {c.get("uid") for c in comps}
+        before = {id(c) for c in self.model.comps}
+        self.model.set_components(comps)
+        changed: dict[int, set[str]] = {}
+        for comp, key in touched:
+            changed.setdefault(id(comp), set()).add(key)
+        for c in comps:
+            if id(c) in changed and id(c) in before:
+                self.model.touch(c, changed[id(c)])
+        return {c.get("uid") for c in comps if id(c) in changed or id(c) not in before}
+
+    def accept(self, suggestion) -> list[dict]:
+        """Apply a chat suggestion (patch list or whole document); returns the ops applied."""
+        ops = suggestion if isinstance(suggestion, list) else diff_design(self.design, suggestion)
+        self.apply(ops)
+        return ops
+
+    def render(self) -> str:
+        """Full KiCad netlist text for the current design."""
+        return self.model.render()
+
+    def save(self, json_path: str) -> None:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(self.design, f, indent=2, ensure_ascii=False)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Apply chat design suggestions and regenerate the KiCad netlist incrementally.")
+    ap.add_argument("--pcb", default="silixon_pcb.json", help="siliXon design JSON")
+    ap.add_argument("--netlist", default="silixon_netlist.txt", help="siliXon SPICE-like netlist")
+    ap.add_argument("--bom", default="silixon_bom.json", help="siliXon BOM JSON")
+    ap.add_argument("--chat", default="chat_history.json", help="Chat history holding the suggestions")
+    ap.add_argument("--patch", help="JSON Patch file (or whole design JSON) to apply instead of the chat suggestions")
+    ap.add_argument("-o", "--output", default="silixon_proj_to_kicad.net", help="Output KiCad netlist")
+    ap.add_argument("--save", action="store_true", help="Write the patched design back to --pcb")
+    args = ap.parse_args()
+
+    session = DesignSession(args.pcb, args.netlist, args.bom if Path(args.bom).is_file() else None,
+                            symbols=load_symbol_index())
+    session.render()
+
+    if args.patch:
+        with open(args.patch, "r", encoding="utf-8") as f:
+            suggestions = [json.load(f)]
+    else:
+        suggestions = list(iter_suggestions(args.chat))
+
+    text = None
+    for n, suggestion in enumerate(suggestions, start=1):
+        t0 = time.perf_counter()
+        ops = session.accept(suggestion)
+        text = session.render()
+        ms = (time.perf_counter() - t0) * 1000
+        print(f"suggestion {n}: {len(ops)} ops applied in {ms:.1f} ms")
+
+    if write_if_changed(args.output, text if text is not None else session.render()):
+        print(f"Wrote {args.output}")
+    else:
+        print(f"{args.output} unchanged")
+    if args.save:
+        session.save(args.pcb)
+        print(f"Updated {args.pcb}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+footprint_check.py
+Check that every component's pin count fits the footprint each tool assigns it,
+using the pad counts indexed from fp-info-cache (fp_index.py).
+
+Footprint sources compared per component:
+- netlist : silixon_to_kicad.component_footprint (the .net export)
+- pcb     : old2__netlist_to_kicad_pcb.pcb_footprints (the board writer; footprints it
+            draws itself are given as a pad count)
+- bom     : the BOM row's footprint column
+
+Pin count of a component = the largest of its JSON pins, its library symbol pins
+(symbol_lib, when indexed), the distinct pins the netlist connects and the highest
+numeric pin number used. Problems reported:
+- a footprint with fewer (unique) pads than the component has pins
+- sources whose footprints have different pad counts for the same component
+- footprints missing from fp-info-cache
+All components are gathered first and joined against the index in one pass.
+"""
+
+import argparse
+import json
+import sys
+
+from fp_index import FP_INFO_CACHE, load_fp_index, lookup
+from silixon_bom import index_bom, load_bom
+from silixon_json_stream import iter_components
+from silixon_to_kicad import component_footprint, parse_connectivity, symbol_pins
+from symbol_lib import load_symbol_index
+
+
+def component_pin_counts(json_path: str, netlist_path: str, symbols: dict | None = None) -> dict[str, int]:
+    """ref -> number of pins the component needs on its footprint."""
+    counts: dict[str, int] = {}
+    for c in iter_components(json_path):
+        sym = symbol_pins(c, symbols)
+        counts[c.get("uid")] = max(len(c.get("pins", [])), len(sym) if sym else 0)
+
+    used: dict[str, set[str]] = {}
+    _order, net_nodes = parse_connectivity(json_path, netlist_path, symbols)
+    for nodes in net_nodes.values():
+        for ref, pin in nodes:
+            used.setdefault(ref, set()).add(pin)
+    for ref, pins in used.items():
+        highest = max((int(p) for p in pins if p.isdigit()), default=0)
+        counts[ref] = max(counts.get(ref, 0), len(pins), highest)
+    return counts
+
+
+def design_footprints(json_path: str, bom_path: str | None = None) -> dict[str, dict[str, str | int]]:
+    """The netlist and BOM footprint sources: {source: {ref: footprint}}."""
+    sources: dict[str, dict[str, str | int]] = {"netlist": {}}
+    for c in iter_components(json_path):
+        sources["netlist"][c.get("uid")] = component_footprint(c)
+    if bom_path:
+        bom = {}
+        for ref, row in index_bom(load_bom(bom_path)).items():
+            # The siliXon export spells the column "footrpint_file"
+            fp = row.get("footprint_file") or row.get("footrpint_file")
+            if fp:
+                bom[ref] = fp
+        sources["bom"] = bom
+    return sources
+
+
+def check_footprints(pin_counts: dict[str, int], sources: dict[str, dict[str, str | int]],
+                     index: dict) -> list[tuple[str, str]]:
+    """
+    Join components against the footprint index; returns [(ref, problem), ...].
+    A source value is a "Lib:Footprint" name, or an int pad count for a footprint the
+    writer generates itself.
+    """
+    pads_of: dict[str, int | None] = {}
+    for assigned in sources.values():
+        for fp in assigned.values():
+            if isinstance(fp, str) and fp not in pads_of:
+                entry = lookup(index, fp)
+                pads_of[fp] = (entry["unique_pads"] or entry["pads"]) if entry else None
+
+    problems = []
+    for ref, pins in pin_counts.items():
+        seen = []
+        for source, assigned in sources.items():
+            fp = assigned.get(ref)
+            if fp is None or fp == "":
+                continue
+            pads = fp if isinstance(fp, int) else pads_of[fp]
+            label = f"{fp} pads" if isinstance(fp, int) else fp
+            if pads is None:
+                problems.append((ref, f"{source}: footprint {fp} is not in fp-info-cache"))
+                continue
+            if pins > pads:
+                problems.append((ref, f"{source}: {pins} pins do not fit {label} ({pads} pads)"))
+            seen.append((source, label, pads))
+        if len({pads for _s, _l, pads in seen}) > 1:
+            listed = ", ".join(f"{s} {l} ({p})" for s, l, p in seen)
+            problems.append((ref, f"footprints disagree on pad count: {listed}"))
+    return problems
+
+
+def check_design(json_path: str, netlist_path: str, bom_path: str | None = None,
+                 pcb: dict[str, str | int] | None = None, fp_cache: str = FP_INFO_CACHE) -> list[tuple[str, str]]:
+    """check_footprints for a siliXon design; pcb is the board writer's source, if any."""
+    counts = component_pin_counts(json_path, netlist_path, load_symbol_index())
+    sources = design_footprints(json_path, bom_path)
+    if pcb is not None:
+        sources["pcb"] = pcb
+    return check_footprints(counts, sources, load_fp_index(fp_cache))
+
+
+def main():
+    # The board writer runs check_design itself, so its footprint choices are imported here
+    from old2__netlist_to_kicad_pcb import pcb_footprints
+
+    ap = argparse.ArgumentParser(description="Check component pin counts against footprint pad counts.")
+    ap.add_argument("--pcb", default="silixon_pcb.json", help="siliXon design JSON")
+    ap.add_argument("--netlist", default="silixon_netlist.txt", help="siliXon SPICE-like netlist")
+    ap.add_argument("--bom", default="silixon_bom.json", help="siliXon BOM JSON")
+    ap.add_argument("--fp-cache", default=FP_INFO_CACHE, help="fp-info-cache path")
+    args = ap.parse_args()
+
+    with open(args.pcb, "r", encoding="utf-8") as f:
+        pcb = pcb_footprints(json.load(f).get("components", []))
+    problems = check_design(args.pcb, args.netlist, args.bom, pcb, args.fp_cache)
+    for ref, msg in problems:
+        print(f"{ref}: {msg}")
+    print(f"{len(pcb)} components checked, {len(problems)} problems")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
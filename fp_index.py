@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+fp_index.py
+Footprint index built from KiCad's fp-info-cache, kept in a JSON sidecar
+(fp-info-cache.index.json) so it is only rebuilt when the cache changes.
+
+fp-info-cache layout: the first line is KiCad's library hash, then one 7-line record
+per footprint:
+  library nickname, footprint name, description, keywords, order, pad count, unique pad count
+Records are grouped by library.
+
+On load the sidecar is used as-is when the cache's hash line, size and mtime all match
+what it recorded. Otherwise the cache is re-read, and only library sections whose
+content digest changed are re-parsed; the rest are taken from the sidecar.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from pathlib import Path
+
+FP_INFO_CACHE = "fp-info-cache"
+INDEX_VERSION = 1
+RECORD_LINES = 7
+
+
+def _index_path(cache_path: str) -> Path:
+    return Path(f"{cache_path}.index.json")
+
+
+def _source_state(cache_path: str) -> dict:
+    st = os.stat(cache_path)
+    with open(cache_path, "r", encoding="utf-8") as f:
+        lib_hash = f.readline().strip()
+    return {"hash": lib_hash, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def parse_section(lines: list[str]) -> dict[str, dict]:
+    """Footprint name -> {description, keywords, order, pads, unique_pads} for one library's records."""
+    footprints = {}
+    for i in range(0, len(lines), RECORD_LINES):
+        _lib, name, descr, tags, order, pads, unique_pads = lines[i:i + RECORD_LINES]
+        footprints[name] = {
+            "description": descr,
+            "keywords": tags.strip(),
+            "order": int(order) if order.isdigit() else 0,
+            "pads": int(pads) if pads.isdigit() else 0,
+            "unique_pads": int(unique_pads) if unique_pads.isdigit() else 0,
+        }
+    return footprints
+
+
+def iter_sections(cache_path: str):
+    """Yield (library, digest, record lines) for each library section of fp-info-cache."""
+    with open(cache_path, "r", encoding="utf-8") as f:
+        lines = f.read().split("\n")
+    if lines and lines[-1] == "":
+        lines.pop()
+    body = lines[1:]
+    if len(body) % RECORD_LINES:
+        raise ValueError(f"{cache_path}: truncated record ({len(body)} lines after the hash)")
+
+    sections: dict[str, list[str]] = {}
+    for i in range(0, len(body), RECORD_LINES):
+        sections.setdefault(body[i], []).extend(body[i:i + RECORD_LINES])
+    for lib, section in sections.items():
+        digest = hashlib.sha1("\n".join(section).encode("utf-8")).hexdigest()
+        yield lib, digest, section
+
+
+def build_index(cache_path: str, previous: dict | None = None) -> tuple[dict, int]:
+    """
+    Build the index, re-parsing only sections whose digest differs from previous.
+    Returns (index, number of libraries parsed).
+    """
+    old_libs = (previous or {}).get("libraries", {})
+    libraries = {}
+    parsed = 0
+    for lib, digest, section in iter_sections(cache_path):
+        old = old_libs.get(lib)
+        if old is not None and old["digest"] == digest:
+            libraries[lib] = old
+        else:
+            libraries[lib] = {"digest": digest, "footprints": parse_section(section)}
+            parsed += 1
+    return {"version": INDEX_VERSION, "source": _source_state(cache_path), "libraries": libraries}, parsed
+
+
+def load_fp_index(cache_path: str = FP_INFO_CACHE, rebuild: bool = False) -> dict:
+    """
+    Return the footprint index for cache_path, refreshing the sidecar when needed.
+    The returned dict carries "refreshed": number of library sections re-parsed (0 = up to date).
+    """
+    index_path = _index_path(cache_path)
+    previous = None
+    if index_path.is_file() and not rebuild:
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                previous = json.load(f)
+        except (OSError, ValueError):
+            previous = None
+        if previous is not None and previous.get("version") != INDEX_VERSION:
+            previous = None
+
+    if previous is not None and previous.get("source") == _source_state(cache_path):
+        previous["refreshed"] = 0
+        return previous
+
+    index, parsed = build_index(cache_path, previous)
+    tmp = index_path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, separators=(",", ":"), ensure_ascii=False)
+    os.replace(tmp, index_path)
+    index["refreshed"] = parsed
+    return index
+
+
+def lookup(index: dict, footprint: str) -> dict | None:
+    """Entry for "Library:Footprint" (or None if the library or footprint is unknown)."""
+    lib, _, name = footprint.partition(":")
+    section = index["libraries"].get(lib)
+    return section["footprints"].get(name) if section else None
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Build / refresh the footprint index from KiCad's fp-info-cache.")
+    ap.add_argument("-i", "--input", default=FP_INFO_CACHE, help="fp-info-cache path")
+    ap.add_argument("--rebuild", action="store_true", help="Ignore the sidecar and parse every library")
+    ap.add_argument("footprints", nargs="*", help="Optional Library:Footprint names to look up")
+    args = ap.parse_args()
+
+    index = load_fp_index(args.input, rebuild=args.rebuild)
+    total = sum(len(s["footprints"]) for s in index["libraries"].values())
+    state = f"re-parsed {index['refreshed']} libraries" if index["refreshed"] else "up to date"
+    print(f"{len(index['libraries'])} libraries, {total} footprints ({state})")
+    for fp in args.footprints:
+        entry = lookup(index, fp)
+        print(f"{fp}: {entry['pads']} pads" if entry else f"{fp}: not found")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+gerber_export.py
+Write RS-274X Gerbers and Excellon drill files straight from a generated .kicad_pcb,
+without opening pcbnew.
+
+Outputs per board (in <outdir>/<board-stem>/):
+- <stem>-F_Cu.gbr, <stem>-B_Cu.gbr      pads (flashed) and tracks (drawn)
+- <stem>-F_Mask.gbr, <stem>-B_Mask.gbr  pad openings grown by pad_to_mask_clearance
+- <stem>-Edge_Cuts.gbr                  board outline
+- <stem>-PTH.drl, <stem>-NPTH.drl       Excellon drills
+
+Each layer's aperture table is built once up front, then everything sharing an
+aperture (pad and via flashes, track draws) is written together, so the file selects
+each aperture exactly once. Rect, roundrect and oval pads keep their rotation: at
+quarter turns they use the standard R / O apertures, otherwise (and for the rounded
+corners of roundrects) an aperture macro of center lines and circles. Trapezoid and
+custom pads are still plotted as their w x h rectangle (trapezoid deltas and custom
+primitives are ignored). Lines are streamed to disk as they are produced.
+"""
+
+import argparse
+import math
+from collections import defaultdict
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from kicad_board import load_board
+
+# Gerber coordinate format 4.6 in mm: integer = mm * 1e6
+SCALE = 1_000_000
+
+COPPER_LAYERS = {
+    "F.Cu": ("Copper,L1,Top", "F_Cu"),
+    "B.Cu": ("Copper,L2,Bot", "B_Cu"),
+}
+MASK_LAYERS = {
+    "F.Mask": ("Soldermask,Top", "F_Mask"),
+    "B.Mask": ("Soldermask,Bot", "B_Mask"),
+}
+
+# ---------------------------- Helpers ---------------------------- #
+
+def _c(v: float) -> int:
+    return round(v * SCALE)
+
+
+def _xy(x: float, y: float) -> str:
+    # KiCad Y grows downwards, Gerber Y grows upwards
+    return f"X{_c(x)}Y{_c(-y)}"
+
+
+def pad_on_layer(pad: dict, layer: str) -> bool:
+    """True if the pad's (layers ...) covers layer; "*.Cu" / "F&B.Cu" mean both sides."""
+    kind = layer.split(".", 1)[1]
+    return any(pl in (layer, f"*.{kind}", f"F&B.{kind}") for pl in pad["layers"])
+
+
+def aperture_key(pad: dict, grow: float = 0.0) -> tuple:
+    """
+    Hashable aperture description, sizes in whole nm: ("C", d) / ("R", w, h) /
+    ("O", w, h), or ("M", w, h, r, angle) for a rectangle with corner radius r turned
+    by angle millidegrees CCW (rotated pads and roundrects).
+    """
+    w, h = pad["w"] + 2 * grow, pad["h"] + 2 * grow
+    shape = pad["shape"]
+    if shape == "circle" or (shape == "oval" and abs(w - h) < 1e-9):
+        return ("C", round(w * 1e6))
+    # w / h already include the nearest quarter turn; what is left is within +-45 degrees
+    turn = pad.get("rot", 0.0) - 90 * round(pad.get("rot", 0.0) / 90)
+    if shape == "oval":
+        r = min(w, h) / 2
+    elif shape == "roundrect":
+        r = pad.get("rratio", 0.25) * min(pad["w"], pad["h"]) + grow
+    else:
+        # rect; trapezoid and custom pads are plotted as their w x h rectangle
+        r = 0.0
+    if abs(turn) < 1e-9:
+        if shape == "oval":
+            return ("O", round(w * 1e6), round(h * 1e6))
+        if r <= 0:
+            return ("R", round(w * 1e6), round(h * 1e6))
+    return ("M", round(w * 1e6), round(h * 1e6), round(r * 1e6), round(turn * 1000))
+
+
+def _macro_lines(key: tuple) -> list[str]:
+    """Primitives of an "M" aperture: two crossed center lines plus a circle per corner."""
+    w, h, r, turn = key[1] / 1e6, key[2] / 1e6, min(key[3] / 1e6, key[1] / 2e6, key[2] / 2e6), key[4] / 1000
+    lines = []
+    for lw, lh in ((w, h - 2 * r), (w - 2 * r, h)):
+        if lw > 0 and lh > 0:
+            lines.append(f"21,1,{lw:.6f},{lh:.6f},0,0,{turn:g}*")
+        if r <= 0:
+            break
+    if r > 0:
+        c, s = math.cos(math.radians(turn)), math.sin(math.radians(turn))
+        # an oval's corner circles coincide in pairs
+        corners = dict.fromkeys((sx * (w / 2 - r), sy * (h / 2 - r)) for sx in (1, -1) for sy in (1, -1))
+        for x, y in corners:
+            lines.append(f"1,1,{2 * r:.6f},{x * c - y * s:.6f},{x * s + y * c:.6f}*")
+    return lines
+
+
+def aperture_def(dcode: int, key: tuple) -> str:
+    if key[0] == "C":
+        return f"%ADD{dcode}C,{key[1] / 1e6:.6f}*%"
+    if key[0] == "M":
+        return "\n".join([f"%AMPAD{dcode}*", *_macro_lines(key)]) + f"%\n%ADD{dcode}PAD{dcode}*%"
+    return f"%ADD{dcode}{key[0]},{key[1] / 1e6:.6f}X{key[2] / 1e6:.6f}*%"
+
+
+def header(function: str, polarity: str = "Positive") -> list[str]:
+    return [
+        "%TF.GenerationSoftware,siliXon,silixon_to_kicad,1.0*%",
+        f"%TF.FileFunction,{function}*%",
+        f"%TF.FilePolarity,{polarity}*%",
+        "%FSLAX46Y46*%",
+        "%MOMM*%",
+        "%LPD*%",
+        "G01*",
+    ]
+
+# ---------------------------- Layer writers ---------------------------- #
+
+def copper_or_mask_lines(board: dict, layer: str, function: str, grow: float = 0.0,
+                         tracks: bool = True) -> Iterator[str]:
+    """Yield the Gerber lines of one copper / mask layer."""
+    flashes: dict[tuple, list[tuple[float, float]]] = defaultdict(list)
+    for fp in board["footprints"]:
+        for pad in fp["pads"]:
+            if pad_on_layer(pad, layer) and pad["w"] > 0:
+                flashes[aperture_key(pad, grow)].append((pad["x"], pad["y"]))
+
+    draws: dict[tuple, list[dict]] = defaultdict(list)
+    if tracks:
+        for seg in board["segments"]:
+            if seg["layer"] == layer:
+                draws[("C", round(seg["width"] * 1e6))].append(seg)
+        for via in board["vias"]:
+            flashes[("C", round(via["size"] * 1e6))].append((via["x"], via["y"]))
+
+    # Batched aperture table: every distinct shape gets one D-code
+    dcodes: dict[tuple, int] = {}
+    for key in list(flashes) + [k for k in draws if k not in flashes]:
+        dcodes.setdefault(key, 10 + len(dcodes))
+
+    yield from header(function)
+    for key, dcode in dcodes.items():
+        yield aperture_def(dcode, key)
+    for key, dcode in dcodes.items():
+        yield f"D{dcode}*"
+        for x, y in flashes.get(key, ()):
+            yield f"{_xy(x, y)}D03*"
+        last = None
+        for s in draws.get(key, ()):
+            start = (s["x1"], s["y1"])
+            if start != last:
+                yield f"{_xy(*start)}D02*"
+            yield f"{_xy(s['x2'], s['y2'])}D01*"
+            last = (s["x2"], s["y2"])
+    yield "M02*"
+
+
+def outline_lines(board: dict) -> Iterator[str]:
+    widths = {round((item["width"] or 0.05) * 1e6) for item in board["outline"]} or {50_000}
+    dcodes = {w: 10 + i for i, w in enumerate(sorted(widths))}
+    yield from header("Profile,NP")
+    for w, dcode in dcodes.items():
+        yield aperture_def(dcode, ("C", w))
+    yield "G75*"
+    for item in board["outline"]:
+        yield f"D{dcodes[round((item['width'] or 0.05) * 1e6)]}*"
+        kind = item["kind"]
+        if kind == "line":
+            yield f"{_xy(item['x1'], item['y1'])}D02*"
+            yield f"{_xy(item['x2'], item['y2'])}D01*"
+        elif kind == "rect":
+            x1, y1, x2, y2 = item["x1"], item["y1"], item["x2"], item["y2"]
+            yield f"{_xy(x1, y1)}D02*"
+            for x, y in ((x2, y1), (x2, y2), (x1, y2), (x1, y1)):
+                yield f"{_xy(x, y)}D01*"
+        elif kind == "circle":
+            cx, cy, r = item["cx"], item["cy"], item["r"]
+            yield f"{_xy(cx + r, cy)}D02*"
+            yield f"G02*{_xy(cx + r, cy)}I{_c(-r)}J0D01*"
+            yield "G01*"
+        else:
+            # Negating Y keeps the picture, so on-screen clockwise stays G02
+            yield f"{_xy(item['x1'], item['y1'])}D02*"
+            i, j = item["cx"] - item["x1"], -(item["cy"] - item["y1"])
+            yield f"{'G02' if item['cw'] else 'G03'}*{_xy(item['x2'], item['y2'])}I{_c(i)}J{_c(j)}D01*"
+            yield "G01*"
+    yield "M02*"
+
+
+def drill_lines(board: dict, plated: bool) -> Iterator[str]:
+    """Excellon (METRIC, decimal coordinates) for plated or non-plated holes."""
+    holes: dict[float, list[tuple[float, float]]] = defaultdict(list)
+    for fp in board["footprints"]:
+        for pad in fp["pads"]:
+            if pad["drill"] > 0 and (pad["type"] != "np_thru_hole") == plated:
+                holes[round(pad["drill"], 3)].append((pad["x"], pad["y"]))
+    if plated:
+        for via in board["vias"]:
+            holes[round(via["drill"], 3)].append((via["x"], via["y"]))
+
+    tools = {d: i + 1 for i, d in enumerate(sorted(holes))}
+    yield "M48"
+    yield f"; DRILL file {'PTH' if plated else 'NPTH'} generated by silixon_to_kicad"
+    yield f"; #@! TF.FileFunction,{'Plated' if plated else 'NonPlated'},1,2,{'PTH' if plated else 'NPTH'}"
+    yield "FMAT,2"
+    yield "METRIC"
+    for d, t in tools.items():
+        yield f"T{t}C{d:.3f}"
+    yield "%"
+    yield "G90"
+    yield "G05"
+    for d, t in tools.items():
+        yield f"T{t}"
+        for x, y in holes[d]:
+            yield f"X{x:.4f}Y{-y:.4f}"
+    yield "M30"
+
+
+def _write(path: Path, lines: Iterable[str]) -> None:
+    with open(path, "w", encoding="ascii", newline="\n") as f:
+        for line in lines:
+            f.write(line)
+            f.write("\n")
+
+# ---------------------------- Main ---------------------------- #
+
+def export_fab(pcb_path: str, out_dir: str) -> list[Path]:
+    """Write the Gerber set and drill files for one board; returns the written paths."""
+    board = load_board(pcb_path)
+    stem = Path(pcb_path).stem
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    grow = board["setup"].get("pad_to_mask_clearance", 0.0)
+    written = []
+
+    for layer, (function, suffix) in COPPER_LAYERS.items():
+        path = out / f"{stem}-{suffix}.gbr"
+        _write(path, copper_or_mask_lines(board, layer, function))
+        written.append(path)
+    for layer, (function, suffix) in MASK_LAYERS.items():
+        path = out / f"{stem}-{suffix}.gbr"
+        _write(path, copper_or_mask_lines(board, layer, function, grow=grow, tracks=False))
+        written.append(path)
+
+    path = out / f"{stem}-Edge_Cuts.gbr"
+    _write(path, outline_lines(board))
+    written.append(path)
+    for plated, suffix in ((True, "PTH"), (False, "NPTH")):
+        path = out / f"{stem}-{suffix}.drl"
+        _write(path, drill_lines(board, plated))
+        written.append(path)
+    return written
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Export Gerber + Excellon fabrication files from .kicad_pcb boards.")
+    ap.add_argument("boards", nargs="+", help="Input .kicad_pcb files")
+    ap.add_argument("-o", "--outdir", default="gerbers", help="Output directory (one sub-folder per board)")
+    args = ap.parse_args()
+
+    for pcb in args.boards:
+        out_dir = Path(args.outdir) / Path(pcb).stem
+        files = export_fab(pcb, str(out_dir))
+        print(f"Wrote {len(files)} fab files to: {out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""flat board model (pads, tracks, vias, Edge.Cuts outline) read from a generated .kicad_pcb"""
+
+
+import math
+
+from kicad_sexpr import find, find_all, iter_top_level, parse
+
+
+def _xy(node: list | None, default=(0.0, 0.0)) -> tuple[float, ...]:
+    if node is None:
+        return default
+    return tuple(float(v) for v in node[1:] if _is_number(v))
+
+
+def _is_number(s) -> bool:
+    if not isinstance(s, str):
+        return False
+    try:
+        float(s)
+        return True
+    except ValueError:
+        return False
+
+
+def _width(node: list, default: float = 0.0) -> float:
+    """Line width, either (width w) or the KiCad 7+ (stroke (width w) ...)."""
+    w = find(node, "width")
+    if w is None:
+        stroke = find(node, "stroke")
+        w = find(stroke, "width") if stroke else None
+    return float(w[1]) if w else default
+
+
+def _layer(node: list) -> str:
+    layer = find(node, "layer")
+    return layer[1] if layer else ""
+
+
+def _net(node: list) -> int:
+    net = find(node, "net")
+    return int(net[1]) if net and len(net) > 1 and net[1].lstrip("-").isdigit() else 0
+
+
+def rotate(x: float, y: float, deg: float) -> tuple[float, float]:
+    """Rotate a footprint-local offset the way pcbnew does (Y down, positive = CCW on screen)."""
+    if not deg:
+        return x, y
+    rad = math.radians(deg)
+    c, s = math.cos(rad), math.sin(rad)
+    return x * c + y * s, -x * s + y * c
+
+
+def arc_center(x1, y1, xm, ym, x2, y2) -> tuple[float, float]:
+    """Center of the circle through start, mid and end of a KiCad arc."""
+    d = 2 * (x1 * (ym - y2) + xm * (y2 - y1) + x2 * (y1 - ym))
+    if abs(d) < 1e-12:
+        return (x1 + x2) / 2, (y1 + y2) / 2
+    s1, sm, s2 = x1 * x1 + y1 * y1, xm * xm + ym * ym, x2 * x2 + y2 * y2
+    cx = (s1 * (ym - y2) + sm * (y2 - y1) + s2 * (y1 - ym)) / d
+    cy = (s1 * (x2 - xm) + sm * (x1 - x2) + s2 * (xm - x1)) / d
+    return cx, cy
+
+
+def _pad(node: list, fx: float, fy: float, frot: float) -> dict:
+    # (pad "1" thru_hole circle (at x y [rot]) (size w h) (drill d) (layers ...) (net n "name"))
+    at = _xy(find(node, "at"))
+    px, py = at[0], at[1]
+    prot = at[2] if len(at) > 2 else frot
+    dx, dy = rotate(px, py, frot)
+    size = _xy(find(node, "size"), (0.0, 0.0))
+    w, h = size[0], size[1] if len(size) > 1 else size[0]
+    # w / h are the extents at the nearest quarter turn (quarter turns swap them);
+    # "rot" keeps the full angle for writers that can draw rotated pads
+    if round(prot / 90) % 2:
+        w, h = h, w
+    rratio = find(node, "roundrect_rratio")
+    drill_node = find(node, "drill")
+    drill = 0.0
+    if drill_node:
+        nums = [float(v) for v in drill_node[1:] if _is_number(v)]
+        drill = min(nums) if nums else 0.0
+    layers_node = find(node, "layers")
+    return {
+        "num": node[1],
+        "type": node[2],
+        "shape": node[3],
+        "x": fx + dx,
+        "y": fy + dy,
+        "w": w,
+        "h": h,
+        "rot": prot,
+        "rratio": float(rratio[1]) if rratio else 0.25,
+        "drill": drill,
+        "layers": list(layers_node[1:]) if layers_node else [],
+        "net": _net(node),
+    }
+
+
+def _footprint(node: list) -> dict:
+    at = _xy(find(node, "at"))
+    fx, fy = at[0], at[1]
+    frot = at[2] if len(at) > 2 else 0.0
+    ref = value = ""
+    for prop in find_all(node, "property"):
+        if prop[1] == "Reference":
+            ref = prop[2]
+        elif prop[1] == "Value":
+            value = prop[2]
+    for text in find_all(node, "fp_text"):  # KiCad 5/6 boards
+        if text[1] == "reference" and not ref:
+            ref = text[2]
+        elif text[1] == "value" and not value:
+            value = text[2]
+    return {
+        "ref": ref,
+        "value": value,
+        "lib": node[1] if len(node) > 1 and isinstance(node[1], str) else "",
+        "x": fx,
+        "y": fy,
+        "rot": frot,
+        "layer": _layer(node),
+        "pads": [_pad(p, fx, fy, frot) for p in find_all(node, "pad")],
+    }
+
+
+def _outline(node: list) -> dict | None:
+    head = node[0]
+    if head == "gr_line":
+        (x1, y1), (x2, y2) = _xy(find(node, "start"))[:2], _xy(find(node, "end"))[:2]
+        return {"kind": "line", "x1": x1, "y1": y1, "x2": x2, "y2": y2, "width": _width(node)}
+    if head == "gr_arc":
+        (x1, y1), (xm, ym), (x2, y2) = (_xy(find(node, k))[:2] for k in ("start", "mid", "end"))
+        cx, cy = arc_center(x1, y1, xm, ym, x2, y2)
+        # Positive cross product = clockwise on screen (Y down)
+        cw = (xm - x1) * (y2 - y1) - (ym - y1) * (x2 - x1) > 0
+        return {"kind": "arc", "x1": x1, "y1": y1, "x2": x2, "y2": y2, "xm": xm, "ym": ym,
+                "cx": cx, "cy": cy, "cw": cw, "width": _width(node)}
+    if head == "gr_circle":
+        (cx, cy), (ex, ey) = _xy(find(node, "center"))[:2], _xy(find(node, "end"))[:2]
+        return {"kind": "circle", "cx": cx, "cy": cy, "r": math.hypot(ex - cx, ey - cy), "width": _width(node)}
+    if head == "gr_rect":
+        (x1, y1), (x2, y2) = _xy(find(node, "start"))[:2], _xy(find(node, "end"))[:2]
+        return {"kind": "rect", "x1": x1, "y1": y1, "x2": x2, "y2": y2, "width": _width(node)}
+    return None
+
+
+def edge_cuts_item(raw: str) -> dict | None:
+    """Outline item of one top-level gr_* piece if it is on Edge.Cuts, else None."""
+    node = parse(raw)
+    return _outline(node) if _layer(node) == "Edge.Cuts" else None
+
+
+def outline_segments(item: dict) -> list[tuple[float, float, float, float]]:
+    """Edge.Cuts item as straight segments (arcs and circles flattened) for bbox / raster use."""
+    kind = item["kind"]
+    if kind == "line":
+        return [(item["x1"], item["y1"], item["x2"], item["y2"])]
+    if kind == "rect":
+        x1, y1, x2, y2 = item["x1"], item["y1"], item["x2"], item["y2"]
+        return [(x1, y1, x2, y1), (x2, y1, x2, y2), (x2, y2, x1, y2), (x1, y2, x1, y1)]
+    if kind == "circle":
+        cx, cy, r = item["cx"], item["cy"], item["r"]
+        a0, sweep = 0.0, 2 * math.pi
+    else:
+        cx, cy = item["cx"], item["cy"]
+        r = math.hypot(item["x1"] - cx, item["y1"] - cy)
+        a0 = math.atan2(item["y1"] - cy, item["x1"] - cx)
+        a1 = math.atan2(item["y2"] - cy, item["x2"] - cx)
+        sweep = (a1 - a0) % (2 * math.pi)
+        if not item["cw"]:  # counter-clockwise on screen = negative angle in Y-down coordinates
+            sweep -= 2 * math.pi
+    n = max(4, int(abs(sweep) / (math.pi / 16)))
+    pts = [(cx + r * math.cos(a0 + sweep * i / n), cy + r * math.sin(a0 + sweep * i / n)) for i in range(n + 1)]
+    return [(*pts[i], *pts[i + 1]) for i in range(n)]
+
+
+def load_board(pcb_path: str) -> dict:
+    """
+    Read a .kicad_pcb into plain dicts:
+      nets:       {code: name}
+      footprints: [{ref, value, lib, x, y, rot, layer, pads: [{num, type, shape, x, y, w, h, rot, rratio, drill, layers, net}]}]
+      segments:   [{x1, y1, x2, y2, width, layer, net}]
+      vias:       [{x, y, size, drill, net}]
+      outline:    Edge.Cuts items [{kind: line|arc|circle|rect, ...}]
+      setup:      {pad_to_mask_clearance}
+    Pad coordinates are absolute board coordinates (mm, Y down).
+    The file is read one top-level item at a time.
+    """
+    board = {"nets": {}, "footprints": [], "segments": [], "vias": [], "outline": [], "setup": {}}
+    for head, raw in iter_top_level(pcb_path):
+        if head not in ("net", "footprint", "module", "segment", "via", "setup",
+                        "gr_line", "gr_arc", "gr_circle", "gr_rect"):
+            continue
+        node = parse(raw)
+        if head == "net":
+            board["nets"][int(node[1])] = node[2] if len(node) > 2 else ""
+        elif head in ("footprint", "module"):
+            board["footprints"].append(_footprint(node))
+        elif head == "segment":
+            (x1, y1), (x2, y2) = _xy(find(node, "start"))[:2], _xy(find(node, "end"))[:2]
+            board["segments"].append({"x1": x1, "y1": y1, "x2": x2, "y2": y2, "width": _width(node, 0.25),
+                                      "layer": _layer(node), "net": _net(node)})
+        elif head == "via":
+            at = _xy(find(node, "at"))
+            board["vias"].append({"x": at[0], "y": at[1], "size": float(find(node, "size")[1]),
+                                  "drill": float(find(node, "drill")[1]), "net": _net(node)})
+        elif head == "setup":
+            clearance = find(node, "pad_to_mask_clearance")
+            board["setup"]["pad_to_mask_clearance"] = float(clearance[1]) if clearance else 0.0
+        elif _layer(node) == "Edge.Cuts":
+            item = _outline(node)
+            if item:
+                board["outline"].append(item)
+    return board
+
+
+def board_bbox(board: dict) -> tuple[float, float, float, float]:
+    """(xmin, ymin, xmax, ymax) of the outline, or of the pads when there is no outline."""
+    xs: list[float] = []
+    ys: list[float] = []
+    for item in board["outline"]:
+        for x1, y1, x2, y2 in outline_segments(item):
+            xs += (x1, x2)
+            ys += (y1, y2)
+    if not xs:
+        for fp in board["footprints"]:
+            for pad in fp["pads"]:
+                xs.append(pad["x"])
+                ys.append(pad["y"])
+    if not xs:
+        return 0.0, 0.0, 0.0, 0.0
+    return min(xs), min(ys), max(xs), max(ys)
@@ -0,0 +1,120 @@
+"""minimal reader for KiCad S-expression files (.net, .kicad_pcb, .kicad_sym)"""
+
+
+import re
+from typing import Iterator
+
+
+# One token: "(" , ")" , a quoted string or a bare atom
+TOKEN_RE = re.compile(r'[()]|"(?:[^"\\]|\\.)*"|[^\s()"]+')
+SCAN_RE = re.compile(r'"(?:[^"\\]|\\.)*("?)|[()]')
+HEAD_RE = re.compile(r'\(\s*([^\s()"]+)')
+
+ESCAPE_RE = re.compile(r"\\(.)", re.DOTALL)
+
+CHUNK_SIZE = 1 << 20
+
+
+def unescape(s: str) -> str:
+    return ESCAPE_RE.sub(r"\1", s)
+
+
+def escape(s: str) -> str:
+    """Inverse of unescape: backslashes and double quotes escaped for a quoted string."""
+    return s.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def quote(s: str) -> str:
+    """s as a quoted S-expression string."""
+    return f'"{escape(s)}"'
+
+
+def parse(text: str) -> list:
+    """
+    Parse one S-expression into nested lists of strings.
+    (pad "1" smd rect (at 0 0)) -> ["pad", "1", "smd", "rect", ["at", "0", "0"]]
+    """
+    stack: list[list] = [[]]
+    top = stack[0]
+    for tok in TOKEN_RE.findall(text):
+        if tok == "(":
+            top = []
+            stack.append(top)
+        elif tok == ")":
+            node = stack.pop()
+            top = stack[-1]
+            top.append(node)
+        elif tok[0] == '"':
+            top.append(unescape(tok[1:-1]) if "\\" in tok else tok[1:-1])
+        else:
+            top.append(tok)
+    if len(stack) != 1 or not stack[0]:
+        raise ValueError("unbalanced S-expression")
+    return stack[0][0]
+
+
+def find(node: list, head: str) -> list | None:
+    """Return the first direct child list whose head is head."""
+    for child in node:
+        if isinstance(child, list) and child and child[0] == head:
+            return child
+    return None
+
+
+def find_all(node: list, head: str) -> Iterator[list]:
+    for child in node:
+        if isinstance(child, list) and child and child[0] == head:
+            yield child
+
+
+def iter_top_level(path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[tuple[str, str]]:
+    """
+    Stream a file as (head, raw) pieces split at top-level S-expression boundaries.
+    Each child of the root is yielded with its head (e.g. "footprint", "net") and its
+    raw text including the whitespace before it. The root opening and the closing
+    tail are yielded with head "". Concatenating every raw piece gives back the file
+    byte for byte; only the current piece is held in memory.
+    """
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        yield from iter_stream(f, chunk_size)
+
+
+def iter_stream(f, chunk_size: int = CHUNK_SIZE) -> Iterator[tuple[str, str]]:
+    """iter_top_level over an open text stream (e.g. a zip member wrapped in TextIOWrapper)."""
+    buf = ""
+    pos = 0          # scan position in buf
+    piece_start = 0  # start of the piece being accumulated
+    depth = 0
+    eof = False
+    while True:
+        m = SCAN_RE.search(buf, pos)
+        if m is None or (m.group(0)[0] == '"' and not m.group(1)):
+            # Need more text: nothing structural left, or a string runs past the window
+            if eof:
+                break
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+                continue
+            if m is None:
+                pos = len(buf)
+            buf = buf[piece_start:] + chunk
+            pos -= piece_start
+            piece_start = 0
+            continue
+        ch = m.group(0)
+        pos = m.end()
+        if ch == "(":
+            depth += 1
+            if depth == 1:
+                yield "", buf[piece_start:pos]
+                piece_start = pos
+        elif ch == ")":
+            depth -= 1
+            if depth == 1:
+                raw = buf[piece_start:pos]
+                head = HEAD_RE.search(raw)
+                yield (head.group(1) if head else ""), raw
+                piece_start = pos
+    if piece_start < len(buf):
+        yield "", buf[piece_start:]
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+net_alias.py
+Net alias resolution shared by the netlist front ends (silixon_to_kicad,
+convert_to_kicad, old1 / old2).
+
+Nets that are electrically one are merged in a union-find:
+- configured aliases (NET_ALIASES: "0", "gnd", "VGND" are all GND)
+- zero-volt sources, which short their two nodes (VGND 0 0 DC 0V, VSHORT A B 0);
+  a source with an AC or transient spec (V1 IN 0 DC 0 AC 1, V2 A B 0 SIN(0 1 1k))
+  drives a signal and is left alone
+- net-tie parts (NT1 A B NetTie_2, or XNT1 1=A 2=B NetTie_2.subckt)
+
+Each merged net is named once: its configured canonical name if it has one, else
+the name seen first. Building the aliases is one pass over the records, and every
+lookup afterwards is near constant time (union by size, path halving).
+"""
+
+import argparse
+import re
+from typing import Iterable
+
+from spice_include import resolve_records
+
+# canonical name -> names that mean the same net
+NET_ALIASES: dict[str, tuple[str, ...]] = {
+    "GND": ("0", "gnd", "VGND"),
+}
+
+# SPICE number with an optional scale / unit suffix: 0, 0V, 0.0, 0mV, 1e-3
+VALUE_RE = re.compile(r"^([+-]?(?:\d+\.?\d*|\.\d+)(?:e[+-]?\d+)?)[a-z]*$", re.IGNORECASE)
+NET_TIE_REF_RE = re.compile(r"^X?NT\d", re.IGNORECASE)
+# Source specs beyond the DC value: AC analysis or transient waveforms
+SIGNAL_SPEC_RE = re.compile(r"^(?:AC|PULSE|SIN|PWL|EXP|SFFM|AM|TRNOISE|TRRANDOM)(?![a-z])", re.IGNORECASE)
+
+
+class NetAliases:
+    """Union-find over net names with one canonical name per merged net."""
+
+    def __init__(self, aliases: dict[str, Iterable[str]] | None = None):
+        self._parent: dict[str, str] = {}
+        self._size: dict[str, int] = {}
+        self._order: dict[str, int] = {}
+        self._name: dict[str, str] = {}     # root -> canonical name of its set
+        self._configured: set[str] = set()
+        for canonical, names in (NET_ALIASES if aliases is None else aliases).items():
+            self._configured.add(canonical)
+            self.add(canonical)
+            for name in names:
+                self.union(canonical, name)
+
+    def add(self, name: str) -> str:
+        if name not in self._parent:
+            self._parent[name] = name
+            self._size[name] = 1
+            self._order[name] = len(self._order)
+            self._name[name] = name
+        return name
+
+    def find(self, name: str) -> str:
+        """Root of name's set (name itself if it was never added)."""
+        parent = self._parent
+        if name not in parent:
+            return name
+        while parent[name] != name:
+            parent[name] = parent[parent[name]]
+            name = parent[name]
+        return name
+
+    def _rank(self, name: str) -> tuple[bool, int]:
+        return name not in self._configured, self._order[name]
+
+    def union(self, a: str, b: str) -> str:
+        """Merge the nets of a and b; returns the root of the merged set."""
+        ra, rb = self.find(self.add(a)), self.find(self.add(b))
+        if ra == rb:
+            return ra
+        if self._size[ra] < self._size[rb]:
+            ra, rb = rb, ra
+        self._parent[rb] = ra
+        self._size[ra] += self._size.pop(rb)
+        name_a, name_b = self._name[ra], self._name.pop(rb)
+        self._name[ra] = min(name_a, name_b, key=self._rank)
+        return ra
+
+    def canonical(self, name: str) -> str:
+        """Name of the merged net name belongs to (unknown names are their own net)."""
+        name = name.strip()
+        root = self.find(name)
+        return self._name.get(root, name)
+
+    def groups(self) -> dict[str, list[str]]:
+        """canonical name -> every name merged into it, for sets of more than one name."""
+        members: dict[str, list[str]] = {}
+        for name in self._parent:
+            members.setdefault(self.find(name), []).append(name)
+        return {self._name[root]: names for root, names in members.items() if len(names) > 1}
+
+
+def is_zero(token: str) -> bool:
+    m = VALUE_RE.match(token)
+    return m is not None and float(m.group(1)) == 0
+
+
+def record_shorts(line: str) -> list[str]:
+    """
+    Nets one netlist record ties together: a zero-volt source with no AC or transient
+    spec, or a net-tie part ([] otherwise).
+    """
+    toks = line.split()
+    if len(toks) < 3:
+        return []
+    head = toks[0]
+    if head[0] in "Vv" and len(toks) >= 4:
+        values = [t for t in toks[3:] if t.upper() != "DC"]
+        if not values or not is_zero(values[0]) or any(SIGNAL_SPEC_RE.match(t) for t in values[1:]):
+            return []
+        return toks[1:3]
+    if NET_TIE_REF_RE.match(head) or toks[-1].lower().startswith("nettie"):
+        assigned = [t.split("=", 1)[1] for t in toks[1:] if "=" in t]
+        return assigned if assigned else toks[1:-1]
+    return []
+
+
+def build_aliases(records: Iterable[str], aliases: dict[str, Iterable[str]] | None = None) -> NetAliases:
+    """NetAliases for a netlist's logical records (configured aliases + shorts in the records)."""
+    nets = NetAliases(aliases)
+    for line in records:
+        shorted = record_shorts(line)
+        for other in shorted[1:]:
+            nets.union(shorted[0], other)
+    return nets
+
+
+DEFAULT_ALIASES = NetAliases()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Show which nets of a SPICE-like netlist are merged.")
+    ap.add_argument("-i", "--input", default="silixon_netlist.txt", help="siliXon SPICE-like netlist")
+    args = ap.parse_args()
+
+    groups = build_aliases(resolve_records(args.input)).groups()
+    for canonical, names in groups.items():
+        print(f"{canonical}: {' '.join(n for n in names if n != canonical)}")
+    print(f"{len(groups)} merged nets")
+
+
+if __name__ == "__main__":
+    main()
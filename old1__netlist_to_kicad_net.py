@@ -2,6 +2,8 @@ import sys
 import re
 from collections import defaultdict
 
+from net_alias import build_aliases
+
 # Default footprints for common components
 FOOTPRINTS = {
     'C': 'Capacitor_THT:C_Disc_D5.0mm_W2.5mm_P2.50mm',
@@ -52,7 +54,10 @@ def parse_netlist(filename):
     net_to_nodes = defaultdict(list)  # net_name -> list of (ref, pin)
     pin_maps = {}  # ref -> {pin: net}
     with open(filename) as f:
-        for line in f:
+        lines = f.readlines()
+        # Power sources are not parts, but zero-volt ones still merge the nets they short
+        aliases = build_aliases(line for line in lines if not line.startswith('*'))
+        for line in lines:
             line = line.strip()
             if not line or line.startswith('*') or line.startswith('.END'):
                 continue
@@ -67,6 +72,7 @@ def parse_netlist(filename):
                 pin_map = {}
                 for pair in pin_net_pairs:
                     pin, net = pair.split('=')
+                    net = aliases.canonical(net)
                     pin_map[pin] = net
                     net_to_nodes[net].append((ref, pin))
                 components[ref] = {
@@ -77,8 +83,8 @@ def parse_netlist(filename):
                 pin_maps[ref] = pin_map
             # Simple 2-pin component: R1 VCC 0 10k
             elif len(tokens) >= 4:
-                conn1 = tokens[1]
-                conn2 = tokens[2]
+                conn1 = aliases.canonical(tokens[1])
+                conn2 = aliases.canonical(tokens[2])
                 value = ' '.join(tokens[3:])
                 pin_map = {'1': conn1, '2': conn2}
                 net_to_nodes[conn1].append((ref, '1'))
@@ -1,6 +1,12 @@
 import json
 import re
 
+from footprint_check import check_design
+from kicad_sexpr import quote
+from sexpr_validate import validate
+from silixon_to_kicad import parse_connectivity
+from stable_output import write_if_changed
+
 # File paths
 NETLIST_FILE = 'silixon_netlist.txt'
 BOM_FILE = 'silixon_bom.json'
@@ -163,40 +169,6 @@ DIP28_FOOTPRINT = '''  (footprint "Package_DIP:DIP-28_W7.62mm"
     (model "${{KISYS3DMOD}}/Package_DIP.3dshapes/DIP-28_W7.62mm.wrl" (offset (xyz 0 0 0)) (scale (xyz 1 1 1)) (rotate (xyz 0 0 0)))
   )\n'''
 
-# Load BOM and PCB JSON
-with open(BOM_FILE) as f:
-    bom = {c['reference']: c for c in json.load(f)}
-with open(PCB_JSON_FILE) as f:
-    pcb_json = json.load(f)
-    board = pcb_json.get('board', {})
-    board_width = board.get('width', 80)
-    board_height = board.get('height', 36)
-
-# Parse netlist
-components = []
-nets = set()
-with open(NETLIST_FILE) as f:
-    lines = f.readlines()
-    for line in lines:
-        line = line.strip()
-        if not line or line.startswith('*') or line == '.END':
-            continue
-        m = re.match(r'([A-Z0-9]+)\s+(.+)', line)
-        if m:
-            ref = m.group(1)
-            rest = m.group(2)
-            if ref in bom:
-                comps = rest.split()
-                nets.update(comps[:-1])
-                components.append(ref)
-        elif line.startswith('X'):
-            ref = line.split()[0]
-            if ref in bom:
-                components.append(ref)
-
-# Assign net numbers
-net_map = {n: i+1 for i, n in enumerate(sorted(nets))}
-
 # KiCad PCB header (full, from example.kicad_pcb)
 kicad_header = '''(kicad_pcb
 	(version 20241229)
@@ -277,63 +249,164 @@ kicad_header = '''(kicad_pcb
 	)
 '''
 
-# Write nets
-net_section = '  (net 0 "")\n'
-for net, num in net_map.items():
-    net_section += f'  (net {num} "{net}")\n'
-
-# Centering and spacing
-center_x = board_width / 2
-center_y = board_height / 2
-spacing_x = 10
-spacing_y = 10
-start_x = center_x - (spacing_x * (len(components)-1) / 2)
-start_y = center_y
-
-# Write footprints with generic drawing
-footprint_section = ''
-for idx, ref in enumerate(components):
-    bom_entry = bom.get(ref, {})
-    value = bom_entry.get('value', '')
-    ctype = bom_entry.get('type', '').lower()
-    # Pick generic footprint
-    fp = GENERIC_FOOTPRINTS.get(ctype, GENERIC_FOOTPRINTS['default'])
-    x = start_x + idx * spacing_x
-    y = start_y
-    if ctype == 'resistor':
-        footprint_section += RESISTOR_FOOTPRINT.format(x=x, y=y, rot=90, ref=ref, value=value)
-    elif ctype == 'capacitor':
-        footprint_section += CAPACITOR_FOOTPRINT.format(x=x, y=y, rot=0, ref=ref, value=value)
-    elif ctype == 'mcu':
-        footprint_section += DIP28_FOOTPRINT.format(x=x, y=y, rot=0, ref=ref, value=value)
-    else:
-        # Default: single test point
-        footprint_section += (
-            f'  (footprint "{fp["name"]}"\n'
-            f'    (layer "F.Cu")\n'
-            f'    (at {x:.2f} {y:.2f} 0)\n'
-            f'    (property "Reference" "{ref}" (at 0 2 0) (layer "F.SilkS"))\n'
-            f'    (property "Value" "{value}" (at 0 -2 0) (layer "F.Fab"))\n'
-            f'    (pad "1" thru_hole circle (at 0 0) (size {fp["pad_size"]} {fp["pad_size"]}) (drill {fp["drill"]}) (layers "F.Cu" "B.Cu" "F.Mask"))\n'
-            f'  )\n'
+# Close file
+kicad_footer = ')\n'
+
+# Footprint template placed for each component type; other types get fallback_footprint
+TEMPLATE_FOOTPRINTS = {
+    'resistor': RESISTOR_FOOTPRINT,
+    'capacitor': CAPACITOR_FOOTPRINT,
+    'mcu': DIP28_FOOTPRINT,
+}
+FOOTPRINT_NAME_RE = re.compile(r'\(footprint "([^"]+)"')
+
+
+def pcb_footprints(components):
+    """ref -> footprint name placed for each component, or the pad count of a fallback footprint."""
+    footprints = {}
+    for c in components:
+        template = TEMPLATE_FOOTPRINTS.get(c.get('type', '').lower())
+        if template:
+            footprints[c.get('uid')] = FOOTPRINT_NAME_RE.search(template).group(1)
+        else:
+            footprints[c.get('uid')] = len(c.get('pins') or ['1'])
+    return footprints
+
+
+# Pad lines as written by the templates above: (pad "N" ... (layers ...))
+PAD_LINE_RE = re.compile(r'^(\s*\(pad "([^"]*)" .*)\)$', re.MULTILINE)
+
+
+def build_pad_net_index(net_order, net_nodes):
+    """
+    Precompute (ref, pad number) -> (net code, net name) from the parsed netlist,
+    so binding a pad is a single dict lookup.
+    """
+    index = {}
+    for code, net in enumerate(net_order, start=1):
+        for ref, pin in net_nodes[net]:
+            index[(ref, pin)] = (code, net)
+    return index
+
+
+def bind_pad_nets(footprint, ref, pad_nets):
+    """Append (net N "name") to every pad of a rendered footprint that has a connection."""
+    def add_net(m):
+        hit = pad_nets.get((ref, m.group(2)))
+        if hit is None:
+            return m.group(0)
+        return f'{m.group(1)} (net {hit[0]} {quote(hit[1])}))'
+    return PAD_LINE_RE.sub(add_net, footprint)
+
+
+def fallback_footprint(fp, ref, value, x, y, pins):
+    """Generic footprint: one test-point pad per pin, in a row at pad_distance pitch."""
+    pitch = fp.get('pad_distance', 2.54)
+    text = (
+        f'  (footprint "{fp["name"]}"\n'
+        f'    (layer "F.Cu")\n'
+        f'    (at {x:.2f} {y:.2f} 0)\n'
+        f'    (property "Reference" "{ref}" (at 0 2 0) (layer "F.SilkS"))\n'
+        f'    (property "Value" "{value}" (at 0 -2 0) (layer "F.Fab"))\n'
+    )
+    for i, _ in enumerate(pins or ['1']):
+        text += (
+            f'    (pad "{i + 1}" thru_hole circle (at {i * pitch:.2f} 0) (size {fp["pad_size"]} {fp["pad_size"]})'
+            f' (drill {fp["drill"]}) (layers "F.Cu" "B.Cu" "F.Mask"))\n'
         )
+    return text + '  )\n'
 
-# Add minimal board outline (Edge.Cuts)
-outline_section = (
-    f'  (gr_line (start 0 0) (end {board_width} 0) (layer "Edge.Cuts") (width 0.05))\n'
-    f'  (gr_line (start {board_width} 0) (end {board_width} {board_height}) (layer "Edge.Cuts") (width 0.05))\n'
-    f'  (gr_line (start {board_width} {board_height}) (end 0 {board_height}) (layer "Edge.Cuts") (width 0.05))\n'
-    f'  (gr_line (start 0 {board_height}) (end 0 0) (layer "Edge.Cuts") (width 0.05))\n'
-)
 
-# Close file
-kicad_footer = ')\n'
+def load_inputs(netlist_file=NETLIST_FILE, bom_file=BOM_FILE, pcb_json_file=PCB_JSON_FILE):
+    """(BOM rows by reference, design JSON, net_order, net_nodes) the board is built from."""
+    with open(bom_file) as f:
+        bom = {c['reference']: c for c in json.load(f)}
+    with open(pcb_json_file) as f:
+        pcb_json = json.load(f)
+    # Parse netlist (pin numbers follow the JSON pin order, as in the .net export)
+    net_order, net_nodes = parse_connectivity(pcb_json_file, netlist_file)
+    return bom, pcb_json, net_order, net_nodes
+
+
+def net_table(net_order):
+    """The board's (net N "name") declarations, net 0 first."""
+    net_section = '  (net 0 "")\n'
+    for code, net in enumerate(net_order, start=1):
+        net_section += f'  (net {code} {quote(net)})\n'
+    return net_section
+
+
+def footprint_section(bom, pcb_json, net_order, net_nodes):
+    """Every BOM component's footprint in a row across the board, pads bound to their nets."""
+    board = pcb_json.get('board', {})
+    board_width = board.get('width', 80)
+    board_height = board.get('height', 36)
+    pad_nets = build_pad_net_index(net_order, net_nodes)
+    pins_by_ref = {c.get('uid'): c.get('pins', []) for c in pcb_json.get('components', [])}
+    types_by_ref = {c.get('uid'): c.get('type', '') for c in pcb_json.get('components', [])}
+    components = [ref for ref in pins_by_ref if ref in bom]
+
+    # Centering and spacing
+    center_x = board_width / 2
+    center_y = board_height / 2
+    spacing_x = 10
+    start_x = center_x - (spacing_x * (len(components)-1) / 2)
+    start_y = center_y
 
-with open(OUTPUT_FILE, 'w') as f:
-    f.write(kicad_header)
-    f.write(net_section)
-    f.write(footprint_section)
-    f.write(outline_section)
-    f.write(kicad_footer)
+    # Write footprints with generic drawing
+    footprint_section = ''
+    for idx, ref in enumerate(components):
+        bom_entry = bom.get(ref, {})
+        value = bom_entry.get('value', '')
+        # silixon_bom.json has no type column; fall back to the design JSON
+        ctype = (bom_entry.get('type') or types_by_ref.get(ref, '')).lower()
+        # Pick generic footprint
+        fp = GENERIC_FOOTPRINTS.get(ctype, GENERIC_FOOTPRINTS['default'])
+        x = start_x + idx * spacing_x
+        y = start_y
+        if ctype == 'resistor':
+            text = RESISTOR_FOOTPRINT.format(x=x, y=y, rot=90, ref=ref, value=value)
+        elif ctype == 'capacitor':
+            text = CAPACITOR_FOOTPRINT.format(x=x, y=y, rot=0, ref=ref, value=value)
+        elif ctype == 'mcu':
+            text = DIP28_FOOTPRINT.format(x=x, y=y, rot=0, ref=ref, value=value)
+        else:
+            # Default: test points, one per pin
+            text = fallback_footprint(fp, ref, value, x, y, pins_by_ref.get(ref))
+        footprint_section += bind_pad_nets(text, ref, pad_nets)
+    return footprint_section
 
-print(f"Wrote {OUTPUT_FILE}") 
\ No newline at end of file
+
+def outline_section(pcb_json):
+    """Minimal board outline (Edge.Cuts)."""
+    board = pcb_json.get('board', {})
+    board_width = board.get('width', 80)
+    board_height = board.get('height', 36)
+    return (
+        f'  (gr_line (start 0 0) (end {board_width} 0) (layer "Edge.Cuts") (width 0.05))\n'
+        f'  (gr_line (start {board_width} 0) (end {board_width} {board_height}) (layer "Edge.Cuts") (width 0.05))\n'
+        f'  (gr_line (start {board_width} {board_height}) (end 0 {board_height}) (layer "Edge.Cuts") (width 0.05))\n'
+        f'  (gr_line (start 0 {board_height}) (end 0 0) (layer "Edge.Cuts") (width 0.05))\n'
+    )
+
+
+def build_pcb(netlist_file=NETLIST_FILE, bom_file=BOM_FILE, pcb_json_file=PCB_JSON_FILE):
+    """Return the .kicad_pcb text with every footprint pad bound to its net."""
+    bom, pcb_json, net_order, net_nodes = load_inputs(netlist_file, bom_file, pcb_json_file)
+    return (kicad_header + net_table(net_order) + footprint_section(bom, pcb_json, net_order, net_nodes)
+            + outline_section(pcb_json) + kicad_footer)
+
+
+if __name__ == '__main__':
+    # Flag pin / pad count mismatches before the board is written
+    with open(PCB_JSON_FILE) as f:
+        design_components = json.load(f).get('components', [])
+    for ref, problem in check_design(PCB_JSON_FILE, NETLIST_FILE, BOM_FILE, pcb_footprints(design_components)):
+        print(f"Footprint check: {ref}: {problem}")
+
+    if write_if_changed(OUTPUT_FILE, build_pcb()):
+        print(f"Wrote {OUTPUT_FILE}")
+    else:
+        print(f"{OUTPUT_FILE} unchanged")
+    for line, msg in validate(OUTPUT_FILE):
+        print(f"  {OUTPUT_FILE}:{line}: {msg}")
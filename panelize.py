@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+panelize.py
+Step a generated .kicad_pcb into an N x M fab panel: copies of the board separated
+by milled gaps, rails along the top and bottom, mouse-bite tabs holding the boards
+to each other and to the rails, and three fiducials on the rails.
+
+Each copy is the board translated, with:
+- references renamed per copy (REF_FORMAT: R1 -> R1_3 on board 3)
+- nets renamed and renumbered per copy (NET_FORMAT: GND -> Board_3-GND), so the
+  copies are not ratsnested to each other
+- uuids made unique per copy
+
+The board is read once into a template: its text cut at every coordinate, net,
+reference and uuid, with the coordinates kept in flat x and y lists. Footprint
+contents are relative to the footprint, so only a footprint's own (at ...) moves.
+The x list is shifted and formatted once per panel column and the y list once per
+row; a copy is then the template joined with its column's xs, its row's ys and its
+names, gathered in one itemgetter call. Copies are written out as they are made.
+
+A rectangular outline is redrawn per copy with gaps where the tabs join. Any other
+outline is copied as-is and the boards get no tabs, only the frame and fiducials.
+"""
+
+import argparse
+import re
+import time
+from itertools import chain
+from operator import itemgetter
+from typing import Iterator
+
+from kicad_board import edge_cuts_item, outline_segments
+from kicad_sexpr import iter_top_level, quote, unescape
+
+GAP = 2.0               # milled gap between boards and to the rails (router bit)
+RAIL = 5.0              # rail height
+TABS_PER_EDGE = 2
+TAB_WIDTH = 3.0
+BITE_DRILL = 0.5
+BITE_PITCH = 0.75
+BITE_OFFSET = 0.25      # mouse-bite holes sit this far inside the board edge
+FIDUCIAL_INSET = 5.0
+EDGE_WIDTH = 0.05
+
+REF_FORMAT = "{ref}_{board}"
+NET_FORMAT = "Board_{board}-{name}"
+
+# Top-level items repeated on every copy; everything else (setup, layers, ...) is written once
+BOARD_ITEMS = {"footprint", "module", "segment", "arc", "via", "zone", "group", "dimension", "target",
+               "image", "gr_line", "gr_arc", "gr_circle", "gr_rect", "gr_poly", "gr_curve", "gr_text",
+               "gr_text_box"}
+OUTLINE_ITEMS = {"gr_line", "gr_arc", "gr_circle", "gr_rect", "gr_poly"}
+
+NUM = r"(-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)"
+XY_RE = re.compile(rf"\((?:start|end|mid|center|at|xy)\s+{NUM}\s+{NUM}")
+AT_RE = re.compile(rf"\(at\s+{NUM}\s+{NUM}")
+NET_RE = re.compile(r'\(net\s+(\d+)(?:\s+"((?:[^"\\]|\\.)*)")?\)|\(net_name\s+"((?:[^"\\]|\\.)*)"\)')
+NET_DECL_RE = re.compile(r'\(net\s+(\d+)\s+"((?:[^"\\]|\\.)*)"')
+UUID_RE = re.compile(r'\((?:uuid|tstamp)\s+"?([0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12})')
+REF_RE = re.compile(r'\(property\s+"Reference"\s+"((?:[^"\\]|\\.)*)"|\(fp_text\s+reference\s+"?([^"\s)]+)')
+
+SLOT_KINDS = ("x", "y", "net", "ref", "uuid")
+
+
+def _fmt(v: float) -> str:
+    s = f"{v:.6f}".rstrip("0").rstrip(".")
+    return "0" if s == "-0" else s
+
+
+class BoardTemplate:
+    """Board items as static text pieces around slots that are filled in per copy."""
+
+    def __init__(self):
+        self.static: list[str] = []
+        self.slots: list[tuple[str, int]] = []
+        self.values: dict[str, list] = {kind: [] for kind in SLOT_KINDS}
+        self._nets: dict[tuple, int] = {}
+        self._tail: list[str] = []
+        self._getter = None
+
+    def _slot(self, kind: str, value) -> None:
+        values = self.values[kind]
+        if kind == "net":   # (code, name, form) repeats a lot; keep each variant once
+            idx = self._nets.get(value)
+            if idx is None:
+                idx = self._nets[value] = len(values)
+                values.append(value)
+        else:
+            idx = len(values)
+            values.append(value)
+        self.static.append("".join(self._tail))
+        self._tail = []
+        self.slots.append((kind, idx))
+
+    def add(self, raw: str, footprint: bool) -> None:
+        """Cut one top-level item into the template."""
+        spans = []
+        if footprint:
+            at = AT_RE.search(raw)
+            if at:
+                spans += [(at.start(1), at.end(1), "x", float(at.group(1))),
+                          (at.start(2), at.end(2), "y", float(at.group(2)))]
+            ref = REF_RE.search(raw)
+            if ref:
+                g = 1 if ref.group(1) is not None else 2
+                spans.append((ref.start(g), ref.end(g), "ref", ref.group(g)))
+        else:
+            for m in XY_RE.finditer(raw):
+                spans += [(m.start(1), m.end(1), "x", float(m.group(1))),
+                          (m.start(2), m.end(2), "y", float(m.group(2)))]
+        for m in NET_RE.finditer(raw):
+            if m.group(3) is not None:
+                value = (0, unescape(m.group(3)), "name")
+            elif m.group(2) is not None:
+                value = (int(m.group(1)), unescape(m.group(2)), "pair")
+            else:
+                value = (int(m.group(1)), None, "code")
+            spans.append((m.start(), m.end(), "net", value))
+        for m in UUID_RE.finditer(raw):
+            spans.append((m.start(1), m.end(1), "uuid", m.group(1)))
+
+        pos = 0
+        for start, end, kind, value in sorted(spans, key=lambda s: s[0]):
+            self._tail.append(raw[pos:start])
+            self._slot(kind, value)
+            pos = end
+        self._tail.append(raw[pos:])
+
+    def finish(self) -> None:
+        self.static.append("".join(self._tail))
+        self._tail = []
+        offsets, total = {}, 0
+        for kind in SLOT_KINDS:
+            offsets[kind] = total
+            total += len(self.values[kind])
+        positions = [offsets[kind] + idx for kind, idx in self.slots]
+        self._getter = itemgetter(*positions) if positions else None
+
+    def shifted(self, axis: str, delta: float) -> list[str]:
+        """All x (or y) slot values moved by delta, formatted."""
+        return [_fmt(v + delta) for v in self.values[axis]]
+
+    def render(self, xs: list[str], ys: list[str], nets: list[str], refs: list[str], uuids: list[str]) -> str:
+        if self._getter is None:
+            return self.static[0]
+        vals = self._getter(xs + ys + nets + refs + uuids)
+        if len(self.slots) == 1:
+            vals = (vals,)
+        return "".join(chain.from_iterable(zip(self.static, vals))) + self.static[-1]
+
+
+def _rectangle(items: list[dict]) -> tuple[float, float, float, float] | None:
+    """bbox of the outline if it is an axis-aligned rectangle drawn with lines / a rect."""
+    segments = [seg for item in items for seg in outline_segments(item)]
+    if not segments or any(item["kind"] not in ("line", "rect") for item in items):
+        return None
+    xs = [v for seg in segments for v in (seg[0], seg[2])]
+    ys = [v for seg in segments for v in (seg[1], seg[3])]
+    bbox = min(xs), min(ys), max(xs), max(ys)
+    eps = 1e-6
+    for x1, y1, x2, y2 in segments:
+        on_x = abs(x1 - x2) < eps and (abs(x1 - bbox[0]) < eps or abs(x1 - bbox[2]) < eps)
+        on_y = abs(y1 - y2) < eps and (abs(y1 - bbox[1]) < eps or abs(y1 - bbox[3]) < eps)
+        if not (on_x or on_y):
+            return None
+    return bbox
+
+
+def load_board(pcb_path: str) -> dict:
+    """
+    Read a board for panelizing:
+      head / tail: items written once, before / after the copies
+      nets:        [(code, name)] declared nets
+      template:    BoardTemplate of the items repeated per copy
+      bbox:        outline bbox; rectangular: True if the outline was left out of
+                   the template to be redrawn with tabs
+      indent:      leading whitespace of the board's top-level items
+    """
+    head: list[str] = []
+    tail: list[str] = []
+    nets: list[tuple[int, str]] = []
+    outline: list[tuple[str, dict]] = []
+    template = BoardTemplate()
+    indent = None
+    started = False
+    for kind, raw in iter_top_level(pcb_path):
+        if kind == "net":
+            m = NET_DECL_RE.search(raw)
+            if m:
+                nets.append((int(m.group(1)), unescape(m.group(2))))
+            started = True
+        elif kind in BOARD_ITEMS:
+            if indent is None:
+                indent = raw[:raw.index("(")].lstrip("\n") or "  "
+            item = edge_cuts_item(raw) if kind in OUTLINE_ITEMS else None
+            if item is not None:
+                outline.append((raw, item))
+            else:
+                template.add(raw, kind in ("footprint", "module"))
+            started = True
+        else:
+            (tail if started else head).append(raw)
+
+    if not outline:
+        raise ValueError(f"{pcb_path}: no Edge.Cuts outline to panelize")
+    items = [item for _raw, item in outline]
+    bbox = _rectangle(items)
+    rectangular = bbox is not None
+    if not rectangular:
+        segments = [seg for item in items for seg in outline_segments(item)]
+        bbox = (min(min(s[0], s[2]) for s in segments), min(min(s[1], s[3]) for s in segments),
+                max(max(s[0], s[2]) for s in segments), max(max(s[1], s[3]) for s in segments))
+        for raw, _item in outline:
+            template.add(raw, False)
+    template.finish()
+    return {"head": head, "tail": tail, "nets": nets, "template": template, "bbox": bbox,
+            "rectangular": rectangular, "indent": indent or "  "}
+
+
+def _net_text(value: tuple, board: int, stride: int) -> str:
+    code, name, form = value
+    if form == "name":
+        return f'(net_name {quote(NET_FORMAT.format(board=board, name=name))})' if name else '(net_name "")'
+    new_code = code + (board - 1) * stride if code else 0
+    if form == "code":
+        return f"(net {new_code})"
+    new_name = NET_FORMAT.format(board=board, name=name) if code else name
+    return f'(net {new_code} {quote(new_name)})'
+
+
+def _edge(x1: float, y1: float, x2: float, y2: float, indent: str) -> str:
+    return (f'\n{indent}(gr_line (start {_fmt(x1)} {_fmt(y1)}) (end {_fmt(x2)} {_fmt(y2)})'
+            f' (layer "Edge.Cuts") (width {EDGE_WIDTH}))')
+
+
+def _hline(y: float, x0: float, x1: float, gaps: list[tuple[float, float]], indent: str) -> Iterator[str]:
+    """Horizontal edge from x0 to x1, broken where tabs join."""
+    x = x0
+    for a, b in gaps:
+        if b <= x0 or a >= x1:
+            continue
+        if a > x:
+            yield _edge(x, y, a, y, indent)
+        x = max(x, b)
+    if x < x1:
+        yield _edge(x, y, x1, y, indent)
+
+
+def _mouse_bite(x: float, y: float, width: float, ref: str, indent: str) -> str:
+    count = int((width - BITE_DRILL) / BITE_PITCH) + 1
+    first = -(count - 1) * BITE_PITCH / 2
+    inner = indent * 2
+    lines = [f'\n{indent}(footprint "Panel:MouseBite"',
+             f'{inner}(layer "F.Cu")',
+             f'{inner}(at {_fmt(x)} {_fmt(y)})',
+             f'{inner}(property "Reference" "{ref}" (at 0 0) (layer "F.SilkS") (hide yes))',
+             f'{inner}(attr exclude_from_pos_files exclude_from_bom)']
+    for k in range(count):
+        lines.append(f'{inner}(pad "" np_thru_hole circle (at {_fmt(first + k * BITE_PITCH)} 0)'
+                     f' (size {BITE_DRILL} {BITE_DRILL}) (drill {BITE_DRILL}) (layers "*.Cu" "*.Mask"))')
+    lines.append(f"{indent})")
+    return "\n".join(lines)
+
+
+def _fiducial(x: float, y: float, ref: str, indent: str) -> str:
+    inner = indent * 2
+    return "\n".join([
+        f'\n{indent}(footprint "Fiducial:Fiducial_1mm_Mask2mm"',
+        f'{inner}(layer "F.Cu")',
+        f'{inner}(at {_fmt(x)} {_fmt(y)})',
+        f'{inner}(property "Reference" "{ref}" (at 0 -2) (layer "F.SilkS") (hide yes))',
+        f'{inner}(attr smd exclude_from_bom)',
+        f'{inner}(pad "" smd circle (at 0 0) (size 1 1) (layers "F.Cu" "F.Mask") (solder_mask_margin 0.5))',
+        f"{indent})",
+    ])
+
+
+def panel_frame(bbox: tuple[float, float, float, float], cols: int, rows: int, gap: float, rail: float,
+                tabs: int, tabbed: bool, indent: str) -> Iterator[str]:
+    """Rails, fiducials and (for rectangular boards) board edges, tabs and mouse-bites."""
+    xmin, ymin, xmax, ymax = bbox
+    w, h = xmax - xmin, ymax - ymin
+    px0, px1 = xmin, xmax + (cols - 1) * (w + gap)
+    top_inner = ymin - gap
+    bottom_inner = ymax + (rows - 1) * (h + gap) + gap
+    py0, py1 = top_inner - rail, bottom_inner + rail
+
+    tab_w = min(TAB_WIDTH, w / (2 * tabs)) if tabbed and tabs else 0.0
+    gaps: list[tuple[float, float]] = []
+    if tab_w:
+        for i in range(cols):
+            left = xmin + i * (w + gap)
+            for k in range(tabs):
+                c = left + w * (2 * k + 1) / (2 * tabs)
+                gaps.append((c - tab_w / 2, c + tab_w / 2))
+
+    # Rails
+    yield _edge(px0, py0, px1, py0, indent)
+    yield _edge(px0, py0, px0, top_inner, indent)
+    yield _edge(px1, py0, px1, top_inner, indent)
+    yield from _hline(top_inner, px0, px1, gaps, indent)
+    yield from _hline(bottom_inner, px0, px1, gaps, indent)
+    yield _edge(px0, bottom_inner, px0, py1, indent)
+    yield _edge(px1, bottom_inner, px1, py1, indent)
+    yield _edge(px0, py1, px1, py1, indent)
+
+    if tabbed:
+        bite = 0
+        for j in range(rows):
+            top = ymin + j * (h + gap)
+            for i in range(cols):
+                left = xmin + i * (w + gap)
+                own = [g for g in gaps if left <= g[0] and g[1] <= left + w]
+                yield from _hline(top, left, left + w, own, indent)
+                yield from _hline(top + h, left, left + w, own, indent)
+                yield _edge(left, top, left, top + h, indent)
+                yield _edge(left + w, top, left + w, top + h, indent)
+                for a, b in own:
+                    # Tab bridging the gap above this board, and its bites on the board side
+                    yield _edge(a, top - gap, a, top, indent)
+                    yield _edge(b, top - gap, b, top, indent)
+                    bite += 1
+                    yield _mouse_bite((a + b) / 2, top + BITE_OFFSET, b - a, f"MB{bite}", indent)
+                    bite += 1
+                    yield _mouse_bite((a + b) / 2, top + h - BITE_OFFSET, b - a, f"MB{bite}", indent)
+        for a, b in gaps:   # tabs from the last row down to the bottom rail
+            yield _edge(a, bottom_inner - gap, a, bottom_inner, indent)
+            yield _edge(b, bottom_inner - gap, b, bottom_inner, indent)
+
+    # Three fiducials, asymmetric so the panel cannot be loaded rotated
+    top_y, bottom_y = py0 + rail / 2, py1 - rail / 2
+    yield _fiducial(px0 + FIDUCIAL_INSET, top_y, "FID1", indent)
+    yield _fiducial(px1 - FIDUCIAL_INSET, top_y, "FID2", indent)
+    yield _fiducial(px0 + FIDUCIAL_INSET, bottom_y, "FID3", indent)
+
+
+def iter_panel(pcb_path: str, cols: int, rows: int, gap: float = GAP, rail: float = RAIL,
+               tabs: int = TABS_PER_EDGE) -> Iterator[str]:
+    """Yield the text of a cols x rows panel of the board, one copy at a time."""
+    if cols < 1 or rows < 1:
+        raise ValueError("a panel needs at least one column and one row")
+    board = load_board(pcb_path)
+    tpl: BoardTemplate = board["template"]
+    xmin, ymin, xmax, ymax = board["bbox"]
+    w, h = xmax - xmin, ymax - ymin
+    indent = board["indent"]
+    stride = max((code for code, _name in board["nets"]), default=0)
+    copies = cols * rows
+
+    yield "".join(board["head"])
+    if any(code == 0 for code, _name in board["nets"]):
+        yield f'\n{indent}(net 0 "")'
+    for n in range(1, copies + 1):
+        yield "".join(f'\n{indent}(net {code + (n - 1) * stride} {quote(NET_FORMAT.format(board=n, name=name))})'
+                      for code, name in board["nets"] if code)
+
+    x_cols = [tpl.shifted("x", i * (w + gap)) for i in range(cols)]
+    net_values, refs, uuids = tpl.values["net"], tpl.values["ref"], tpl.values["uuid"]
+    for j in range(rows):
+        ys = tpl.shifted("y", j * (h + gap))
+        for i in range(cols):
+            n = j * cols + i + 1
+            tag = f"{n:04x}"
+            yield tpl.render(x_cols[i], ys,
+                             [_net_text(v, n, stride) for v in net_values],
+                             [REF_FORMAT.format(ref=r, board=n) for r in refs],
+                             [u[:24] + tag + u[28:] for u in uuids])
+
+    yield "".join(panel_frame(board["bbox"], cols, rows, gap, rail, tabs, board["rectangular"], indent))
+    yield "".join(board["tail"])
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Step a .kicad_pcb into an N x M panel with rails, mouse-bites and fiducials.")
+    ap.add_argument("-i", "--input", default="output.kicad_pcb", help="Board to panelize")
+    ap.add_argument("-o", "--output", default="panel.kicad_pcb", help="Panel .kicad_pcb")
+    ap.add_argument("--cols", type=int, default=2, help="Boards across")
+    ap.add_argument("--rows", type=int, default=2, help="Boards down")
+    ap.add_argument("--gap", type=float, default=GAP, help="Milled gap between boards (mm)")
+    ap.add_argument("--rail", type=float, default=RAIL, help="Top / bottom rail height (mm)")
+    ap.add_argument("--tabs", type=int, default=TABS_PER_EDGE, help="Mouse-bite tabs per board edge")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    size = 0
+    with open(args.output, "w", encoding="utf-8") as f:
+        for chunk in iter_panel(args.input, args.cols, args.rows, args.gap, args.rail, args.tabs):
+            f.write(chunk)
+            size += len(chunk)
+    print(f"Wrote {args.output}: {args.cols}x{args.rows} panel, {size} chars "
+          f"in {time.perf_counter() - t0:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+pipeline.py
+Run the siliXon -> KiCad flow as a DAG of stages with per-artifact caching.
+
+Default stages (edges follow from the files each stage reads and writes):
+
+    silixon_pcb.json, silixon_netlist.txt (+ includes), silixon_bom.json
+      |-- netlist   silixon_proj_to_kicad.net   (silixon_to_kicad)
+      |-- board     output.kicad_pcb            (old2 board writer: placement + pad nets)
+      |     '-- routing  output_routed.kicad_pcb  (routes_to_tracks, + silixon_routes.json)
+      |           |-- gerbers  gerbers/         (gerber_export)
+      |           '-- preview  output.svg       (board_preview)
+      |-- check     footprint_check.txt         (footprint_check)
+      '-- bom       silixon_bom_aggregated.csv  (silixon_bom)
+
+A stage's key is the SHA-256 of its name, its config, the content of every input
+file and the source of the modules that implement it and of every module of this
+tree they import. On a rerun a stage is:
+- up to date  its key matches the last run and its outputs are unchanged on disk
+- restored    its outputs for this key are in the cache (.pipeline_cache/objects/<key>)
+- built       otherwise; the outputs are then stored under the key
+Since outputs are byte-stable, a rebuilt stage whose output did not change leaves
+its downstream stages up to date. Stages whose inputs are ready run concurrently
+in a process pool.
+"""
+
+import argparse
+import ast
+import hashlib
+import importlib.util
+import json
+import os
+import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Callable
+
+from spice_include import included_files
+from stable_output import file_sha256, write_if_changed
+from symbol_lib import library_paths
+
+CACHE_DIR = ".pipeline_cache"
+STATE_FILE = "state.json"
+
+
+class Stage:
+    """One step of the flow: func(*args, **config) reads inputs and writes outputs."""
+
+    def __init__(self, name: str, func: Callable, args: tuple, inputs: list[str], outputs: list[str],
+                 config: dict | None = None, code: tuple[str, ...] = ()):
+        self.name = name
+        self.func = func
+        self.args = args
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.config = config or {}
+        self.code = code    # modules whose source (and local imports) are part of the key
+
+    def __repr__(self) -> str:
+        return f"Stage({self.name!r})"
+
+
+# ---------------------------- Stage runners ---------------------------- #
+# Module-level so they can be sent to the process pool.
+
+def run_netlist(out: str, json_path: str, netlist_path: str, bom_path: str) -> None:
+    from silixon_to_kicad import build_netlist
+    from symbol_lib import load_symbol_index
+    write_if_changed(out, build_netlist(json_path, netlist_path, bom_path, load_symbol_index()))
+
+
+def run_board(out: str, json_path: str, netlist_path: str, bom_path: str) -> None:
+    from old2__netlist_to_kicad_pcb import build_pcb
+    write_if_changed(out, build_pcb(netlist_path, bom_path, json_path))
+
+
+def run_routing(out: str, pcb_path: str, routes_path: str) -> None:
+    from routes_to_tracks import route_board
+    write_if_changed(out, route_board(pcb_path, routes_path)[0])
+
+
+def run_gerbers(out_dir: str, pcb_path: str) -> None:
+    from gerber_export import export_fab
+    export_fab(pcb_path, out_dir)
+
+
+def run_preview(out: str, pcb_path: str, px_per_mm: float = 10.0) -> None:
+    from board_preview import render
+    render(pcb_path, out, px_per_mm)
+
+
+def run_check(out: str, json_path: str, netlist_path: str, bom_path: str, fp_cache: str) -> None:
+    from footprint_check import check_design
+    from old2__netlist_to_kicad_pcb import pcb_footprints
+    with open(json_path, "r", encoding="utf-8") as f:
+        pcb = pcb_footprints(json.load(f).get("components", []))
+    problems = check_design(json_path, netlist_path, bom_path, pcb, fp_cache)
+    lines = [f"{ref}: {msg}" for ref, msg in problems]
+    lines.append(f"{len(pcb)} components checked, {len(problems)} problems")
+    write_if_changed(out, "\n".join(lines) + "\n")
+
+
+def run_bom(out: str, json_path: str, bom_path: str) -> None:
+    from silixon_bom import aggregate_bom, enrich_components, index_bom, load_bom, write_bom_csv
+    with open(json_path, "r", encoding="utf-8") as f:
+        components = json.load(f).get("components", [])
+    enrich_components(components, index_bom(load_bom(bom_path)))
+    write_bom_csv(*aggregate_bom(components), out)
+
+
+def netlist_sources(netlist_path: str) -> list[str]:
+    """The netlist and every file it .include's / .lib's."""
+    if not Path(netlist_path).is_file():
+        return [netlist_path]
+    return [netlist_path] + [str(p) for p in included_files(netlist_path)]
+
+
+def default_stages(json_path: str = "silixon_pcb.json", netlist_path: str = "silixon_netlist.txt",
+                   bom_path: str = "silixon_bom.json", out_dir: str = ".", fp_cache: str = "fp-info-cache",
+                   routes_path: str = "silixon_routes.json", px_per_mm: float = 10.0) -> list[Stage]:
+    out = Path(out_dir)
+    net_out, pcb_out = str(out / "silixon_proj_to_kicad.net"), str(out / "output.kicad_pcb")
+    routed_out = str(out / "output_routed.kicad_pcb")
+    design = [json_path, *netlist_sources(netlist_path), bom_path]
+    return [
+        Stage("netlist", run_netlist, (net_out, json_path, netlist_path, bom_path),
+              design + library_paths(), [net_out],
+              code=("silixon_to_kicad", "net_alias", "silixon_bom", "spice_include", "symbol_lib")),
+        Stage("board", run_board, (pcb_out, json_path, netlist_path, bom_path),
+              design, [pcb_out], code=("old2__netlist_to_kicad_pcb", "silixon_to_kicad", "net_alias")),
+        Stage("routing", run_routing, (routed_out, pcb_out, routes_path),
+              [pcb_out, routes_path], [routed_out], code=("routes_to_tracks", "kicad_sexpr")),
+        Stage("gerbers", run_gerbers, (str(out / "gerbers"), routed_out),
+              [routed_out], [str(out / "gerbers")], code=("gerber_export", "kicad_board")),
+        Stage("preview", run_preview, (str(out / "output.svg"), routed_out),
+              [routed_out], [str(out / "output.svg")], config={"px_per_mm": px_per_mm},
+              code=("board_preview", "kicad_board")),
+        Stage("check", run_check, (str(out / "footprint_check.txt"), json_path, netlist_path, bom_path, fp_cache),
+              design + [fp_cache] + library_paths(), [str(out / "footprint_check.txt")],
+              code=("footprint_check", "fp_index", "old2__netlist_to_kicad_pcb", "silixon_to_kicad")),
+        Stage("bom", run_bom, (str(out / "silixon_bom_aggregated.csv"), json_path, bom_path),
+              [json_path, bom_path], [str(out / "silixon_bom_aggregated.csv")], code=("silixon_bom",)),
+    ]
+
+
+# ---------------------------- Hashing ---------------------------- #
+
+def path_hash(path: str) -> str | None:
+    """SHA-256 of a file, of a directory's files (names and contents), or None if missing."""
+    p = Path(path)
+    if p.is_file():
+        return file_sha256(path)
+    if p.is_dir():
+        h = hashlib.sha256()
+        for child in sorted(q for q in p.rglob("*") if q.is_file()):
+            h.update(f"{child.relative_to(p).as_posix()}\0{file_sha256(str(child))}\n".encode("utf-8"))
+        return h.hexdigest()
+    return None
+
+
+_code_hashes: dict[str, str | None] = {}
+_local_imports: dict[str, list[str]] = {}
+LOCAL_DIR = Path(__file__).resolve().parent
+
+
+def code_hash(module: str) -> str | None:
+    if module not in _code_hashes:
+        spec = importlib.util.find_spec(module)
+        _code_hashes[module] = path_hash(spec.origin) if spec and spec.origin else None
+    return _code_hashes[module]
+
+
+def local_imports(module: str) -> list[str]:
+    """Modules of this tree that module imports directly (stdlib and installed packages left out)."""
+    if module not in _local_imports:
+        found = []
+        path = LOCAL_DIR / f"{module}.py"
+        if path.is_file():
+            for node in ast.walk(ast.parse(path.read_text(encoding="utf-8"))):
+                if isinstance(node, ast.Import):
+                    names = [alias.name for alias in node.names]
+                elif isinstance(node, ast.ImportFrom) and not node.level and node.module:
+                    names = [node.module]
+                else:
+                    continue
+                found += [n for n in names if (LOCAL_DIR / f"{n}.py").is_file()]
+        _local_imports[module] = sorted(set(found))
+    return _local_imports[module]
+
+
+def code_closure(modules: tuple[str, ...]) -> list[str]:
+    """modules and every local module they import, directly or not (function-level imports too)."""
+    seen: set[str] = set()
+    todo = list(modules)
+    while todo:
+        module = todo.pop()
+        if module not in seen:
+            seen.add(module)
+            todo += local_imports(module)
+    return sorted(seen)
+
+
+def stage_key(stage: Stage) -> str:
+    doc = {
+        "stage": stage.name,
+        "config": stage.config,
+        "inputs": {path: path_hash(path) for path in stage.inputs},
+        "code": {module: code_hash(module) for module in code_closure(stage.code)},
+    }
+    return hashlib.sha256(json.dumps(doc, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+# ---------------------------- Runner ---------------------------- #
+
+class Pipeline:
+    """DAG of stages; run() executes only the stages whose key changed."""
+
+    def __init__(self, stages: list[Stage], cache_dir: str = CACHE_DIR, jobs: int | None = None):
+        self.stages = {s.name: s for s in stages}
+        self.cache_dir = Path(cache_dir)
+        self.jobs = jobs
+        producer: dict[str, str] = {}
+        for s in stages:
+            for out in s.outputs:
+                if out in producer:
+                    raise ValueError(f"{out} is written by both {producer[out]} and {s.name}")
+                producer[out] = s.name
+        self.deps = {s.name: sorted({producer[i] for i in s.inputs if i in producer} - {s.name})
+                     for s in stages}
+        self._check_acyclic()
+
+    def _check_acyclic(self) -> None:
+        state: dict[str, int] = {}   # 1 = visiting, 2 = done
+
+        def visit(name: str, path: tuple) -> None:
+            if state.get(name) == 2:
+                return
+            if state.get(name) == 1:
+                raise ValueError(f"stage cycle: {' -> '.join(path + (name,))}")
+            state[name] = 1
+            for dep in self.deps[name]:
+                visit(dep, path + (name,))
+            state[name] = 2
+
+        for name in self.stages:
+            visit(name, ())
+
+    def upstream(self, targets: list[str]) -> set[str]:
+        """targets plus every stage they depend on."""
+        wanted, todo = set(), list(targets)
+        while todo:
+            name = todo.pop()
+            if name not in self.stages:
+                raise KeyError(f"unknown stage: {name}")
+            if name not in wanted:
+                wanted.add(name)
+                todo.extend(self.deps[name])
+        return wanted
+
+    # -- cache -- #
+
+    def _load_state(self) -> dict:
+        try:
+            with open(self.cache_dir / STATE_FILE, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self, state: dict) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.cache_dir / f"{STATE_FILE}.tmp"
+        tmp.write_text(json.dumps(state, indent=1, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, self.cache_dir / STATE_FILE)
+
+    def _object_dir(self, key: str) -> Path:
+        return self.cache_dir / "objects" / key
+
+    @staticmethod
+    def _copy(src: Path, dst: Path) -> None:
+        if dst.is_dir():
+            shutil.rmtree(dst)
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        if src.is_dir():
+            shutil.copytree(src, dst)
+        else:
+            shutil.copy2(src, dst)
+
+    def _store(self, stage: Stage, key: str) -> None:
+        folder = self._object_dir(key)
+        tmp = folder.with_suffix(".tmp")
+        if tmp.exists():
+            shutil.rmtree(tmp)
+        for n, out in enumerate(stage.outputs):
+            if Path(out).exists():
+                self._copy(Path(out), tmp / f"{n}-{Path(out).name}")
+        if folder.exists():
+            shutil.rmtree(folder)
+        if tmp.exists():
+            os.replace(tmp, folder)
+
+    def _restore(self, stage: Stage, key: str) -> bool:
+        folder = self._object_dir(key)
+        if not folder.is_dir():
+            return False
+        cached = [folder / f"{n}-{Path(out).name}" for n, out in enumerate(stage.outputs)]
+        if not all(p.exists() for p in cached):
+            return False
+        for src, out in zip(cached, stage.outputs):
+            if path_hash(str(src)) != path_hash(out):
+                self._copy(src, Path(out))
+        return True
+
+    # -- run -- #
+
+    def run(self, targets: list[str] | None = None, force: bool = False,
+            report: Callable[[str, str, float], None] | None = None) -> dict[str, str]:
+        """
+        Bring targets (default: all stages) up to date.
+        Returns stage -> "up to date" | "restored" | "built".
+        """
+        wanted = self.upstream(targets) if targets else set(self.stages)
+        state = self._load_state()
+        status: dict[str, str] = {}
+        pending = set(wanted)
+        running: dict[Future, tuple[str, str, float]] = {}
+
+        def finish(name: str, result: str, key: str, t0: float) -> None:
+            status[name] = result
+            state[name] = {"key": key, "outputs": {o: path_hash(o) for o in self.stages[name].outputs}}
+            if report:
+                report(name, result, time.perf_counter() - t0)
+
+        with ProcessPoolExecutor(max_workers=self.jobs) as pool:
+            while pending or running:
+                ready = sorted(n for n in pending if all(d in status for d in self.deps[n] if d in wanted))
+                for name in ready:
+                    pending.discard(name)
+                    stage = self.stages[name]
+                    t0 = time.perf_counter()
+                    key = stage_key(stage)
+                    last = state.get(name, {})
+                    if not force and last.get("key") == key and \
+                            all(path_hash(o) == h for o, h in last.get("outputs", {}).items()):
+                        finish(name, "up to date", key, t0)
+                    elif not force and self._restore(stage, key):
+                        finish(name, "restored", key, t0)
+                    else:
+                        for out in stage.outputs:
+                            Path(out).parent.mkdir(parents=True, exist_ok=True)
+                        running[pool.submit(stage.func, *stage.args, **stage.config)] = (name, key, t0)
+                if ready and not running:
+                    continue   # cache hits may have made more stages ready
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    name, key, t0 = running.pop(fut)
+                    fut.result()
+                    self._store(self.stages[name], key)
+                    finish(name, "built", key, t0)
+                self._save_state(state)
+        self._save_state(state)
+        return status
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Run the siliXon -> KiCad flow, rebuilding only what changed.")
+    ap.add_argument("targets", nargs="*", help="Stages to bring up to date (default: all)")
+    ap.add_argument("--pcb", default="silixon_pcb.json", help="siliXon design JSON")
+    ap.add_argument("--netlist", default="silixon_netlist.txt", help="siliXon SPICE-like netlist")
+    ap.add_argument("--bom", default="silixon_bom.json", help="siliXon BOM JSON")
+    ap.add_argument("--routes", default="silixon_routes.json", help="siliXon routes JSON")
+    ap.add_argument("-o", "--outdir", default=".", help="Output directory")
+    ap.add_argument("--cache", default=CACHE_DIR, help="Cache directory")
+    ap.add_argument("-j", "--jobs", type=int, default=None, help="Stages run at once (default: CPU count)")
+    ap.add_argument("-f", "--force", action="store_true", help="Rebuild even when cached")
+    ap.add_argument("--list", action="store_true", help="Show the stages and their dependencies")
+    args = ap.parse_args()
+
+    pipeline = Pipeline(default_stages(args.pcb, args.netlist, args.bom, args.outdir,
+                                       routes_path=args.routes), args.cache, args.jobs)
+    if args.list:
+        for name, stage in pipeline.stages.items():
+            after = ", ".join(pipeline.deps[name]) or "-"
+            print(f"{name:<8} after {after:<8} -> {', '.join(stage.outputs)}")
+        return
+
+    t0 = time.perf_counter()
+    status = pipeline.run(args.targets or None, args.force,
+                          report=lambda name, result, secs: print(f"{name:<8} {result:<10} {secs:.2f} s"))
+    built = sum(1 for s in status.values() if s == "built")
+    print(f"{len(status)} stages, {built} built in {time.perf_counter() - t0:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+reannotate.py
+Geographic re-annotation: renumber references by board position, so R1, R2, ...
+run across the board in reading order instead of following siliXon uids.
+
+Components are sorted once (O(n log n)) by:
+  layer (top, then bottom seen from below, i.e. x mirrored),
+  band (pcb_position y in rows of --band mm; x with --columns),
+  position along the band, then across it.
+Each prefix (R, C, U, ...) is then numbered from --start in that order. Only refs
+of the form <letters><number> (or <letters>?) are renumbered; others (RLED, ...)
+keep their name.
+
+silixon_pcb.json is renamed per component, so several R? parts get distinct
+numbers. The other files only know components by name, so they get the old -> new
+map of the refs that name exactly one component:
+- silixon_bom.json   reference column ("R1, R2" rows too)
+- the netlist        first token of each record (XU1 -> XU<n> for subcircuits),
+                     in the top file and every file it .include's / .lib's;
+                     elements local to a .subckt body are left alone
+- a .kicad_pcb       footprint Reference (property or fp_text), streamed line by line
+Refs shared by several components (R?) are reported, to be fixed there by hand.
+Each map is applied all at once, so swaps (R1 <-> R2) are safe.
+"""
+
+import argparse
+import json
+import math
+import os
+import re
+
+from silixon_bom import load_bom
+from spice_include import included_files
+from stable_output import write_if_changed
+
+UNITS_PER_MM = 10   # silixon_pcb.json positions are in 0.1 mm
+BAND_MM = 5.0
+LAYER_ORDER = {"top": 0, "bottom": 1}
+
+REF_PARTS_RE = re.compile(r"^([A-Za-z_]+)(\d+|\?)$")
+RECORD_HEAD_RE = re.compile(r"^(\s*)(\S+)")
+BOM_REF_RE = re.compile(r"[^,\s]+")
+PCB_REF_RE = re.compile(r'(\(property\s+"Reference"\s+")((?:[^"\\]|\\.)*)(")|(\(fp_text\s+reference\s+"?)([^"\s)]+)')
+
+
+def rename_map(components: list[dict], band_mm: float = BAND_MM, columns: bool = False,
+               start: int = 1) -> dict[int, str]:
+    """component index -> new uid for the components whose reference changes."""
+    band = band_mm * UNITS_PER_MM
+    keyed = []
+    for i, c in enumerate(components):
+        uid = c.get("uid", "")
+        m = REF_PARTS_RE.match(uid)
+        if not m:
+            continue
+        pos = c.get("pcb_position") or {}
+        x, y = float(pos.get("x", 0)), float(pos.get("y", 0))
+        side = LAYER_ORDER.get(pos.get("layer", "top"), 0)
+        if side:
+            x = -x   # bottom side is numbered as seen from below
+        across, along = (x, y) if columns else (y, x)
+        keyed.append((side, math.floor(across / band), along, across, i, uid, m.group(1)))
+    keyed.sort()
+
+    counters: dict[str, int] = {}
+    renames = {}
+    for *_key, i, uid, prefix in keyed:
+        n = counters.get(prefix, start)
+        counters[prefix] = n + 1
+        new = f"{prefix}{n}"
+        if new != uid:
+            renames[i] = new
+    return renames
+
+
+def name_map(components: list[dict], renames: dict[int, str]) -> tuple[dict[str, str], list[str]]:
+    """
+    (old uid -> new uid, shared uids) for files that name components: a renamed uid
+    that several components share (R?) cannot be mapped by name and is returned apart.
+    """
+    count: dict[str, int] = {}
+    for c in components:
+        count[c.get("uid")] = count.get(c.get("uid"), 0) + 1
+    mapping = {}
+    shared = []
+    for i, new in renames.items():
+        old = components[i].get("uid")
+        if count[old] == 1:
+            mapping[old] = new
+        elif old not in shared:
+            shared.append(old)
+    return mapping, shared
+
+
+def rename_design(design: dict, renames: dict[int, str]) -> int:
+    """Rename component uids in place by component index; returns the number renamed."""
+    components = design.get("components", [])
+    for i, new in renames.items():
+        components[i]["uid"] = new
+    return len(renames)
+
+
+def rename_bom(rows: list[dict], mapping: dict[str, str]) -> int:
+    renamed = 0
+    for row in rows:
+        ref = row.get("reference")
+        if isinstance(ref, str):
+            new = BOM_REF_RE.sub(lambda m: mapping.get(m.group(0), m.group(0)), ref)
+            if new != ref:
+                row["reference"] = new
+                renamed += 1
+    return renamed
+
+
+def rename_netlist(text: str, mapping: dict[str, str]) -> str:
+    """
+    Rename the component each record belongs to; continuation lines, comments,
+    directives and the elements of .subckt bodies (local names) are left alone.
+    """
+    out = []
+    continued = False
+    depth = 0
+    for line in text.splitlines(keepends=True):
+        code = line.split(";", 1)[0].rstrip()
+        stripped = line.lstrip()
+        starts_record = not continued and stripped and stripped[0] not in "*.+"
+        if not continued and stripped.startswith("."):
+            directive = stripped.split(None, 1)[0].lower()
+            if directive == ".subckt":
+                depth += 1
+            elif directive == ".ends":
+                depth = max(depth - 1, 0)
+        if starts_record and not depth:
+            m = RECORD_HEAD_RE.match(line)
+            tok = m.group(2)
+            if tok.startswith("X") and tok[1:] in mapping:
+                line = f"{m.group(1)}X{mapping[tok[1:]]}{line[m.end():]}"
+            elif not tok.startswith("X") and tok in mapping:
+                line = f"{m.group(1)}{mapping[tok]}{line[m.end():]}"
+        continued = code.endswith("\\")
+        out.append(line)
+    return "".join(out)
+
+
+def rename_pcb(in_path: str, out_path: str, mapping: dict[str, str]) -> int:
+    """Stream a .kicad_pcb, renaming footprint references; out_path may equal in_path."""
+    renamed = 0
+
+    def repl(m: re.Match) -> str:
+        nonlocal renamed
+        if m.group(1) is not None:
+            new = mapping.get(m.group(2))
+            if new is None:
+                return m.group(0)
+            renamed += 1
+            return f"{m.group(1)}{new}{m.group(3)}"
+        new = mapping.get(m.group(5))
+        if new is None:
+            return m.group(0)
+        renamed += 1
+        return f"{m.group(4)}{new}"
+
+    tmp = f"{out_path}.tmp"
+    with open(in_path, "r", encoding="utf-8") as fin, open(tmp, "w", encoding="utf-8") as fout:
+        for line in fin:
+            fout.write(PCB_REF_RE.sub(repl, line) if "eference" in line else line)
+    os.replace(tmp, out_path)
+    return renamed
+
+
+def _write_json(path: str, doc) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(doc, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Renumber references by board position across the design files.")
+    ap.add_argument("--pcb", default="silixon_pcb.json", help="siliXon design JSON")
+    ap.add_argument("--netlist", default="silixon_netlist.txt", help="siliXon SPICE-like netlist")
+    ap.add_argument("--bom", default="silixon_bom.json", help="siliXon BOM JSON")
+    ap.add_argument("--board", help="Optional .kicad_pcb to rename in place")
+    ap.add_argument("--band", type=float, default=BAND_MM, help="Row (or column) band height in mm")
+    ap.add_argument("--columns", action="store_true", help="Number in column bands instead of row bands")
+    ap.add_argument("--start", type=int, default=1, help="First number of each prefix")
+    ap.add_argument("-n", "--dry-run", action="store_true", help="Print the renames without writing")
+    args = ap.parse_args()
+
+    with open(args.pcb, "r", encoding="utf-8") as f:
+        design = json.load(f)
+    components = design.get("components", [])
+    renames = rename_map(components, args.band, args.columns, args.start)
+    for i, new in renames.items():
+        print(f"{components[i].get('uid')} -> {new}")
+    if not renames:
+        print("References already in position order")
+        return
+    mapping, shared = name_map(components, renames)
+    for uid in shared:
+        print(f"{uid}: several components share this reference; rename it in the BOM, "
+              f"netlist and board by hand")
+    if args.dry_run:
+        print(f"{len(renames)} references would be renamed")
+        return
+
+    rename_design(design, renames)
+    _write_json(args.pcb, design)
+    if os.path.isfile(args.bom):
+        rows = load_bom(args.bom)
+        if rename_bom(rows, mapping):
+            _write_json(args.bom, rows)
+    if os.path.isfile(args.netlist):
+        for path in [args.netlist, *map(str, included_files(args.netlist))]:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+            if write_if_changed(path, rename_netlist(text, mapping)):
+                print(f"Renamed records in {path}")
+    if args.board:
+        rename_pcb(args.board, args.board, mapping)
+    print(f"{len(renames)} references renamed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+routes_to_tracks.py
+Turn the per-net polylines of silixon_routes.json into (segment ...) and (via ...)
+records of a .kicad_pcb.
+
+silixon_routes.json:
+    {"tracks": {"<net name>": [<polyline>, ...], ...}}
+A polyline is {"points": [[x, y], ...], "layer": "top", "width": 0.25, "vias": [[x, y], ...]}
+or just its list of points. Points are in siliXon units (0.1 mm, like pcb_position);
+widths are in mm. A point may carry its own layer ([x, y, "bottom"]): the track
+changes layer there, through a via.
+
+Before writing:
+- every point is snapped to --grid (kept as integer grid steps from then on)
+- repeated points are dropped and consecutive collinear segments are merged, so a
+  straight run of any number of router points becomes one segment
+- identical segments of a net are written once
+- vias are deduplicated per net through a spatial hash (cells of --via-merge mm):
+  a via within that distance of one already placed on its net is dropped. A via
+  that close to another net's via is kept and reported (a warning), since it is
+  most likely a short
+Existing segments, arcs and vias of the board are replaced; everything else is
+streamed through unchanged. Records get uuids derived from their content, so the
+same routes always give the same file.
+"""
+
+import argparse
+import json
+import re
+import time
+import warnings
+from typing import Iterator
+
+from kicad_sexpr import iter_top_level
+from stable_output import stable_uuid, write_if_changed
+
+UNITS_PER_MM = 10   # silixon_routes.json points are in 0.1 mm
+GRID_MM = 0.01
+TRACK_WIDTH = 0.25
+VIA_SIZE = 0.6
+VIA_DRILL = 0.3
+VIA_MERGE_MM = 0.05
+LAYER_NAMES = {"top": "F.Cu", "bottom": "B.Cu"}
+
+ROUTING_ITEMS = {"segment", "arc", "via"}
+NET_DECL_RE = re.compile(r'\(net\s+(\d+)\s+"((?:[^"\\]|\\.)*)"')
+
+
+def _layer(name: str | None) -> str:
+    return LAYER_NAMES.get(name, name) if name else "F.Cu"
+
+
+def iter_polylines(tracks: dict) -> Iterator[tuple[str, dict]]:
+    """(net, polyline dict) for every polyline in the tracks map."""
+    for net, entries in tracks.items():
+        for entry in [entries] if isinstance(entries, dict) else entries:
+            yield net, entry if isinstance(entry, dict) else {"points": entry}
+
+
+def layer_runs(points: list, layer: str) -> tuple[list[tuple[str, list]], list]:
+    """
+    Split a polyline where its points change layer.
+    Returns ([(layer, [(x, y), ...]), ...], [via (x, y), ...]); a run ends on the
+    point where the next one starts, with a via there.
+    """
+    runs: list[tuple[str, list]] = []
+    vias = []
+    current: list = []
+    for p in points:
+        xy = (p[0], p[1])
+        p_layer = _layer(p[2]) if len(p) > 2 else layer
+        if p_layer != layer and current:
+            current.append(xy)
+            runs.append((layer, current))
+            vias.append(xy)
+            current = []
+        layer = p_layer
+        current.append(xy)
+    if current:
+        runs.append((layer, current))
+    return runs, vias
+
+
+def simplify(points: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    """Drop repeated points and the middle point of collinear, same-direction pairs."""
+    out: list[tuple[int, int]] = []
+    for p in points:
+        if out and p == out[-1]:
+            continue
+        if len(out) >= 2:
+            (ax, ay), (bx, by) = out[-2], out[-1]
+            dx1, dy1, dx2, dy2 = bx - ax, by - ay, p[0] - bx, p[1] - by
+            if dx1 * dy2 == dy1 * dx2 and dx1 * dx2 + dy1 * dy2 > 0:
+                out[-1] = p
+                continue
+        out.append(p)
+    return out
+
+
+class ViaIndex:
+    """
+    Spatial hash of placed vias, keyed per net. add() refuses a via within radius of
+    one on the same net and collects the other nets' vias that close in clashes.
+    """
+
+    def __init__(self, radius: int):
+        self.radius = max(radius, 1)
+        self.cells: dict[tuple[int, int], list[tuple[str, int, int]]] = {}
+        self.clashes: list[tuple[str, str, int, int]] = []   # (net, other net, x, y)
+
+    def add(self, net: str, x: int, y: int) -> bool:
+        r = self.radius
+        cx, cy = x // r, y // r
+        near = []
+        for i in (cx - 1, cx, cx + 1):
+            for j in (cy - 1, cy, cy + 1):
+                for vnet, vx, vy in self.cells.get((i, j), ()):
+                    if (vx - x) ** 2 + (vy - y) ** 2 <= r * r:
+                        if vnet == net:
+                            return False
+                        near.append(vnet)
+        self.clashes += [(net, other, x, y) for other in dict.fromkeys(near)]
+        self.cells.setdefault((cx, cy), []).append((net, x, y))
+        return True
+
+
+def build_tracks(routes: dict, grid_mm: float = GRID_MM, via_merge_mm: float = VIA_MERGE_MM) -> dict:
+    """
+    Snap, merge and dedupe the routes. Returns
+      segments: [(net, layer, width, x1, y1, x2, y2)]   coordinates in grid steps
+      vias:     [(net, x, y)]
+      stats:    counts before / after, and via_clashes: vias within via_merge_mm of
+                another net's via (each also warned about)
+    """
+    scale = 1 / (UNITS_PER_MM * grid_mm)
+    segments: list[tuple] = []
+    seen: set[tuple] = set()
+    vias: list[tuple] = []
+    via_index = ViaIndex(round(via_merge_mm / grid_mm))
+    stats = {"points": 0, "segments": 0, "vias_in": 0, "vias": 0}
+
+    def snap(p) -> tuple[int, int]:
+        return round(p[0] * scale), round(p[1] * scale)
+
+    for net, line in iter_polylines(routes.get("tracks", {})):
+        points = line.get("points", [])
+        stats["points"] += len(points)
+        width = float(line.get("width", TRACK_WIDTH))
+        runs, layer_vias = layer_runs(points, _layer(line.get("layer")))
+        for layer, run in runs:
+            pts = simplify([(round(x * scale), round(y * scale)) for x, y in run])
+            for (x1, y1), (x2, y2) in zip(pts, pts[1:]):
+                # A segment and its reverse are the same copper
+                key = (net, layer, width) + (min((x1, y1, x2, y2), (x2, y2, x1, y1)))
+                if key not in seen:
+                    seen.add(key)
+                    segments.append((net, layer, width, x1, y1, x2, y2))
+        for v in layer_vias + list(line.get("vias", [])):
+            stats["vias_in"] += 1
+            x, y = snap(v)
+            if via_index.add(net, x, y):
+                vias.append((net, x, y))
+    for net, other, x, y in via_index.clashes:
+        warnings.warn(f"{net}: via at ({x * grid_mm:g}, {y * grid_mm:g}) mm is within {via_merge_mm:g} mm "
+                      f"of a {other} via")
+    stats["segments"] = len(segments)
+    stats["vias"] = len(vias)
+    stats["via_clashes"] = len(via_index.clashes)
+    return {"segments": segments, "vias": vias, "stats": stats}
+
+
+def track_records(tracks: dict, net_codes: dict[str, int], grid_mm: float = GRID_MM,
+                  indent: str = "  ") -> Iterator[str]:
+    """(segment ...) and (via ...) text for build_tracks output."""
+    digits = max(0, -int(f"{grid_mm:e}".split("e")[1])) + 1
+    formatted: dict[tuple[int, int], str] = {}   # segment ends are shared, format each point once
+
+    def xy(x: int, y: int) -> str:
+        s = formatted.get((x, y))
+        if s is None:
+            s = formatted[x, y] = " ".join(
+                f"{v * grid_mm:.{digits}f}".rstrip("0").rstrip(".") if v else "0"
+                for v in (x, y))
+        return s
+
+    for net, layer, width, x1, y1, x2, y2 in tracks["segments"]:
+        start, end = xy(x1, y1), xy(x2, y2)
+        uid = stable_uuid("segment", net, layer, start, end)
+        yield (f'\n{indent}(segment (start {start}) (end {end}) (width {width}) (layer "{layer}")'
+               f' (net {net_codes.get(net, 0)}) (uuid "{uid}"))')
+    for net, x, y in tracks["vias"]:
+        at = xy(x, y)
+        yield (f'\n{indent}(via (at {at}) (size {VIA_SIZE}) (drill {VIA_DRILL}) (layers "F.Cu" "B.Cu")'
+               f' (net {net_codes.get(net, 0)}) (uuid "{stable_uuid("via", net, at)}"))')
+
+
+def route_board(pcb_path: str, routes_path: str, grid_mm: float = GRID_MM,
+                via_merge_mm: float = VIA_MERGE_MM) -> tuple[str, dict]:
+    """Board text with its routing replaced by the routes; returns (text, stats)."""
+    with open(routes_path, "r", encoding="utf-8") as f:
+        tracks = build_tracks(json.load(f), grid_mm, via_merge_mm)
+
+    pieces = []
+    net_codes: dict[str, int] = {}
+    indent = None
+    for head, raw in iter_top_level(pcb_path):
+        if head == "net":
+            m = NET_DECL_RE.search(raw)
+            if m:
+                net_codes[m.group(2)] = int(m.group(1))
+        if head in ROUTING_ITEMS:
+            continue
+        if indent is None and head not in ("", "version"):
+            indent = raw[:raw.index("(")].lstrip("\n") or "  "
+        pieces.append(raw)
+
+    unknown = sorted({net for net, *_rest in tracks["segments"] + tracks["vias"] if net not in net_codes})
+    tracks["stats"]["unknown_nets"] = unknown
+    records = "".join(track_records(tracks, net_codes, grid_mm, indent or "  "))
+    # The last piece is the board's closing parenthesis
+    return "".join(pieces[:-1]) + records + pieces[-1], tracks["stats"]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Write silixon_routes.json tracks into a .kicad_pcb as segments and vias.")
+    ap.add_argument("-i", "--input", default="output.kicad_pcb", help="Board to route")
+    ap.add_argument("-r", "--routes", default="silixon_routes.json", help="siliXon routes JSON")
+    ap.add_argument("-o", "--output", help="Routed board (default: overwrite the input)")
+    ap.add_argument("--grid", type=float, default=GRID_MM, help="Snap grid in mm")
+    ap.add_argument("--via-merge", type=float, default=VIA_MERGE_MM,
+                    help="Vias of a net closer than this (mm) are one via; other nets' are reported")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    text, stats = route_board(args.input, args.routes, args.grid, args.via_merge)
+    out = args.output or args.input
+    written = write_if_changed(out, text)
+    for net in stats["unknown_nets"]:
+        print(f"{net}: not a net of {args.input}; its tracks are on net 0")
+    print(f"{stats['points']} points -> {stats['segments']} segments, "
+          f"{stats['vias_in']} vias -> {stats['vias']}, {stats['via_clashes']} too close to another net "
+          f"({time.perf_counter() - t0:.2f} s)")
+    print(f"Wrote {out}" if written else f"{out} unchanged")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+sexpr_validate.py
+Single-pass structural check of generated KiCad S-expression files (.net, .kicad_pcb).
+
+Checks:
+- parentheses balance (stray ")", unclosed "(" with the line it was opened on,
+  anything after the root expression)
+- string quoting (unterminated strings, quotes glued onto bare atoms)
+- required top-level sections for the root kind (export / kicad_pcb)
+- references: .net nodes must name a component from (components); .kicad_pcb pads,
+  tracks, vias and zones must use a net code from the board's net table, with the
+  same name when they carry one; duplicate net codes / component refs
+
+The file is read in fixed-size chunks cut at line ends. Each chunk is split into
+strings and code with one regex, and the code on "(" with str.split, so the per-token
+work stays in C. Only the stack of open list heads (and their offsets) is kept, plus
+the net codes / component refs needed for the reference checks. Line numbers are
+worked out in a second pass, and only when something is wrong.
+"""
+
+import argparse
+import re
+import sys
+from itertools import accumulate
+
+from kicad_sexpr import unescape
+
+CHUNK_SIZE = 1 << 20
+MAX_ERRORS = 50
+
+# A closed string token (KiCad escapes newlines, so none spans a line)
+STRING_SPLIT_RE = re.compile(r'("[^"\\\n]*(?:\\[^\n][^"\\\n]*)*")')
+DELIMS = " \t\r\n()"
+
+REQUIRED = {
+    "export": ["version", "design", "components", "nets"],
+    "kicad_pcb": ["version", "general", "layers", "setup"],
+}
+# Leaf lists whose values are handed to Validator.leaf for the reference checks
+CAPTURE_PREFIXES = ("net ", "ref ", "code ", "net)", "ref)", "code)")
+CAPTURE_START = {"net", "ref", "cod"}  # cheap pre-check before startswith
+# A folded string (\x00) glued to a bare atom or to another string
+GLUED_RE = re.compile(r'[^\s()\x00]\x00|\x00[^\s()]')
+
+
+class Validator:
+    def __init__(self, max_errors: int = MAX_ERRORS):
+        self.max_errors = max_errors
+        self.errors: list[tuple[int, str]] = []  # (offset, message); -1 = whole file
+        self.error_count = 0
+        self.root = ""
+        self.sections: set[str] = set()
+        # .kicad_pcb: code -> name of the top-level net table; references seen before it
+        self.net_codes: dict[str, str] = {}
+        self.pending_nets: dict[str, tuple[int, str]] = {}
+        # .net: component refs, node refs seen before (components)
+        self.refs: set[str] = set()
+        self.pending_refs: dict[str, int] = {}
+        self.net_code_seen: set[str] = set()
+        self.where = lambda pos: pos
+
+    def error(self, offset: int, msg: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((offset, msg))
+
+    # ------------------------- semantic hooks ------------------------- #
+
+    def leaf(self, head: str, vals: list[str], depth: int, context, pos: int) -> None:
+        """
+        A captured leaf list (head vals...) closed at depth (1 = child of the root).
+        context(1) is the head of its parent, context(2) of the grandparent; pos is its
+        position in the current segment, which self.where turns into a file offset.
+        """
+        if self.root == "kicad_pcb" and head == "net":
+            if not vals or not vals[0].lstrip("-").isdigit():
+                return  # name-only net references (newer formats) carry nothing to check
+            code, name = vals[0], vals[1] if len(vals) > 1 else None
+            if depth == 1:
+                if code in self.net_codes:
+                    self.error(self.where(pos), f"duplicate net code {code}")
+                self.net_codes[code] = name or ""
+                pending = self.pending_nets.pop(code, None)
+                if pending and pending[1] is not None and pending[1] != (name or ""):
+                    self.error(pending[0], f"net {code} is named {pending[1]!r} here but {name!r} in the net table")
+            elif code in self.net_codes:
+                if name is not None and name != self.net_codes[code]:
+                    self.error(self.where(pos), f"{context(1)} uses net {code} as {name!r}, "
+                                                f"net table says {self.net_codes[code]!r}")
+            elif code != "0" or self.net_codes:
+                if code not in self.pending_nets:
+                    self.pending_nets[code] = (self.where(pos), name)
+
+        elif self.root == "export":
+            parent = context(1)
+            if head == "ref" and parent == "comp" and vals:
+                if vals[0] in self.refs:
+                    self.error(self.where(pos), f"duplicate component ref {vals[0]}")
+                self.refs.add(vals[0])
+                self.pending_refs.pop(vals[0], None)
+            elif head == "ref" and parent == "node" and vals and vals[0] not in self.refs:
+                if vals[0] not in self.pending_refs:
+                    self.pending_refs[vals[0]] = self.where(pos)
+            elif head == "code" and parent == "net" and context(2) == "nets" and vals:
+                if vals[0] in self.net_code_seen:
+                    self.error(self.where(pos), f"duplicate net code {vals[0]}")
+                self.net_code_seen.add(vals[0])
+
+    def finish(self) -> None:
+        missing = [s for s in REQUIRED.get(self.root, []) if s not in self.sections]
+        if missing:
+            self.error(-1, f"({self.root} ...) is missing required sections: {', '.join(missing)}")
+        if self.root == "kicad_pcb" and self.net_codes:
+            for code, (offset, _name) in self.pending_nets.items():
+                self.error(offset, f"net code {code} is not in the net table")
+        for ref, offset in self.pending_refs.items():
+            self.error(offset, f"node refers to unknown component {ref}")
+
+    # ------------------------- scanner ------------------------- #
+
+    def run(self, f, chunk_size: int = CHUNK_SIZE) -> None:
+        """Scan an open text stream; errors are recorded against character offsets."""
+        # Open lists, innermost last: the index of their piece in the current segment, or
+        # (text after "(", file offset) for lists carried over from an earlier segment
+        stack: list = []
+        root_closed = False
+        stray_reported = False   # only the first stray ")" / trailing list is reported
+        tail = ""
+        offset = 0               # file offset of the current segment
+
+        while True:
+            chunk = f.read(chunk_size)
+            text = tail + chunk
+            if chunk:
+                # Strings never hold a raw newline, so a segment cut after one never splits a token
+                cut = text.rfind("\n") + 1
+                if cut == 0:
+                    tail = text
+                    continue
+                seg, tail = text[:cut], text[cut:]
+            else:
+                seg, tail = text, ""
+            if not seg:
+                break
+
+            # Closed strings become one \x00 each, so parens inside them cannot confuse the scan
+            parts = STRING_SPLIT_RE.split(seg)
+            strings = parts[1::2]
+            code = "\x00".join(parts[0::2])
+            pieces = code.split("(")
+            # Piece i starts right after the "(" at code position ends[i - 1] + i - 1
+            ends = list(accumulate(map(len, pieces)))
+
+            def where(pos: int) -> int:
+                """File offset of code[pos]; only called when something needs reporting."""
+                k = code.count("\x00", 0, pos)
+                return offset + pos + sum(map(len, strings[:k])) - k
+
+            def opened_at(i: int) -> int:
+                return ends[i - 1] + i - 1
+
+            def text_of(entry) -> str:
+                return pieces[entry] if isinstance(entry, int) else entry[0]
+
+            self.where = where
+
+            if '"' in code:
+                # A quote left over after folding closed strings opens a string that never ends
+                self.error(where(code.index('"')), "unterminated string")
+            if "\x00" in code:
+                for m in GLUED_RE.finditer(code):
+                    self.error(where(m.start() + (m.group(0)[0] != "\x00")), "quote inside a bare atom")
+
+            sidx = sidx_at = 0   # number of strings before code position sidx_at
+            for i, piece in enumerate(pieces):
+                if i:
+                    if len(stack) < 2:
+                        head = _head(piece)
+                        if stack:
+                            self.sections.add(head)
+                        else:
+                            if root_closed and not stray_reported:
+                                self.error(where(opened_at(i)), "content after the root expression")
+                                stray_reported = True
+                            if not self.root:
+                                self.root = head
+                    stack.append(i)
+                    if piece[:3] in CAPTURE_START and piece.startswith(CAPTURE_PREFIXES) and ")" in piece:
+                        # A leaf: with strings folded away it always ends inside this piece
+                        pos = opened_at(i)
+                        sidx += code.count("\x00", sidx_at, pos)
+                        sidx_at = pos
+                        self._leaf(piece, stack, strings, sidx, pos, text_of)
+
+                n = piece.count(")")
+                if n:
+                    if n > len(stack):
+                        if not stray_reported:
+                            start = opened_at(i) + 1 if i else 0
+                            self.error(where(start + _nth(piece, ")", len(stack) + 1)), "unmatched ')'")
+                            stray_reported = True
+                        n = len(stack)
+                    if n:
+                        del stack[-n:]
+                        if not stack:
+                            root_closed = True
+
+            stack[:] = [e if not isinstance(e, int) else (pieces[e], where(opened_at(e))) for e in stack]
+            offset += len(seg)
+
+        for piece, opened in reversed(stack):
+            self.error(opened, f"unclosed ({_head(piece)} ...)")
+        if not self.root:
+            self.error(-1, "no S-expression found")
+        self.finish()
+
+    def _leaf(self, piece: str, stack: list, strings: list[str], k: int, pos: int, text_of) -> None:
+        """Collect the values of a captured leaf (strings[k] is its first string) and hand them to leaf()."""
+        toks = piece.split(")", 1)[0].split()
+        vals = []
+        for tok in toks[1:]:
+            if tok == "\x00":
+                val = strings[k][1:-1]
+                vals.append(unescape(val) if "\\" in val else val)
+                k += 1
+            else:
+                vals.append(tok)
+
+        def context(up: int) -> str:
+            return _head(text_of(stack[-1 - up])) if len(stack) > up else ""
+
+        self.leaf(toks[0], vals, len(stack) - 1, context, pos)
+
+
+def _head(piece: str) -> str:
+    """Head atom at the start of the text following a "("."""
+    words = piece.split(None, 1)
+    return words[0].split(")", 1)[0] if words else ""
+
+
+def _nth(s: str, ch: str, n: int) -> int:
+    i = -1
+    for _ in range(n):
+        i = s.index(ch, i + 1)
+    return i
+
+
+def offsets_to_lines(f, offsets: list[int], chunk_size: int = CHUNK_SIZE) -> dict[int, int]:
+    """Map character offsets to 1-based line numbers with one more streaming pass."""
+    wanted = sorted(set(o for o in offsets if o >= 0))
+    lines: dict[int, int] = {}
+    line, base, i = 1, 0, 0
+    while i < len(wanted):
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+        end = base + len(chunk)
+        while i < len(wanted) and wanted[i] < end:
+            lines[wanted[i]] = line + chunk.count("\n", 0, wanted[i] - base)
+            i += 1
+        line += chunk.count("\n")
+        base = end
+    return lines
+
+
+def validate(path: str, max_errors: int = MAX_ERRORS) -> list[tuple[int, str]]:
+    """Return [(line, message), ...] for path (line 0 = whole file); empty when valid."""
+    v = Validator(max_errors)
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        v.run(f)
+    if not v.errors:
+        return []
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        lines = offsets_to_lines(f, [o for o, _msg in v.errors])
+    return [(lines.get(o, 0), msg) for o, msg in v.errors]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Validate generated .net / .kicad_pcb files.")
+    ap.add_argument("files", nargs="+", help="Files to check")
+    ap.add_argument("--max-errors", type=int, default=MAX_ERRORS, help="Errors listed per file")
+    args = ap.parse_args()
+
+    failed = 0
+    for path in args.files:
+        errors = validate(path, args.max_errors)
+        if errors:
+            failed += 1
+            for line, msg in errors:
+                print(f"{path}:{line}: {msg}" if line else f"{path}: {msg}")
+        else:
+            print(f"{path}: OK")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+silixon_async.py
+asyncio API for the siliXon -> KiCad conversions, for use inside an async web server.
+
+    async for chunk in stream_netlist("silixon_pcb.json", netlist_bytes, bom=bom_rows):
+        await response.write(chunk)
+
+Inputs may be paths (str / os.PathLike) or in-memory: bytes for file content, or a
+dict / list for a JSON document (design, BOM). In-memory inputs are written to a
+private temporary directory for the duration of the conversion, so a netlist that
+.include's files by relative path should be given as a path.
+
+Every step of a conversion is its own executor job (the loop's default thread pool
+unless one is passed; the jobs are picklable, so a ProcessPoolExecutor works too):
+writing the in-memory inputs, formatting each section of the output and removing the
+temporary directory again, so the event loop never blocks on parsing or file I/O.
+Sections are formatted one after another and each is yielded, in chunks of at most
+chunk_size characters encoded (utf-8 by default), as soon as it is done, so the first
+bytes reach a streaming HTTP response while later sections are still being formatted.
+Sections are independent jobs, so the ones that need the connectivity re-read the
+inputs (the parse cache keeps that cheap). Conversions share no per-call state, so
+any number of them can run concurrently in one process.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import Executor
+from functools import partial
+from pathlib import Path
+from typing import AsyncIterator
+
+from old2__netlist_to_kicad_pcb import (footprint_section, kicad_footer, kicad_header, load_inputs, net_table,
+                                        outline_section)
+from silixon_to_kicad import (parse_components, parse_connectivity, parse_libparts, parse_libraries, parse_nets,
+                              preamble)
+
+CHUNK_SIZE = 64 * 1024
+
+Source = str | os.PathLike | bytes | dict | list
+
+
+def _materialize(folder: str, name: str, source: Source | None) -> str | None:
+    """Path for one input, writing in-memory content into folder first."""
+    if source is None or isinstance(source, (str, os.PathLike)):
+        return os.fspath(source) if source is not None else None
+    path = Path(folder) / name
+    if isinstance(source, (bytes, bytearray)):
+        path.write_bytes(source)
+    else:
+        path.write_text(json.dumps(source), encoding="utf-8")
+    return str(path)
+
+
+def _materialize_all(design: Source, netlist: Source, bom: Source | None) -> tuple:
+    """
+    (folder, json_path, netlist_path, bom_path); folder is a new private temporary
+    directory holding the in-memory inputs, or None when every input is a path.
+    """
+    if all(source is None or isinstance(source, (str, os.PathLike)) for source in (design, netlist, bom)):
+        return None, *(_materialize("", "", source) for source in (design, netlist, bom))
+    folder = tempfile.mkdtemp(prefix="silixon-")
+    try:
+        return (folder,
+                _materialize(folder, "silixon_pcb.json", design),
+                _materialize(folder, "silixon_netlist.txt", netlist),
+                _materialize(folder, "silixon_bom.json", bom))
+    except BaseException:
+        shutil.rmtree(folder, ignore_errors=True)
+        raise
+
+
+def _pcb_nets(json_path: str, netlist_path: str, bom_path: str) -> str:
+    return net_table(parse_connectivity(json_path, netlist_path)[0])
+
+
+def _pcb_footprints(json_path: str, netlist_path: str, bom_path: str) -> str:
+    return footprint_section(*load_inputs(netlist_path, bom_path, json_path))
+
+
+def _pcb_outline(json_path: str, netlist_path: str, bom_path: str) -> str:
+    with open(json_path) as f:
+        return outline_section(json.load(f))
+
+
+def _netlist_components(json_path: str, netlist_path: str, bom_path: str | None) -> str:
+    return "\n" + parse_components(json_path, bom_path)
+
+
+def _netlist_libparts(symbols: dict | None, json_path: str, netlist_path: str, bom_path: str | None) -> str:
+    return "\n" + parse_libparts(json_path, netlist_path, symbols)
+
+
+def _netlist_libraries(json_path: str, netlist_path: str, bom_path: str | None) -> str:
+    return "\n" + parse_libraries(json_path)
+
+
+def _netlist_nets(symbols: dict | None, json_path: str, netlist_path: str, bom_path: str | None) -> str:
+    return "\n" + parse_nets(json_path, netlist_path, symbols)
+
+
+async def _stream(design: Source, netlist: Source, bom: Source | None, sections: list,
+                  executor: Executor | None, chunk_size: int, encoding: str | None
+                  ) -> AsyncIterator[str | bytes]:
+    """
+    Yield sections in chunks, one executor job per section. Each section is a fixed
+    string or section(json_path, netlist_path, bom_path) -> str, called with the
+    materialized inputs.
+    """
+    loop = asyncio.get_running_loop()
+    folder, *paths = await loop.run_in_executor(executor, _materialize_all, design, netlist, bom)
+    try:
+        for section in sections:
+            text = section if isinstance(section, str) else await loop.run_in_executor(executor, section, *paths)
+            for start in range(0, len(text), chunk_size):
+                chunk = text[start:start + chunk_size]
+                yield chunk.encode(encoding) if encoding else chunk
+    finally:
+        if folder is not None:
+            # shielded: cancelling the consumer must not cancel the clean-up job
+            await asyncio.shield(loop.run_in_executor(executor, partial(shutil.rmtree, folder, True)))
+
+
+async def stream_netlist(design: Source, netlist: Source, bom: Source | None = None, *,
+                         symbols: dict | None = None, executor: Executor | None = None,
+                         chunk_size: int = CHUNK_SIZE, encoding: str | None = "utf-8"
+                         ) -> AsyncIterator[str | bytes]:
+    """Yield the KiCad .net for a design, same text as silixon_to_kicad.build_netlist."""
+    sections = [
+        preamble(),
+        _netlist_components,
+        partial(_netlist_libparts, symbols),
+        _netlist_libraries,
+        partial(_netlist_nets, symbols),
+        ")\n",
+    ]
+    async for chunk in _stream(design, netlist, bom, sections, executor, chunk_size, encoding):
+        yield chunk
+
+
+async def stream_pcb(design: Source, netlist: Source, bom: Source, *, executor: Executor | None = None,
+                     chunk_size: int = CHUNK_SIZE, encoding: str | None = "utf-8"
+                     ) -> AsyncIterator[str | bytes]:
+    """Yield the .kicad_pcb for a design, same text as old2__netlist_to_kicad_pcb.build_pcb."""
+    sections = [kicad_header, _pcb_nets, _pcb_footprints, _pcb_outline, kicad_footer]
+    async for chunk in _stream(design, netlist, bom, sections, executor, chunk_size, encoding):
+        yield chunk
+
+
+async def convert_netlist(design: Source, netlist: Source, bom: Source | None = None, **kwargs) -> str:
+    """Whole .net text (for callers that do not stream)."""
+    return "".join([chunk async for chunk in stream_netlist(design, netlist, bom, encoding=None, **kwargs)])
+
+
+async def convert_pcb(design: Source, netlist: Source, bom: Source, **kwargs) -> str:
+    """Whole .kicad_pcb text (for callers that do not stream)."""
+    return "".join([chunk async for chunk in stream_pcb(design, netlist, bom, encoding=None, **kwargs)])
+
+
+async def _run_jobs(args) -> None:
+    async def one(n: int) -> int:
+        stream = stream_pcb if args.kind == "pcb" else stream_netlist
+        size = 0
+        with open(Path(args.outdir) / f"out{n}.{'kicad_pcb' if args.kind == 'pcb' else 'net'}", "wb") as f:
+            async for chunk in stream(args.pcb, args.netlist, args.bom):
+                f.write(chunk)
+                size += len(chunk)
+        return size
+
+    t0 = time.perf_counter()
+    sizes = await asyncio.gather(*(one(n) for n in range(args.jobs)))
+    print(f"{args.jobs} concurrent conversions, {sum(sizes)} bytes in {time.perf_counter() - t0:.2f} s")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Run concurrent siliXon -> KiCad conversions through the async API.")
+    ap.add_argument("kind", choices=["net", "pcb"], help="Output kind")
+    ap.add_argument("--pcb", default="silixon_pcb.json", help="siliXon design JSON")
+    ap.add_argument("--netlist", default="silixon_netlist.txt", help="siliXon SPICE-like netlist")
+    ap.add_argument("--bom", default="silixon_bom.json", help="siliXon BOM JSON")
+    ap.add_argument("-j", "--jobs", type=int, default=4, help="Concurrent conversions")
+    ap.add_argument("-o", "--outdir", default=".", help="Output directory")
+    args = ap.parse_args()
+    asyncio.run(_run_jobs(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""join siliXon _bom.json onto the design components and build an aggregated BOM"""
+
+
+import argparse
+import csv
+import json
+from pathlib import Path
+
+
+# BOM column -> component field added by enrich_components
+BOM_FIELDS = {
+    "manufacturer": "manufacturer",
+    "part_number": "mpn",
+    "supplier": "supplier",
+    "supplier_part_number": "supplier_part_number",
+    "datasheet": "datasheet",
+    "description": "description",
+    "package": "package",
+    "unit_price": "unit_price",
+}
+
+
+def load_bom(bom_path: str) -> list[dict]:
+    """Return the BOM rows from silixon_bom.json (empty list if the file is missing)."""
+    path = Path(bom_path)
+    if not path.is_file():
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def index_bom(rows: list[dict]) -> dict[str, dict]:
+    """
+    Build a reference -> BOM row index in one pass.
+    Rows that cover several parts ("R1, R2" or "R1 R2") are indexed under each reference.
+    """
+    index: dict[str, dict] = {}
+    for row in rows:
+        refs = str(row.get("reference", "")).replace(",", " ").split()
+        for ref in refs:
+            index.setdefault(ref, row)
+    return index
+
+
+def enrich_component(comp: dict, bom_index: dict[str, dict]) -> dict:
+    """
+    Copy BOM fields (MPN, supplier part number, datasheet, ...) onto comp if its uid
+    has a BOM row. Existing component values are never overwritten.
+    """
+    row = bom_index.get(comp.get("uid", ""))
+    if row is not None:
+        for bom_key, comp_key in BOM_FIELDS.items():
+            value = row.get(bom_key)
+            if value not in (None, "") and comp_key not in comp:
+                comp[comp_key] = value
+    return comp
+
+
+def enrich_components(components: list[dict], bom_index: dict[str, dict]) -> list[dict]:
+    """Enrich every component in place; returns the same list for chaining."""
+    for comp in components:
+        enrich_component(comp, bom_index)
+    return components
+
+
+def aggregate_bom(components: list[dict]) -> tuple[list[dict], float]:
+    """
+    Group identical parts into BOM lines.
+    Parts are identical when manufacturer + MPN match; parts without an MPN fall back
+    to (type, value, package). Returns (lines, total_cost).
+    """
+    groups: dict[tuple, dict] = {}
+    for comp in components:
+        mpn = comp.get("mpn")
+        if mpn:
+            key = ("mpn", comp.get("manufacturer", ""), mpn)
+        else:
+            key = ("generic", comp.get("type", ""), comp.get("value", ""), comp.get("package", ""))
+        line = groups.get(key)
+        if line is None:
+            line = groups[key] = {
+                "references": [],
+                "quantity": 0,
+                "value": comp.get("value", ""),
+                "manufacturer": comp.get("manufacturer", ""),
+                "mpn": mpn or "",
+                "supplier": comp.get("supplier", ""),
+                "supplier_part_number": comp.get("supplier_part_number", ""),
+                "unit_price": comp.get("unit_price") or 0.0,
+                "total_price": 0.0,
+            }
+        line["references"].append(comp.get("uid", "?"))
+        line["quantity"] += 1
+
+    total = 0.0
+    for line in groups.values():
+        line["total_price"] = round(line["unit_price"] * line["quantity"], 4)
+        total += line["total_price"]
+    return list(groups.values()), round(total, 4)
+
+
+def write_bom_csv(lines: list[dict], total: float, out_path: str) -> None:
+    columns = ["references", "quantity", "value", "manufacturer", "mpn",
+               "supplier", "supplier_part_number", "unit_price", "total_price"]
+    with open(out_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for line in lines:
+            row = dict(line, references=" ".join(line["references"]))
+            writer.writerow([row[c] for c in columns])
+        writer.writerow(["TOTAL", "", "", "", "", "", "", "", total])
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Join silixon_bom.json onto the design and write an aggregated BOM.")
+    ap.add_argument("--pcb", default="silixon_pcb.json", help="siliXon design JSON")
+    ap.add_argument("--bom", default="silixon_bom.json", help="siliXon BOM JSON")
+    ap.add_argument("-o", "--output", default="silixon_bom_aggregated.csv", help="Aggregated BOM (.csv)")
+    args = ap.parse_args()
+
+    with open(args.pcb, "r", encoding="utf-8") as f:
+        components = json.load(f).get("components", [])
+
+    enrich_components(components, index_bom(load_bom(args.bom)))
+    lines, total = aggregate_bom(components)
+    write_bom_csv(lines, total, args.output)
+    print(f"Wrote {args.output} ({len(lines)} lines, total {total:.2f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""incremental reader for silixon_pcb.json: yields components one by one instead of json.load-ing the whole export"""
+
+
+import json
+from typing import Any, Iterator
+
+
+CHUNK_SIZE = 1 << 16
+WHITESPACE = " \t\r\n"
+
+_decoder = json.JSONDecoder()
+
+
+class _Buffer:
+    """Sliding text window over a file; only the unconsumed tail is kept in memory."""
+
+    def __init__(self, f, chunk_size: int = CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Read one more chunk; False once the file is exhausted."""
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        if self.pos:
+            self.text = self.text[self.pos:]
+            self.pos = 0
+        self.text += chunk
+        return True
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character ('' at EOF)."""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, ch: str) -> None:
+        got = self.peek()
+        if got != ch:
+            raise ValueError(f"expected {ch!r} at offset {self.pos}, got {got!r}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Decode the next complete JSON value, reading more input until it fits."""
+        self.peek()
+        while True:
+            try:
+                obj, end = _decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # A number at the very end of the window may still be growing
+            if end == len(self.text) and not self.eof and self.fill():
+                continue
+            self.pos = end
+            return obj
+
+
+def iter_top_level(json_path: str, stream_key: str = "components") -> Iterator[tuple[str, Any]]:
+    """
+    Walk the top-level object of a siliXon JSON export.
+    Every key yields (key, value) once, except stream_key whose array is yielded
+    element by element as (stream_key, element).
+    """
+    with open(json_path, "r", encoding="utf-8") as f:
+        buf = _Buffer(f)
+        buf.expect("{")
+        if buf.peek() == "}":
+            return
+        while True:
+            key = buf.value()
+            buf.expect(":")
+            if key == stream_key and buf.peek() == "[":
+                buf.expect("[")
+                if buf.peek() == "]":
+                    buf.pos += 1
+                else:
+                    while True:
+                        yield key, buf.value()
+                        if buf.peek() == "]":
+                            buf.pos += 1
+                            break
+                        buf.expect(",")
+            else:
+                yield key, buf.value()
+            if buf.peek() == "}":
+                return
+            buf.expect(",")
+
+
+def iter_components(json_path: str) -> Iterator[dict]:
+    """Yield each object of the "components" array without loading the rest of the file."""
+    for key, value in iter_top_level(json_path):
+        if key == "components":
+            yield value
+
+
+def read_board(json_path: str) -> dict:
+    """Return the "board" block; components are skipped one at a time, never held together."""
+    for key, value in iter_top_level(json_path):
+        if key == "board":
+            return value
+    return {}
@@ -1,15 +1,24 @@
 """convert between siliXon project using pcb.json and _netlist.txt to give kicad_converted.net"""
 
 
-import json
 import re
+import warnings
 from pathlib import Path
-import random
-import datetime
+from typing import Any, Iterable, Iterator
 
+from kicad_sexpr import quote
+from net_alias import DEFAULT_ALIASES, NetAliases, build_aliases
+from sexpr_validate import validate
+from silixon_bom import enrich_component, index_bom, load_bom
+from silixon_json_stream import iter_components
+from spice_include import resolve_records
+from stable_output import build_date, stable_hex, write_if_changed
+from symbol_lib import load_symbol_index, lookup_pins, pin_numbers
 
-def preamble():
-    today = datetime.date.today().isoformat()
+
+def preamble() -> str:
+    """Header of the netlist; its date is stable_output.build_date."""
+    today = build_date().date().isoformat()
     return f"""(export (version D)
   (design
     (tool "Eeschema (5.0.2)-1")
@@ -42,39 +51,89 @@ def preamble():
       (tstamp 5C64041E))"""
     
 
-def parse_components(json_path: str) -> str:
-    """Return a KiCad (components ...) section generated from silixon_pcb.json."""
-    with open(json_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    comps = data.get("components", [])
-    footprint_map = {
-        "resistor": "Resistor_SMD:R_0402_1005Metric",
-        "capacitor": "Capacitor_SMD:C_0805_2012Metric",
-        "switch": "Button_Switch_THT:SW_PUSH_6mm",
-        "lcd": "Display:LCD-016N002L",
-        "mcu": "Package_QFP:LQFP-64_10x10mm_P0.5mm",
-    }
+# (KiCad field name, component key) emitted when the BOM has been joined in
+COMPONENT_FIELDS = [
+    ("Manufacturer", "manufacturer"),
+    ("MPN", "mpn"),
+    ("Supplier", "supplier"),
+    ("SupplierPN", "supplier_part_number"),
+]
+
+FOOTPRINT_MAP = {
+    "resistor": "Resistor_SMD:R_0402_1005Metric",
+    "capacitor": "Capacitor_SMD:C_0805_2012Metric",
+    "switch": "Button_Switch_THT:SW_PUSH_6mm",
+    "lcd": "Display:LCD-016N002L",
+    "mcu": "Package_QFP:LQFP-64_10x10mm_P0.5mm",
+}
+
+def component_footprint(c: dict) -> str:
+    """Footprint the netlist assigns to a component: by type, else its component_path name."""
+    return FOOTPRINT_MAP.get(c.get("type", "").lower()) or c.get("component_path", "").split("/")[-1]
+
+# Component keys that decide the invariant part of a (comp ...) block
+COMPONENT_KEYS = ("type", "value", "component_path", "datasheet") + tuple(key for _name, key in COMPONENT_FIELDS)
+
+def component_body(c: dict) -> str:
+    """
+    The (value ...) through (sheetpath ...) lines of a (comp ...) block. They are the
+    same for every instance of a part, so each distinct part is formatted only once.
+    """
+    value = c.get("value", "")
+    ctype = c.get("type", "").lower()
+    lines = []
+    lines.append(f"    (value {quote(value)})")
+    lines.append(f"    (footprint {component_footprint(c)})")
+    datasheet = c.get("datasheet")
+    lines.append(f"    (datasheet {quote(datasheet) if datasheet else '~'})")
+    fields = [(name, c[key]) for name, key in COMPONENT_FIELDS if c.get(key)]
+    if fields:
+        lines.append(f"    (fields")
+        for name, val in fields:
+            lines.append(f"      (field (name {name}) {quote(str(val))})")
+        lines[-1] += ")"
+    # The same (lib, part) the component's libpart is written under
+    lib, part = libpart_key(c)
+    description = f"{ctype} {value}".strip()
+    lines.append(f"    (libsource (lib {lib}) (part {quote(part)}) (description {quote(description)}))")
+    lines.append(f"    (sheetpath (names /) (tstamps /))")
+    return "\n".join(lines)
 
+def format_component(c: dict, bodies: dict[tuple, str] | None = None) -> str:
+    """
+    Return one (comp ...) block for a silixon_pcb.json component. bodies caches the
+    component_body of each distinct part; the caller owns it (one per section built).
+    """
+    ref = c.get("uid", "U?")
+    if bodies is None:
+        body = component_body(c)
+    else:
+        key = tuple(map(c.get, COMPONENT_KEYS))
+        if not key[1]:
+            key += (ref,)   # the part name falls back to the ref
+        body = bodies.get(key)
+        if body is None:
+            body = bodies[key] = component_body(c)
+    # Derived from the ref, so the same design always gets the same tstamps
+    return f"  (comp (ref {ref})\n{body}\n    (tstamp 000000-{stable_hex('comp', ref, digits=6)}-{ref}))"
+
+def parse_components(json_path: str, bom_path: str | None = None) -> str:
+    """
+    Return a KiCad (components ...) section generated from silixon_pcb.json.
+    If bom_path is given, components are enriched from silixon_bom.json and get
+    MPN / Manufacturer / Supplier fields plus their datasheet.
+    """
+    bom_index = index_bom(load_bom(bom_path)) if bom_path else {}
+    return format_components(iter_components(json_path), bom_index)
+
+def format_components(components: Iterable[dict], bom_index: dict[str, dict]) -> str:
+    """(components ...) section; components are enriched in place when bom_index is not empty."""
     lines = ["(components"]
-    for c in comps:
-        ref = c.get("uid", "U?")
-        value = c.get("value", "")
-        ctype = c.get("type", "").lower()
-        footprint = footprint_map.get(ctype) or c.get("component_path", "").split("/")[-1]
-        description = f"{ctype} {value}".strip()
-        # Minimal lib + part placeholders
-        lib = ctype or "lib"
-        part = value or ref
-        tstamp = ref  # simple deterministic placeholder
-
-        lines.append(f"  (comp (ref {ref})")
-        lines.append(f"    (value {value})")
-        lines.append(f"    (footprint {footprint})")
-        lines.append(f"    (datasheet ~)")
-        lines.append(f"    (libsource (lib {lib}) (part {part}) (description \"{description}\"))")
-        lines.append(f"    (sheetpath (names /) (tstamps /))")
-        lines.append(f"    (tstamp 000000-{random.randint(0, 0xFFFFF):06x}-{tstamp}))")
+    bodies: dict[tuple, str] = {}
+    for c in components:
+        if bom_index:
+            enrich_component(c, bom_index)
+        lines.append(format_component(c, bodies))
 
     lines.append(")")
     return "\n".join(lines)
@@ -126,113 +185,170 @@ def parse_components(json_path: str) -> str:
             (pin (num 3) (name Pin_3) (type passive))
             (pin (num 4) (name Pin_4) (type passive))))"""
 
-def parse_libparts(json_path: str, netlist_path: str = "silixon_netlist.txt") -> str:
-    """Return a KiCad (libparts ...) section generated from silixon_pcb.json and silixon_netlist.txt."""
-    with open(json_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    components = data.get("components", [])
+def read_netlist_records(netlist_path: str) -> list[str]:
+    """
+    Return the logical lines of a SPICE-like netlist: backslash continuations merged,
+    '*' comment lines, inline '; ...' comments and .END dropped, .include / .lib files
+    inlined and .param expressions substituted (see spice_include). Missing file -> [].
+    """
+    return resolve_records(netlist_path)
 
-    # Parse netlist to extract ordered pin names for parts starting with X (subcircuits)
+def subckt_pin_order(records: list[str]) -> dict[str, list[str]]:
+    """
+    Ordered PIN names of every subcircuit instance (XRef PIN=NET ... name.subckt), keyed
+    by ref; names from several records of one ref are merged in first-seen order.
+    """
     ref_pin_order = {}
-    if Path(netlist_path).is_file():
-        with open(netlist_path, "r", encoding="utf-8") as nf:
-            raw_lines = [ln.rstrip() for ln in nf]
-
-        # Merge continuation lines ending with "\" into single logical lines
-        logical = []
-        buf = ""
-        for ln in raw_lines:
-            line = ln.strip()
-            if not line or line.startswith("*"):  # skip comments / empty
-                if buf:
-                    logical.append(buf.strip())
-                    buf = ""
-                continue
-            if line.endswith("\\"):
-                buf += " " + line[:-1].strip()
-            else:
-                buf += " " + line
-                logical.append(buf.strip())
-                buf = ""
-        if buf:
-            logical.append(buf.strip())
-
-        for line in logical:
-            # Subcircuit instances start with X<ref> ...
-            if line.startswith("X") and len(line) > 2:
-                tokens = line.split()
-                inst = tokens[0]  # e.g. XU2
-                ref = inst[1:]    # U2
-                pin_names = []
-                # Tokens after the instance until we hit something that looks like a .subckt name (endswith .subckt)
-                for tok in tokens[1:]:
-                    if tok.upper().endswith(".SUBCKT"):
-                        break
-                    if "=" in tok:
-                        left, _right = tok.split("=", 1)
-                        pin_names.append(left)
-                if pin_names:
-                    ref_pin_order[ref] = pin_names
-
-    lib_map = {
-        "resistor": "Resistor",
-        "capacitor": "Capacitor",
-        "switch": "Switch",
-        "lcd": "Display",  # treat LCD like a connector-style symbol
-        "mcu": "MCU"
-    }
+    for line in records:
+        # Subcircuit instances start with X<ref> ...
+        if line.startswith("X") and len(line) > 2:
+            tokens = line.split()
+            inst = tokens[0]  # e.g. XU2
+            ref = inst[1:]    # U2
+            pin_names = []
+            # Tokens after the instance until we hit something that looks like a .subckt name (endswith .subckt)
+            for tok in tokens[1:]:
+                if tok.upper().endswith(".SUBCKT"):
+                    break
+                if "=" in tok:
+                    left, _right = tok.split("=", 1)
+                    pin_names.append(left)
+            if pin_names:
+                names = ref_pin_order.setdefault(ref, [])
+                names += [name for name in dict.fromkeys(pin_names) if name not in names]
+    return ref_pin_order
+
+LIB_MAP = {
+    "resistor": "Resistor",
+    "capacitor": "Capacitor",
+    "switch": "Switch",
+    "lcd": "Display",
+    "mcu": "MCU"
+}
+
+FOOTPRINT_PATTERNS = {
+    "resistor": "Resistor*",
+    "capacitor": "Capacitor*",
+    "switch": "SW*",
+    "lcd": "Display*",
+    "mcu": "QFP*"
+}
+
+POWER_NAMES = {"VCC", "VDD", "VSS", "GND", "0"}
+
+def pin_type(name: str) -> str:
+    upper = name.upper()
+    if upper in POWER_NAMES:
+        return "power_in"
+    return "passive"
+
+def symbol_pins(comp: dict, symbols: dict | None) -> list[list[str]] | None:
+    """
+    [[num, name, type], ...] of comp's library symbol, if indexed: its "symbol" field,
+    else the part its value names. A value (10k, SPST) can name an unrelated part, so
+    that match is only used when the symbol has every pin the JSON lists; otherwise it
+    is dropped with a warning.
+    """
+    if comp.get("symbol"):
+        return lookup_pins(symbols, comp["symbol"])
+    pins = lookup_pins(symbols, comp.get("value", ""))
+    if pins is None:
+        return None
+    known = pin_numbers(pins)
+    if all(p in known for p in comp.get("pins", [])):
+        return pins
+    warnings.warn(f"{comp.get('uid')}: value {comp.get('value')} names a library symbol without its pins; "
+                  f"set \"symbol\" to use one")
+    return None
+
+def component_pins(comp: dict, sym_pins: list[list[str]] | None = None, netlist_pins: Iterable[str] = ()
+                   ) -> tuple[list[str], dict[str, str], list[str] | None]:
+    """
+    (pin order, pin name -> number, pin numbers by position) used to number comp's nodes
+    and its libpart pins. Without a symbol the JSON pins are numbered 1..N, followed by
+    the netlist_pins (subckt_pin_order) the JSON lacks, and the positional numbers are None.
+    """
+    if sym_pins:
+        return [name for _num, name, _type in sym_pins], pin_numbers(sym_pins), [num for num, _n, _t in sym_pins]
+    pins = list(comp.get("pins", []))
+    pins += [name for name in netlist_pins if name not in pins]
+    return pins, {pname: str(i) for i, pname in enumerate(pins, start=1)}, None
+
+def libpart_key(comp: dict) -> tuple[str, str]:
+    """(lib, part) of the symbol a component uses; its libsource and its libpart both name it."""
+    lib = LIB_MAP.get(comp.get("type", "").lower(), "Generic")
+    part = comp.get("value", "") or comp.get("uid", "U?")
+    return lib, part
+
+def format_libpart(comp: dict, ordered_pin_names: list[str], sym_pins: list[list[str]] | None = None) -> str:
+    """
+    Return one (libpart ...) block for comp with pins in the given order, or with the
+    real numbers, names and types of its library symbol when sym_pins is given.
+    """
+    ctype = comp.get("type", "").lower()
+    ref = comp.get("uid", "U?")
+    value = comp.get("value", "")
+    lib, part = libpart_key(comp)
+    footprint_pat = FOOTPRINT_PATTERNS.get(ctype, f"{lib}*")
+    description = f"{ctype} {value}".strip()
+
+    lines = []
+    lines.append(f"    (libpart (lib {lib}) (part {quote(part)})")
+    lines.append(f"    (description {quote(description)})")
+    lines.append(f"    (docs ~)")
+    lines.append(f"    (footprints")
+    lines.append(f"        (fp {footprint_pat}))")
+    lines.append(f"    (fields")
+    lines.append(f"        (field (name Reference) {ref[0] if ref else 'U'})")
+    lines.append(f"        (field (name Value) {quote(part)}))")
+    lines.append(f"    (pins")
+
+    if sym_pins:
+        for num, pname, ptype in sym_pins:
+            lines.append(f"        (pin (num {num}) (name {quote_net(pname)}) (type {ptype}))")
+        lines.append(f"    ))")  # close libpart
+        return "\n".join(lines)
 
-    footprint_patterns = {
-        "resistor": "Resistor*",
-        "capacitor": "Capacitor*",
-        "switch": "SW*",
-        "lcd": "Display*",
-        "mcu": "QFP*"
-    }
+    # Assign numeric pin numbers sequentially
+    for idx, pname in enumerate(ordered_pin_names, start=1):
+        # If the name is purely numeric, follow example style Pin_#
+        display_name = f"Pin_{pname}" if pname.isdigit() else pname
+        lines.append(f"        (pin (num {idx}) (name {display_name}) (type {pin_type(pname)}))")
 
-    power_names = {"VCC", "VDD", "VSS", "GND", "0"}
+    lines.append(f"    ))")  # close libpart
+    return "\n".join(lines)
 
-    def pin_type(name: str) -> str:
-        upper = name.upper()
-        if upper in power_names:
-            return "power_in"
-        return "passive"
+def parse_libparts(json_path: str, netlist_path: str = "silixon_netlist.txt",
+                   symbols: dict | None = None) -> str:
+    """
+    Return a KiCad (libparts ...) section generated from silixon_pcb.json and silixon_netlist.txt.
+    Components found in the symbol index (symbol_lib.load_symbol_index) get their library pins.
+    """
+    return format_libparts(iter_components(json_path), read_netlist_records(netlist_path), symbols)
+
+def format_libparts(components: Iterable[dict], records: list[str], symbols: dict | None = None) -> str:
+    """(libparts ...) section for components and the netlist records."""
+    # Pin names subcircuit instances (XU1 ...) add to the JSON ones
+    ref_pin_order = subckt_pin_order(records)
 
     lines = ["(libparts"]
+    # One libpart per (lib, part): every component of that part points at it through
+    # its (libsource (lib ..) (part ..)), so the first component's pins describe it.
+    emitted: set[tuple] = set()
     for comp in components:
-        ctype = comp.get("type", "").lower()
-        ref = comp.get("uid", "U?")
-        value = comp.get("value", "")
-        pins_from_json = comp.get("pins", [])
-        # Prefer order from netlist if available
-        ordered_pin_names = ref_pin_order.get(ref, pins_from_json)
+        # Numbered like the component's nodes (pin_tables)
+        sym_pins = symbol_pins(comp, symbols)
+        ordered_pin_names = component_pins(comp, sym_pins, ref_pin_order.get(comp.get("uid", "U?"), ()))[0]
 
         # Fallback: if still empty, skip
-        if not ordered_pin_names:
+        if not ordered_pin_names and not sym_pins:
             continue
 
-        lib = lib_map.get(ctype, "Generic")
-        footprint_pat = footprint_patterns.get(ctype, f"{lib}*")
-        description = f"{ctype} {value}".strip()
-
-        lines.append(f"    (libpart (lib {lib}) (part {value or ref})")
-        lines.append(f"    (description \"{description}\")")
-        lines.append(f"    (docs ~)")
-        lines.append(f"    (footprints")
-        lines.append(f"        (fp {footprint_pat}))")
-        lines.append(f"    (fields")
-        lines.append(f"        (field (name Reference) {ref[0] if ref else 'U'})")
-        lines.append(f"        (field (name Value) {value or ref}))")
-        lines.append(f"    (pins")
-
-        # Assign numeric pin numbers sequentially
-        for idx, pname in enumerate(ordered_pin_names, start=1):
-            # If the name is purely numeric, follow example style Pin_#
-            display_name = f"Pin_{pname}" if pname.isdigit() else pname
-            lines.append(f"        (pin (num {idx}) (name {display_name}) (type {pin_type(pname)}))")
-
-        lines.append(f"    ))")  # close libpart
+        key = libpart_key(comp)
+        if key in emitted:
+            continue
+        emitted.add(key)
+        lines.append(format_libpart(comp, ordered_pin_names, sym_pins))
 
     lines.append(")")
     return "\n".join(lines)
@@ -255,30 +371,11 @@ def parse_libparts(json_path: str, netlist_path: str = "silixon_netlist.txt") ->
         (library (logical atmega48pv-10pu)
         (uri "C:/Users/Mark/Documents/KiCAD projects/symbols/atmega48pv-10pu.lib")))"""
 
-def parse_libraries(json_path: str) -> str:
-    with open(json_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    components = data.get("components", [])
-
-    # Must mirror lib_map in parse_libparts to stay consistent
-    lib_map = {
-        "resistor": "Resistor",
-        "capacitor": "Capacitor",
-        "switch": "Switch",
-        "lcd": "Connector",
-        "mcu": "MCU"
-    }
-
-    ordered_libs = []
-    seen = set()
-    for comp in components:
-        ctype = comp.get("type", "").lower()
-        lib = lib_map.get(ctype, "Generic")
-        if lib not in seen:
-            ordered_libs.append(lib)
-            seen.add(lib)
+def library_name(comp: dict) -> str:
+    """Library of comp's libpart (LIB_MAP), so (libraries ...) lists what the libparts use."""
+    return libpart_key(comp)[0]
 
+def format_libraries(ordered_libs: list[str]) -> str:
     def uri_for(lib: str) -> str:
         # Placeholder URI pattern (adjust as needed)
         return f"./symbols/{lib}.lib"
@@ -290,6 +387,20 @@ def parse_libraries(json_path: str) -> str:
     lines.append(")")
     return "\n".join(lines)
 
+def parse_libraries(json_path: str) -> str:
+    return format_libraries(ordered_libraries(iter_components(json_path)))
+
+def ordered_libraries(components: Iterable[dict]) -> list[str]:
+    """Library names used by components, in first-use order."""
+    ordered_libs = []
+    seen = set()
+    for comp in components:
+        lib = library_name(comp)
+        if lib not in seen:
+            ordered_libs.append(lib)
+            seen.add(lib)
+    return ordered_libs
+
 """EXAMPLE:
     (nets
         (net (code 1) (name SDA)
@@ -430,165 +541,431 @@ def parse_libraries(json_path: str) -> str:
         (node (ref J3) (pin 4)))))
         """
 
-def parse_nets(json_path: str, netlist_path: str = "silixon_netlist.txt") -> str:
-    """
-    Build a (nets ...) section by correlating:
-      - Pins declared in silixon_pcb.json (defines pin ordering -> pin numbers)
-      - Electrical connectivity described in silixon_netlist.txt
-    Rules:
-      * For primitive parts (R1, C1, etc.): first N tokens after ref (where N = pin count) are nets.
-      * For subcircuit instances (XRef ... PIN=NET ... name.subckt): use explicit PIN=NET pairs.
-      * If the netlist references a pin name not present in JSON, append that pin name at the end
-        (assigning the next sequential pin number) so it still appears in nets output.
-      * Ground aliases "0" become GND.
-      * Quote net names that contain characters outside [A-Za-z0-9_~] or contain parentheses.
-    """
-    with open(json_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    comps = data.get("components", [])
+def normalize_net(raw: str, aliases: NetAliases | None = None) -> str:
+    """Canonical name of a netlist net (see net_alias; default: the configured aliases only)."""
+    return (aliases or DEFAULT_ALIASES).canonical(raw)
 
-    # Pin ordering (list) and mapping name->num for each component reference
-    comp_pin_order: dict[str, list[str]] = {}
-    comp_pin_name_to_num: dict[str, dict[str, str]] = {}
+def record_ref(line: str) -> str:
+    """Component reference a netlist record belongs to (XU1 ... -> U1, R1 ... -> R1)."""
+    tok = line.split(None, 1)[0]
+    return tok[1:] if line.startswith("X") and len(line) > 2 else tok
 
-    for c in comps:
-        ref = c.get("uid")
-        pins = c.get("pins", [])
-        comp_pin_order[ref] = list(pins)
-        comp_pin_name_to_num[ref] = {pname: str(i) for i, pname in enumerate(pins, start=1)}
+def record_nodes(line: str, pins: list[str], pin_nums: dict[str, str],
+                 numbers: list[str] | None = None, aliases: NetAliases | None = None
+                 ) -> list[tuple[str, str]]:
+    """
+    Return the [(net_name, pin_num), ...] one netlist record connects for its component.
+    pins / pin_nums / numbers are the component's pin order, name -> number map and
+    positional numbers (see component_pins). Without a library symbol (numbers is None),
+    subcircuit pin names missing from them are appended (next sequential number) in
+    place; with one, an unknown pin name is an error. Net names are resolved through
+    aliases (normalize_net).
+    """
+    toks = line.split()
+    nodes = []
+
+    # Subcircuit style: XU1 PIN=NET ... name.subckt
+    if line.startswith("X") and len(line) > 2:
+        for tok in toks[1:]:
+            # Stop at subckt name token
+            if tok.lower().endswith(".subckt"):
+                break
+            if "=" not in tok:
+                continue
+            pin_name, net_name = tok.split("=", 1)
+            pin_num = pin_nums.get(pin_name)
+            if pin_num is None and numbers is not None:
+                raise ValueError(f"{toks[0]}: pin {pin_name} is not on the component's library symbol")
+            if pin_num is None:
+                # Append dynamically
+                pins.append(pin_name)
+                pin_num = pin_nums[pin_name] = str(len(pins))
+            nodes.append((normalize_net(net_name, aliases), pin_num))
+        return nodes
+
+    # Primitive component: REF NET1 NET2 [NET3 ...] VALUE...
+    # Extract nets for however many pins we have declared (or available tokens)
+    for idx, net_name in enumerate(toks[1:1 + len(pins)], start=1):
+        nodes.append((normalize_net(net_name, aliases), numbers[idx - 1] if numbers else str(idx)))
+    return nodes
+
+def parse_connectivity(json_path: str, netlist_path: str = "silixon_netlist.txt",
+                       symbols: dict | None = None) -> tuple[list[str], dict[str, list[tuple[str, str]]]]:
+    """
+    Correlate silixon_pcb.json pins with silixon_netlist.txt connectivity.
+    Returns (net_order, net_nodes): net names in first-seen order (net code = index + 1)
+    and net name -> [(ref, pin_num), ...]. See parse_nets for the rules.
+    """
+    return connectivity(iter_components(json_path), read_netlist_records(netlist_path), symbols)
 
+def connectivity(components: Iterable[dict], records: list[str], symbols: dict | None = None
+                 ) -> tuple[list[str], dict[str, list[tuple[str, str]]]]:
+    """parse_connectivity for components and netlist records already in memory."""
     # net_name -> list[(ref, pin_num)]
     net_nodes: dict[str, list[tuple[str, str]]] = {}
     net_order: list[str] = []
 
-    def normalize_net(raw: str) -> str:
-        raw = raw.strip()
-        if raw == "0":
-            return "GND"
-        return raw
-
-    def quote_net(name: str) -> str:
-        # Add quotes if contains non-simple chars or parentheses
-        if not name:
-            return name
-        if any(ch.isspace() for ch in name) or any(ch in name for ch in '()"\''):
-            return f"\"{name}\""
-        # KiCad examples also quote Net-(X-PadY) forms; detect parentheses
-        if "(" in name or ")" in name or "-" in name and name.startswith("Net-"):
-            return f"\"{name}\""
-        return name
-
-    def add_node(net: str, ref: str, pin_num: str):
+    for ref, net, pin_num in iter_nodes(pin_tables(components, records, symbols), records):
         if net not in net_nodes:
             net_nodes[net] = []
             net_order.append(net)
         if (ref, pin_num) not in net_nodes[net]:
             net_nodes[net].append((ref, pin_num))
 
-    def ensure_pin(ref: str, pin_name: str) -> str | None:
-        """
-        Ensure pin_name exists for ref; if missing, append to ordering and assign new number.
-        Return pin number (as string) or None if ref unknown.
-        """
-        if ref not in comp_pin_order:
-            return None
-        mapping = comp_pin_name_to_num[ref]
-        if pin_name in mapping:
-            return mapping[pin_name]
-        # Append dynamically
-        comp_pin_order[ref].append(pin_name)
-        new_num = str(len(comp_pin_order[ref]))
-        mapping[pin_name] = new_num
-        return new_num
-
-    # Parse netlist text
-    netlist_file = Path(netlist_path)
-    if netlist_file.is_file():
-        raw = netlist_file.read_text(encoding="utf-8").splitlines()
-
-        # Merge backslash continuations
-        logical: list[str] = []
-        buf = ""
-        for ln in raw:
-            line = ln.strip()
-            if not line or line.startswith("*") or line.upper().startswith(".END"):
-                if buf:
-                    logical.append(buf.strip())
-                    buf = ""
-                continue
-            if line.endswith("\\"):
-                buf += (" " if buf else "") + line[:-1].strip()
-            else:
-                buf += (" " if buf else "") + line
-                logical.append(buf.strip())
-                buf = ""
-        if buf:
-            logical.append(buf.strip())
-
-        for line in logical:
-            if not line:
-                continue
+    return net_order, net_nodes
 
-            # Subcircuit style: XU1 ...
-            if line.startswith("X") and len(line) > 2:
-                toks = line.split()
-                inst = toks[0]          # XU1
-                ref = inst[1:]          # U1
-                for tok in toks[1:]:
-                    # Stop at subckt name token
-                    if tok.lower().endswith(".subckt"):
-                        break
-                    if "=" not in tok:
-                        continue
-                    pin_name, net_name = tok.split("=", 1)
-                    net_name = normalize_net(net_name)
-                    pin_num = ensure_pin(ref, pin_name)
-                    if pin_num:
-                        add_node(net_name, ref, pin_num)
-                continue
+def pin_tables(components: Iterable[dict], records: list[str], symbols: dict | None = None
+               ) -> dict[str, tuple[list[str], dict[str, str], list[str] | None]]:
+    """
+    ref -> component_pins of each component (pin order, name -> number, positional
+    numbers), with the pins its netlist records name; format_libparts numbers the same way.
+    """
+    order = subckt_pin_order(records)
+    return {c.get("uid"): component_pins(c, symbol_pins(c, symbols), order.get(c.get("uid"), ()))
+            for c in components}
 
-            # Primitive component: REF NET1 NET2 [NET3 ...] VALUE...
-            toks = line.split()
-            if not toks:
-                continue
-            ref = toks[0]
-            if ref in comp_pin_order:
-                pin_needed = len(comp_pin_order[ref])
-                # If no declared pins (unlikely), skip
-                if pin_needed == 0:
-                    continue
-                # Extract nets for however many pins we have declared (or available tokens)
-                nets_slice = toks[1:1 + pin_needed]
-                for idx, net_name in enumerate(nets_slice, start=1):
-                    net_name = normalize_net(net_name)
-                    add_node(net_name, ref, str(idx))
-
-    # Build output
+def iter_nodes(tables: dict[str, tuple[list[str], dict[str, str], list[str] | None]], records: list[str]
+               ) -> Iterator[tuple[str, str, str]]:
+    """
+    (ref, net, pin_num) of every node the netlist records connect, in netlist order.
+    tables come from pin_tables; records of components not in them are skipped.
+    Nodes repeat when a pin is listed twice (callers dedupe).
+    """
+    aliases = build_aliases(records)
+    for line in records:
+        ref = record_ref(line)
+        table = tables.get(ref)
+        if table is None:
+            continue
+        for net, pin_num in record_nodes(line, *table, aliases):
+            yield ref, net, pin_num
+
+def quote_net(name: str) -> str:
+    # Add quotes if contains non-simple chars or parentheses
+    if not name:
+        return name
+    if any(ch.isspace() for ch in name) or any(ch in name for ch in '()"\''):
+        return f"\"{name}\""
+    # KiCad examples also quote Net-(X-PadY) forms; detect parentheses
+    if "(" in name or ")" in name or "-" in name and name.startswith("Net-"):
+        return f"\"{name}\""
+    return name
+
+def format_net_body(net_name: str, nodes: list[tuple[str, str]]) -> str:
+    """(name ...) and node lines of one net; the "(net (code N) " prefix is added by format_net."""
+    lines = [f"(name {quote_net(net_name)})"]
+    for ref, pin in nodes:
+        lines.append(f"    (node (ref {ref}) (pin {pin}))")
+    lines.append("  )")
+    return "\n".join(lines)
+
+def format_net(code: int, body: str) -> str:
+    return f"  (net (code {code}) {body}"
+
+def parse_nets(json_path: str, netlist_path: str = "silixon_netlist.txt",
+               symbols: dict | None = None) -> str:
+    """
+    Build a (nets ...) section by correlating:
+      - Pins declared in silixon_pcb.json (defines pin ordering -> pin numbers)
+      - Electrical connectivity described in silixon_netlist.txt
+    Rules:
+      * For primitive parts (R1, C1, etc.): first N tokens after ref (where N = pin count) are nets.
+      * For subcircuit instances (XRef ... PIN=NET ... name.subckt): use explicit PIN=NET pairs.
+      * If the netlist references a pin name not present in JSON, append that pin name at the end
+        (assigning the next sequential pin number) so it still appears in nets output.
+      * Components whose library symbol is in symbols use its real pin numbers instead
+        (by pin name, or by position for primitives); unknown pin names are an error.
+      * Aliased nets are merged under one name (net_alias): "0" / gnd / VGND become GND,
+        and zero-volt DC sources and net-tie parts join the nets they connect.
+      * Quote net names that contain characters outside [A-Za-z0-9_~] or contain parentheses.
+    """
+    return format_nets(*parse_connectivity(json_path, netlist_path, symbols))
+
+def format_nets(net_order: list[str], net_nodes: dict[str, list[tuple[str, str]]]) -> str:
+    """(nets ...) section; net codes follow net_order."""
     lines = ["(nets"]
     for code, net_name in enumerate(net_order, start=1):
-        nodes = net_nodes[net_name]
-        lines.append(f"  (net (code {code}) (name {quote_net(net_name)})")
-        for ref, pin in nodes:
-            lines.append(f"    (node (ref {ref}) (pin {pin}))")
-        lines.append("  )")
+        lines.append(format_net(code, format_net_body(net_name, net_nodes[net_name])))
     lines.append(")")
     return "\n".join(lines)
 
-def build_netlist(json_path: str, netlist_path: str = "silixon_netlist.txt") -> str:
+def build_netlist(json_path: str, netlist_path: str = "silixon_netlist.txt",
+                  bom_path: str | None = None, symbols: dict | None = None) -> str:
     return "\n".join([
         preamble(),
-        parse_components(json_path),
-        parse_libparts(json_path, netlist_path),
+        parse_components(json_path, bom_path),
+        parse_libparts(json_path, netlist_path, symbols),
         parse_libraries(json_path),
-        parse_nets(json_path, netlist_path),
+        parse_nets(json_path, netlist_path, symbols),
     ]) + ")\n"
 
+class Design:
+    """
+    Parsed conversion inputs whose netlist sections are built on first access and cached.
+
+        design = Design.from_files("silixon_pcb.json", "silixon_netlist.txt", "silixon_bom.json")
+        design.nets                      # only connectivity is worked out
+        design.update_component("R1", value="4k7")
+        design.render()                  # R1's block / libpart / nets rebuilt, the rest reused
+
+    Each component keeps its (comp ...) block, libpart and nodes, and each net its
+    (net ...) body. An edit drops only the fragments that read what changed (see
+    DEPENDS) and the sections joined from them; the next access rebuilds just those.
+    Net codes are assigned when the nets are joined, so a net whose nodes did not
+    change keeps its cached body even when codes shift. Fragments belong to the
+    component dicts in comps: edit them through the methods below.
+    """
+
+    SECTIONS = ("components", "libparts", "libraries", "nets")
+    # Component keys each section reads
+    DEPENDS: dict[str, set[str]] = {
+        "components": {"uid", *COMPONENT_KEYS},   # uid also picks the BOM row
+        "libparts": {"uid", "type", "value", "pins", "symbol"},
+        "libraries": {"type"},
+        "nets": {"uid", "pins", "value", "symbol"},
+    }
+
+    def __init__(self, components: list[dict], records: list[str], bom_rows: list[dict] | None = None,
+                 symbols: dict | None = None):
+        self.comps = components
+        self.bom_index = index_bom(bom_rows or [])
+        self.symbols = symbols
+        self._cache: dict[str, Any] = {}
+
+        # Fragments by id() of the component dict
+        self._blocks: dict[int, str] = {}
+        self._libparts: dict[int, tuple[tuple, str] | None] = {}
+        self._nodes: dict[int, list[tuple[tuple[int, int], str, str, str]]] = {}
+        # Net -> components on it, its (ref, pin) nodes and its formatted body
+        self._net_comps: dict[str, set[int]] = {}
+        self._net_nodes: dict[str, list[tuple[str, str]]] = {}
+        self._net_bodies: dict[str, str] = {}
+        self._dirty_nets: set[str] = set()
+        self.set_records(records)
+
+    @classmethod
+    def from_files(cls, json_path: str, netlist_path: str = "silixon_netlist.txt",
+                   bom_path: str | None = None, symbols: dict | None = None) -> "Design":
+        return cls(list(iter_components(json_path)), read_netlist_records(netlist_path),
+                   load_bom(bom_path) if bom_path else None, symbols)
+
+    # ------------------------- fragments ------------------------- #
+
+    def _block(self, c: dict, bodies: dict[tuple, str]) -> str:
+        block = self._blocks.get(id(c))
+        if block is None:
+            # Enrich a copy, so a later BOM change does not leave stale fields behind
+            shown = enrich_component(dict(c), self.bom_index) if self.bom_index else c
+            block = self._blocks[id(c)] = format_component(shown, bodies)
+        return block
+
+    def _libpart(self, c: dict) -> tuple[tuple, str] | None:
+        """((lib, part), libpart block) of c, or None when it has no pins (see format_libparts)."""
+        if id(c) not in self._libparts:
+            sym_pins = symbol_pins(c, self.symbols)
+            pins = component_pins(c, sym_pins, self._subckt_pins.get(c.get("uid", "U?"), ()))[0]
+            entry = (libpart_key(c), format_libpart(c, pins, sym_pins)) if pins or sym_pins else None
+            self._libparts[id(c)] = entry
+        return self._libparts[id(c)]
+
+    def _component_nodes(self, c: dict) -> list[tuple[tuple[int, int], str, str, str]]:
+        """[((record index, k), net, ref, pin), ...]; the position orders nodes like connectivity()."""
+        ref = c.get("uid")
+        pin_order, pin_nums, numbers = component_pins(c, symbol_pins(c, self.symbols),
+                                                      self._subckt_pins.get(ref, ()))
+        nodes = []
+        for idx, line in self._records_by_ref.get(ref, ()):
+            for k, (net, pin) in enumerate(record_nodes(line, pin_order, pin_nums, numbers, self._aliases)):
+                nodes.append(((idx, k), net, ref, pin))
+        return nodes
+
+    def _update_nets(self) -> None:
+        """Work out the nodes of components that have none cached and re-sort the nets they changed."""
+        for c in self.comps:
+            if id(c) not in self._nodes:
+                nodes = self._nodes[id(c)] = self._component_nodes(c)
+                for _pos, net, _ref, _pin in nodes:
+                    self._net_comps.setdefault(net, set()).add(id(c))
+                    self._dirty_nets.add(net)
+        for net in self._dirty_nets:
+            self._net_bodies.pop(net, None)
+            members = self._net_comps.get(net)
+            if not members:
+                self._net_comps.pop(net, None)
+                self._net_nodes.pop(net, None)
+                continue
+            ordered = sorted((pos, ref, pin) for cid in members for pos, n, ref, pin in self._nodes[cid] if n == net)
+            nodes: list[tuple[str, str]] = []
+            for _pos, ref, pin in ordered:
+                if (ref, pin) not in nodes:
+                    nodes.append((ref, pin))
+            self._net_nodes[net] = nodes
+        self._dirty_nets.clear()
+
+    # ------------------------- sections ------------------------- #
+
+    def _cached(self, name: str, build) -> Any:
+        if name not in self._cache:
+            self._cache[name] = build()
+        return self._cache[name]
+
+    @property
+    def components(self) -> str:
+        def build() -> str:
+            bodies: dict[tuple, str] = {}
+            return "\n".join(["(components", *(self._block(c, bodies) for c in self.comps), ")"])
+        return self._cached("components", build)
+
+    @property
+    def libparts(self) -> str:
+        def build() -> str:
+            # First component of each (lib, part) describes it, as in format_libparts
+            lines = ["(libparts"]
+            emitted: set[tuple] = set()
+            for c in self.comps:
+                entry = self._libpart(c)
+                if entry and entry[0] not in emitted:
+                    emitted.add(entry[0])
+                    lines.append(entry[1])
+            lines.append(")")
+            return "\n".join(lines)
+        return self._cached("libparts", build)
+
+    @property
+    def libraries(self) -> str:
+        return self._cached("libraries", lambda: format_libraries(ordered_libraries(self.comps)))
+
+    @property
+    def connectivity(self) -> tuple[list[str], dict[str, list[tuple[str, str]]]]:
+        """(net_order, net_nodes) as returned by parse_connectivity; cached with the nets."""
+        def build():
+            self._update_nets()
+            # Nets in first-seen netlist order
+            first_seen: dict[str, tuple[int, int]] = {}
+            for nodes in self._nodes.values():
+                for pos, net, _ref, _pin in nodes:
+                    if net not in first_seen or pos < first_seen[net]:
+                        first_seen[net] = pos
+            order = sorted(first_seen, key=first_seen.get)
+            return order, {net: self._net_nodes[net] for net in order}
+        return self._cached("connectivity", build)
+
+    @property
+    def nets(self) -> str:
+        def build() -> str:
+            order, net_nodes = self.connectivity
+            lines = ["(nets"]
+            for code, net in enumerate(order, start=1):
+                body = self._net_bodies.get(net)
+                if body is None:
+                    body = self._net_bodies[net] = format_net_body(net, net_nodes[net])
+                lines.append(format_net(code, body))
+            lines.append(")")
+            return "\n".join(lines)
+        return self._cached("nets", build)
+
+    def render(self) -> str:
+        """Full netlist text, same as build_netlist."""
+        return "\n".join([preamble(), self.components, self.libparts, self.libraries, self.nets]) + ")\n"
+
+    # ------------------------- edits ------------------------- #
+
+    def _drop(self, c: dict, sections) -> None:
+        """Drop c's fragments of sections and the joined sections built from them."""
+        cid = id(c)
+        if "components" in sections:
+            self._blocks.pop(cid, None)
+        if "libparts" in sections:
+            self._libparts.pop(cid, None)
+        if "nets" in sections:
+            for _pos, net, _ref, _pin in self._nodes.pop(cid, ()):
+                self._net_comps.get(net, set()).discard(cid)
+                self._dirty_nets.add(net)
+            self._cache.pop("connectivity", None)
+        for name in sections:
+            self._cache.pop(name, None)
+
+    def invalidate(self, *sections: str) -> None:
+        """Drop every component's fragments of sections (default: all of them)."""
+        sections = sections or self.SECTIONS
+        for c in self.comps:
+            self._drop(c, sections)
+        if "nets" in sections:
+            self._net_comps.clear()
+            self._net_nodes.clear()
+            self._net_bodies.clear()
+            self._dirty_nets.clear()
+
+    def touch(self, c: dict, keys: Iterable[str] | None = None) -> None:
+        """c (in comps) was edited in place: drop what reads keys (None = any key)."""
+        keys = None if keys is None else set(keys)
+        self._drop(c, [name for name, reads in self.DEPENDS.items() if keys is None or reads & keys])
+
+    def _component(self, uid: str) -> dict:
+        for c in self.comps:
+            if c.get("uid") == uid:
+                return c
+        raise KeyError(uid)
+
+    def update_component(self, uid: str, **changes) -> None:
+        """Change fields of one component (a value of None removes the field)."""
+        comp = self._component(uid)
+        changed = {key for key, val in changes.items() if comp.get(key) != val}
+        for key in changed:
+            if changes[key] is None:
+                comp.pop(key, None)
+            else:
+                comp[key] = changes[key]
+        if changed:
+            self.touch(comp, changed)
+
+    def add_component(self, comp: dict) -> None:
+        self.set_components(self.comps + [comp])
+
+    def remove_component(self, uid: str) -> None:
+        comp = self._component(uid)
+        self.set_components([c for c in self.comps if c is not comp])
+
+    def set_components(self, components: list[dict]) -> None:
+        """
+        Replace the component list. Dicts already in it keep their fragments (a reorder
+        only rejoins the sections); dropped ones lose theirs, new ones are built on access.
+        """
+        kept = {id(c) for c in components}
+        for c in self.comps:
+            if id(c) not in kept:
+                self._drop(c, self.SECTIONS)
+        self.comps = components
+        for name in ("components", "libparts", "libraries"):
+            self._cache.pop(name, None)
+        if any(id(c) not in self._nodes for c in components):
+            self._cache.pop("nets", None)
+            self._cache.pop("connectivity", None)
+
+    def set_records(self, records: list[str]) -> None:
+        """Replace the netlist records (e.g. from read_netlist_records)."""
+        self.records = records
+        self._subckt_pins = subckt_pin_order(records)
+        self._aliases = build_aliases(records)
+        self._records_by_ref: dict[str, list[tuple[int, str]]] = {}
+        for idx, line in enumerate(records):
+            self._records_by_ref.setdefault(record_ref(line), []).append((idx, line))
+        self.invalidate("libparts", "nets")
+
+    def set_bom(self, bom_rows: list[dict] | None) -> None:
+        self.bom_index = index_bom(bom_rows or [])
+        self.invalidate("components")
+
 if __name__ == "__main__":
     json_path = "silixon_pcb.json"
     netlist_path = "silixon_netlist.txt"
-    netlist_text = build_netlist(json_path, netlist_path)
+    bom_path = "silixon_bom.json"
+    netlist_text = build_netlist(json_path, netlist_path, bom_path, load_symbol_index())
     out_path = Path("silixon_proj_to_kicad.net")
-    out_path.write_text(netlist_text, encoding="utf-8")
-    print(f"Wrote {out_path}")
+    if write_if_changed(out_path, netlist_text):
+        print(f"Wrote {out_path}")
+    else:
+        print(f"{out_path} unchanged")
+    for line, msg in validate(str(out_path)):
+        print(f"  {out_path}:{line}: {msg}")
 
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+snapshot_store.py
+Content-addressed, deduplicating backups of generated KiCad outputs.
+
+Instead of one full zip per backup, each file is split at top-level S-expression
+boundaries (footprints, nets, segments, ...) and the pieces are grouped into chunks
+at content-defined cut points. Every chunk is stored once, zlib-compressed, under
+its SHA-256; a snapshot is just a small JSON manifest listing each file's chunks.
+Writing a snapshot only stores the chunks that changed, so disk use and write time
+follow the size of the edit rather than the size of the board.
+
+Layout (default store: output-backups/store/):
+  objects/<h[:2]>/<h>     zlib-compressed chunk text
+  snapshots/<name>.json   {"name", "created", "files": {name: {size, sha256, chunks}}}
+
+Files that are not S-expressions (.json, .kicad_pro, ...) are still chunked the same
+way; without parentheses they simply become one chunk.
+"""
+
+import argparse
+import datetime
+import hashlib
+import io
+import json
+import os
+import zipfile
+import zlib
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from kicad_sexpr import iter_stream
+
+STORE_DIR = "output-backups/store"
+# A chunk ends after a piece whose CRC-32 is 0 mod CUT_MODULUS (about every 16 pieces),
+# or once it reaches MAX_CHUNK characters; cuts depend only on content, so an edit
+# early in the file does not shift the chunk boundaries after it.
+CUT_MODULUS = 16
+MAX_CHUNK = 64 * 1024
+ZLIB_LEVEL = 6
+
+
+def _sha(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def iter_chunks(pieces: Iterable[tuple[str, str]]) -> Iterator[str]:
+    """Group (head, raw) pieces from kicad_sexpr into content-defined chunks."""
+    group: list[str] = []
+    size = 0
+    for _head, raw in pieces:
+        group.append(raw)
+        size += len(raw)
+        if size >= MAX_CHUNK or zlib.crc32(raw.encode("utf-8")) % CUT_MODULUS == 0:
+            yield "".join(group)
+            group, size = [], 0
+    if group:
+        yield "".join(group)
+
+
+class SnapshotStore:
+    def __init__(self, root: str = STORE_DIR):
+        self.root = Path(root)
+        self.objects = self.root / "objects"
+        self.snapshots = self.root / "snapshots"
+
+    # ------------------------- objects ------------------------- #
+
+    def _object_path(self, digest: str) -> Path:
+        return self.objects / digest[:2] / digest
+
+    def put(self, data: bytes) -> tuple[str, int]:
+        """Store one chunk; returns (digest, bytes written to disk, 0 if already present)."""
+        digest = _sha(data)
+        path = self._object_path(digest)
+        if path.exists():
+            return digest, 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+        packed = zlib.compress(data, ZLIB_LEVEL)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(packed)
+        os.replace(tmp, path)
+        return digest, len(packed)
+
+    def get(self, digest: str) -> bytes:
+        return zlib.decompress(self._object_path(digest).read_bytes())
+
+    # ------------------------- snapshots ------------------------- #
+
+    def add_stream(self, f) -> tuple[dict, int, int]:
+        """
+        Chunk one text stream into the store.
+        Returns (manifest entry, new chunks, new bytes on disk).
+        """
+        whole = hashlib.sha256()
+        chunks: list[str] = []
+        size = new_chunks = new_bytes = 0
+        for text in iter_chunks(iter_stream(f)):
+            data = text.encode("utf-8")
+            whole.update(data)
+            size += len(data)
+            digest, written = self.put(data)
+            chunks.append(digest)
+            if written:
+                new_chunks += 1
+                new_bytes += written
+        return {"size": size, "sha256": whole.hexdigest(), "chunks": chunks}, new_chunks, new_bytes
+
+    def snapshot(self, sources: dict[str, io.TextIOBase], name: str | None = None,
+                 created: str | None = None) -> dict:
+        """
+        Store every {file name: open text stream} and write the manifest.
+        Returns the manifest plus "new_chunks" / "new_bytes" stats for this snapshot.
+        """
+        now = datetime.datetime.now()
+        name = name or f"output-{now:%Y-%m-%d_%H%M%S}"
+        manifest = {"name": name, "created": created or now.isoformat(timespec="seconds"), "files": {}}
+        new_chunks = new_bytes = 0
+        for fname, f in sources.items():
+            entry, n, b = self.add_stream(f)
+            manifest["files"][fname] = entry
+            new_chunks += n
+            new_bytes += b
+
+        self.snapshots.mkdir(parents=True, exist_ok=True)
+        path = self.snapshots / f"{name}.json"
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(manifest, indent=1), encoding="utf-8")
+        os.replace(tmp, path)
+        return dict(manifest, new_chunks=new_chunks, new_bytes=new_bytes)
+
+    def snapshot_files(self, paths: list[str], name: str | None = None) -> dict:
+        handles = {Path(p).name: open(p, "r", encoding="utf-8", newline="") for p in paths}
+        try:
+            return self.snapshot(handles, name)
+        finally:
+            for f in handles.values():
+                f.close()
+
+    def import_zip(self, zip_path: str) -> dict:
+        """Turn one of the old full-copy backup zips into a snapshot of the same name."""
+        with zipfile.ZipFile(zip_path) as zf:
+            members = [i for i in zf.infolist() if not i.is_dir()]
+            handles = {i.filename: io.TextIOWrapper(zf.open(i), encoding="utf-8", newline="")
+                       for i in members}
+            newest = max((i.date_time for i in members), default=None)
+            created = datetime.datetime(*newest).isoformat() if newest else None
+            try:
+                return self.snapshot(handles, Path(zip_path).stem, created)
+            finally:
+                for f in handles.values():
+                    f.close()
+
+    def manifest(self, name: str) -> dict:
+        with open(self.snapshots / f"{name}.json", "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def names(self) -> list[str]:
+        if not self.snapshots.is_dir():
+            return []
+        return sorted(p.stem for p in self.snapshots.glob("*.json"))
+
+    def restore(self, name: str, out_dir: str, files: list[str] | None = None) -> list[Path]:
+        """Write the files of snapshot name into out_dir (optionally only some of them)."""
+        manifest = self.manifest(name)
+        out = Path(out_dir)
+        written = []
+        for fname, entry in manifest["files"].items():
+            if files and fname not in files:
+                continue
+            path = out / fname
+            path.parent.mkdir(parents=True, exist_ok=True)
+            whole = hashlib.sha256()
+            with open(path, "wb") as f:
+                for digest in entry["chunks"]:
+                    data = self.get(digest)
+                    whole.update(data)
+                    f.write(data)
+            if whole.hexdigest() != entry["sha256"]:
+                raise ValueError(f"{name}: {fname} does not match its recorded checksum")
+            written.append(path)
+        return written
+
+    def gc(self) -> int:
+        """Delete objects no snapshot refers to; returns how many were removed."""
+        live = set()
+        for name in self.names():
+            for entry in self.manifest(name)["files"].values():
+                live.update(entry["chunks"])
+        removed = 0
+        if self.objects.is_dir():
+            for path in self.objects.glob("*/*"):
+                if path.name not in live:
+                    path.unlink()
+                    removed += 1
+        return removed
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Deduplicating snapshot store for generated KiCad outputs.")
+    ap.add_argument("--store", default=STORE_DIR, help="Store directory")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("snapshot", help="Snapshot the given files")
+    p.add_argument("files", nargs="+", help="Files to back up (e.g. output.kicad_pcb silixon_proj_to_kicad.net)")
+    p.add_argument("--name", help="Snapshot name (default: output-<timestamp>)")
+
+    p = sub.add_parser("import", help="Convert full-copy backup zips into snapshots")
+    p.add_argument("zips", nargs="+", help="Backup .zip files")
+
+    p = sub.add_parser("restore", help="Restore a snapshot")
+    p.add_argument("name", help="Snapshot name")
+    p.add_argument("-o", "--outdir", default=".", help="Output directory")
+    p.add_argument("--file", action="append", dest="only", help="Restore only this file (repeatable)")
+
+    sub.add_parser("list", help="List snapshots")
+    sub.add_parser("gc", help="Remove chunks no snapshot uses")
+    args = ap.parse_args()
+
+    store = SnapshotStore(args.store)
+    if args.cmd == "snapshot":
+        m = store.snapshot_files(args.files, args.name)
+        print(f"Snapshot {m['name']}: {len(m['files'])} files, {m['new_chunks']} new chunks ({m['new_bytes']} bytes)")
+    elif args.cmd == "import":
+        for z in args.zips:
+            m = store.import_zip(z)
+            print(f"Imported {z}: {len(m['files'])} files, {m['new_chunks']} new chunks ({m['new_bytes']} bytes)")
+    elif args.cmd == "restore":
+        paths = store.restore(args.name, args.outdir, args.only)
+        print(f"Restored {len(paths)} files to: {args.outdir}")
+    elif args.cmd == "list":
+        for name in store.names():
+            m = store.manifest(name)
+            print(f"{name}  {m['created']}  {len(m['files'])} files")
+    elif args.cmd == "gc":
+        print(f"Removed {store.gc()} unused chunks")
+
+
+if __name__ == "__main__":
+    main()
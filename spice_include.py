@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+spice_include.py
+Resolve multi-file SPICE-like netlists into one list of logical records.
+
+Handled directives:
+- .include <file> / .inc <file>          inline the whole file
+- .lib <file>                            inline the whole file (as .include)
+- .lib <file> <section>                  inline one .lib <section> ... .endl block of file
+- .param name=expr [name=expr ...]       parameters, used as {expr} (or 'expr') in values;
+                                         inside .subckt ... .ends they are local to it
+
+Included files are found relative to the file that includes them, then along the
+search path. Each distinct file is parsed once and cached by the SHA-256 of its
+content, in memory and under SPICE_CACHE_DIR, so shared library files are not parsed
+again for every project. Includes discovered at the same depth are read on a thread
+pool, which overlaps the file and cache I/O; parsing itself is pure Python and runs
+one file at a time under the GIL. A two-token .lib opens a section only inside a
+file pulled in by .lib <file> <section>; anywhere else it includes the named file.
+Parameters are evaluated lazily and memoized; an expression may use other
+parameters, SPICE number suffixes (10k, 3.3meg, 0.1uF) and a few math functions.
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import math
+import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+
+SPICE_CACHE_DIR = ".spice_cache"
+CACHE_VERSION = 3
+MAX_WORKERS = 8
+
+# SPICE scale suffixes (case-insensitive; "meg" and "mil" checked before "m")
+SUFFIXES = {"t": 1e12, "g": 1e9, "meg": 1e6, "k": 1e3, "mil": 25.4e-6,
+            "m": 1e-3, "u": 1e-6, "n": 1e-9, "p": 1e-12, "f": 1e-15}
+NUMBER_RE = re.compile(r"(?<![\w.])((?:\d+\.?\d*|\.\d+)(?:e[+-]?\d+)?)(meg|mil|[tgkmunpf])?[a-z]*", re.IGNORECASE)
+EXPR_RE = re.compile(r"\{([^{}]*)\}|'([^']*)'")
+FUNCTIONS = {
+    "sqrt": math.sqrt, "exp": math.exp, "log": math.log, "ln": math.log, "log10": math.log10,
+    "sin": math.sin, "cos": math.cos, "tan": math.tan, "atan": math.atan,
+    "abs": abs, "min": min, "max": max, "pow": pow, "pwr": pow,
+}
+BIN_OPS = {ast.Add: lambda a, b: a + b, ast.Sub: lambda a, b: a - b, ast.Mult: lambda a, b: a * b,
+           ast.Div: lambda a, b: a / b, ast.Pow: lambda a, b: a ** b, ast.Mod: lambda a, b: a % b}
+
+
+# ------------------------- records ------------------------- #
+
+def merge_lines(lines: list[str]) -> list[str]:
+    """
+    Return the logical records of netlist lines: backslash continuations (and SPICE
+    "+" continuation lines) merged, '*' comment lines, inline '; ...' comments and
+    .END dropped (.ENDS and .ENDL stay).
+    """
+    logical: list[str] = []
+    buf = ""
+    for ln in lines:
+        line = ln.split(";", 1)[0].strip()  # drop inline "; ..." comments
+        if line.startswith("+") and logical and not buf:
+            logical[-1] += " " + line[1:].strip()
+            continue
+        upper = line.upper()
+        if not line or line.startswith("*") or upper.split(None, 1)[0] == ".END":
+            if buf:
+                logical.append(buf.strip())
+                buf = ""
+            continue
+        if line.endswith("\\"):
+            buf += (" " if buf else "") + line[:-1].strip()
+        else:
+            buf += (" " if buf else "") + line
+            logical.append(buf.strip())
+            buf = ""
+    if buf:
+        logical.append(buf.strip())
+    return logical
+
+
+def _directive(record: str) -> str:
+    return record.split(None, 1)[0].lower() if record.startswith(".") else ""
+
+
+def _unquote(token: str) -> str:
+    return token[1:-1] if len(token) > 1 and token[0] == token[-1] and token[0] in "\"'" else token
+
+
+def parse_text(text: str, library: bool = False) -> dict:
+    """
+    Parse one file: {"records": top-level records, "sections": {name: records}}.
+    Records keep their .include / .lib / .param directives. In a library file (one
+    read for .lib <file> <section>), .lib <name> ... .endl blocks are moved to
+    "sections"; elsewhere .lib <name> is an include and stays a record.
+    """
+    records: list[str] = []
+    sections: dict[str, list[str]] = {}
+    target = records
+    for rec in merge_lines(text.splitlines()):
+        kind = _directive(rec)
+        toks = rec.split()
+        if library and kind == ".lib" and len(toks) == 2:
+            target = sections.setdefault(toks[1].lower(), [])
+            continue
+        if library and kind == ".endl":
+            target = records
+            continue
+        target.append(rec)
+    return {"records": records, "sections": sections}
+
+
+# ------------------------- parse cache ------------------------- #
+
+class ParseCache:
+    """Parsed files keyed by content hash, in memory and (optionally) on disk."""
+
+    def __init__(self, cache_dir: str | None = SPICE_CACHE_DIR):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.memory: dict[str, dict] = {}
+        self.parsed = 0
+        self.hits = 0
+
+    def _path(self, digest: str) -> Path:
+        return self.cache_dir / f"{digest}.json"
+
+    def get(self, text: str, persist: bool = True, library: bool = False) -> dict:
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest() + ("-lib" if library else "")
+        hit = self.memory.get(digest)
+        if hit is None and persist and self.cache_dir is not None and self._path(digest).is_file():
+            try:
+                with open(self._path(digest), "r", encoding="utf-8") as f:
+                    stored = json.load(f)
+                if stored.get("version") == CACHE_VERSION:
+                    hit = stored["parsed"]
+            except (OSError, ValueError, KeyError):
+                hit = None
+        if hit is not None:
+            self.hits += 1
+            self.memory[digest] = hit
+            return hit
+
+        parsed = parse_text(text, library)
+        self.parsed += 1
+        self.memory[digest] = parsed
+        if persist and self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp = self._path(digest).with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": CACHE_VERSION, "parsed": parsed}, f)
+            os.replace(tmp, self._path(digest))
+        return parsed
+
+
+# ------------------------- parameters ------------------------- #
+
+@lru_cache(maxsize=4096)
+def _compile(expr: str) -> ast.Expression:
+    """Parse an expression once; SPICE numbers become plain floats first."""
+    def number(m):
+        return repr(float(m.group(1)) * SUFFIXES.get((m.group(2) or "").lower(), 1.0))
+    text = NUMBER_RE.sub(number, expr.strip()).replace("^", "**")
+    return ast.parse(text, mode="eval")
+
+
+def format_value(value: float) -> str:
+    """Shortest text that reads back as value (2000.0 -> 2000, 1234567.89 stays exact)."""
+    text = repr(value)
+    return text[:-2] if text.endswith(".0") else text
+
+
+class ParamScope:
+    """
+    .param definitions, evaluated on first use and memoized. A child scope (one per
+    .subckt body) sees its parent's parameters; its own definitions stay local.
+    """
+
+    def __init__(self, parent: "ParamScope | None" = None):
+        self.parent = parent
+        self.exprs: dict[str, str] = {}
+        self.values: dict[str, float] = {}
+        self._active: set[str] = set()
+
+    def define(self, record: str) -> None:
+        """Add the name=expr pairs of one .param record (later definitions win)."""
+        body = record.split(None, 1)[1] if " " in record else ""
+        for m in re.finditer(r"(\w+)\s*=\s*(\{[^{}]*\}|'[^']*'|\S+)", body):
+            name, expr = m.group(1).lower(), m.group(2)
+            self.exprs[name] = expr[1:-1] if expr[0] in "{'" else expr
+        self.values.clear()  # a redefinition may change parameters already evaluated
+
+    def value(self, name: str) -> float:
+        name = name.lower()
+        if name in self.values:
+            return self.values[name]
+        if name not in self.exprs:
+            if self.parent is not None:
+                return self.parent.value(name)
+            raise ValueError(f"undefined parameter {name}")
+        if name in self._active:
+            raise ValueError(f"parameter {name} depends on itself")
+        self._active.add(name)
+        try:
+            self.values[name] = self.evaluate(self.exprs[name])
+        finally:
+            self._active.discard(name)
+        return self.values[name]
+
+    def evaluate(self, expr: str) -> float:
+        try:
+            tree = _compile(expr)
+        except SyntaxError:
+            raise ValueError(f"bad parameter expression {expr!r}") from None
+        return self._eval(tree.body, expr)
+
+    def _eval(self, node, expr: str) -> float:
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+            return float(node.value)
+        if isinstance(node, ast.Name):
+            return self.value(node.id)
+        if isinstance(node, ast.BinOp) and type(node.op) in BIN_OPS:
+            return BIN_OPS[type(node.op)](self._eval(node.left, expr), self._eval(node.right, expr))
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+            val = self._eval(node.operand, expr)
+            return -val if isinstance(node.op, ast.USub) else val
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+                and node.func.id.lower() in FUNCTIONS and not node.keywords):
+            return float(FUNCTIONS[node.func.id.lower()](*(self._eval(a, expr) for a in node.args)))
+        raise ValueError(f"unsupported parameter expression {expr!r}")
+
+    def substitute(self, record: str) -> str:
+        """Replace every {expr} / 'expr' in a record by its value."""
+        if "{" not in record and "'" not in record:
+            return record
+        return EXPR_RE.sub(
+            lambda m: format_value(self.evaluate(m.group(1) if m.group(1) is not None else m.group(2))), record)
+
+
+# ------------------------- include graph ------------------------- #
+
+class IncludeResolver:
+    """
+    Flatten a netlist and everything it includes.
+    Files are read and parsed once per resolver (and once per content via ParseCache).
+    """
+
+    def __init__(self, search_paths: list[str] | None = None, cache: ParseCache | None = None,
+                 max_workers: int = MAX_WORKERS):
+        self.search_paths = [Path(p) for p in (search_paths or [])]
+        self.cache = cache if cache is not None else ParseCache()
+        self.max_workers = max_workers
+        self.files: dict[tuple[Path, bool], dict] = {}   # (path, read as library) -> parsed
+
+    def _find(self, name: str, base: Path) -> Path:
+        for folder in [base, *self.search_paths]:
+            path = (folder / name).resolve()
+            if path.is_file():
+                return path
+        raise FileNotFoundError(f"{base}: cannot find included file {name}")
+
+    def _targets(self, path: Path, parsed: dict) -> list[tuple[Path, str | None]]:
+        """(file, section) pairs a parsed file includes."""
+        targets = []
+        for recs in [parsed["records"], *parsed["sections"].values()]:
+            for rec in recs:
+                kind = _directive(rec)
+                toks = rec.split()
+                if (kind in (".include", ".inc") or kind == ".lib" and len(toks) == 2) and len(toks) > 1:
+                    targets.append((self._find(_unquote(toks[1]), path.parent), None))
+                elif kind == ".lib" and len(toks) > 2:
+                    targets.append((self._find(_unquote(toks[1]), path.parent), toks[2].lower()))
+        return targets
+
+    def _load(self, key: tuple[Path, bool], persist: bool) -> dict:
+        path, library = key
+        return self.cache.get(path.read_text(encoding="utf-8"), persist, library)
+
+    def load_graph(self, root: Path) -> None:
+        """
+        Read and parse root and every file reachable from it, one include depth at a
+        time; the files of one depth are read concurrently (I/O overlap only).
+        """
+        self.files[root, False] = self._load((root, False), persist=False)
+        frontier = [(root, False)]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while frontier:
+                wanted = []
+                for key in frontier:
+                    for target, section in self._targets(key[0], self.files[key]):
+                        target_key = (target, section is not None)
+                        if target_key not in self.files and target_key not in wanted:
+                            wanted.append(target_key)
+                for key, parsed in zip(wanted, pool.map(lambda k: self._load(k, True), wanted)):
+                    self.files[key] = parsed
+                frontier = wanted
+
+    def expand(self, path: Path, records: list[str], params: ParamScope, out: list[tuple[str, ParamScope]],
+               active: tuple = ()) -> None:
+        """
+        Append (record, its parameter scope) for the records of one file (or section) to
+        out, inlining includes. A .subckt opens a child scope that its .ends closes.
+        """
+        for rec in records:
+            kind = _directive(rec)
+            toks = rec.split()
+            if kind == ".subckt":
+                params = ParamScope(params)
+                out.append((rec, params))
+            elif kind == ".ends" and params.parent is not None:
+                out.append((rec, params))
+                params = params.parent
+            elif (kind in (".include", ".inc") or kind == ".lib" and len(toks) == 2) and len(toks) > 1:
+                self._inline(self._find(_unquote(toks[1]), path.parent), None, params, out, active)
+            elif kind == ".lib" and len(toks) > 2:
+                self._inline(self._find(_unquote(toks[1]), path.parent), toks[2].lower(), params, out, active)
+            elif kind == ".param":
+                params.define(rec)
+            else:
+                out.append((rec, params))
+
+    def _inline(self, target: Path, section: str | None, params: ParamScope, out: list[tuple[str, ParamScope]],
+                active: tuple) -> None:
+        key = (target, section)
+        if key in active:
+            raise ValueError(f"include cycle: {' -> '.join(str(p) for p, _s in active + (key,))}")
+        parsed = self.files[target, section is not None]
+        if section is None:
+            records = parsed["records"]
+        elif section in parsed["sections"]:
+            records = parsed["sections"][section]
+        else:
+            raise ValueError(f"{target}: no .lib section {section}")
+        self.expand(target, records, params, out, active + (key,))
+
+    def resolve(self, netlist_path: str) -> list[str]:
+        root = Path(netlist_path).resolve()
+        self.load_graph(root)
+        out: list[tuple[str, ParamScope]] = []
+        self.expand(root, self.files[root, False]["records"], ParamScope(), out, ((root, None),))
+        # Substituted last, so a .param applies to its whole scope wherever it is defined
+        return [params.substitute(rec) for rec, params in out]
+
+
+def resolve_records(netlist_path: str, search_paths: list[str] | None = None,
+                    cache: ParseCache | None = None) -> list[str]:
+    """Logical records of netlist_path with includes inlined and parameters substituted. Missing file -> []."""
+    if not Path(netlist_path).is_file():
+        return []
+    return IncludeResolver(search_paths, cache).resolve(netlist_path)
+
+
+def included_files(netlist_path: str, search_paths: list[str] | None = None) -> list[Path]:
+    """Every file netlist_path pulls in through .include / .lib (not itself), sorted."""
+    root = Path(netlist_path).resolve()
+    resolver = IncludeResolver(search_paths)
+    resolver.load_graph(root)
+    return sorted({p for p, _library in resolver.files if p != root})
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Flatten a SPICE-like netlist with .include / .lib / .param.")
+    ap.add_argument("netlist", help="Top-level netlist")
+    ap.add_argument("-I", "--include-dir", action="append", default=[], help="Extra include search directory")
+    ap.add_argument("-o", "--output", help="Write the flattened records here (default: stdout)")
+    ap.add_argument("--no-cache", action="store_true", help="Do not read or write the on-disk parse cache")
+    args = ap.parse_args()
+
+    cache = ParseCache(None if args.no_cache else SPICE_CACHE_DIR)
+    resolver = IncludeResolver(args.include_dir, cache)
+    records = resolver.resolve(args.netlist)
+    text = "\n".join(records) + "\n"
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+        print(f"Wrote {args.output}")
+    else:
+        print(text, end="")
+    print(f"{len({p for p, _library in resolver.files})} files, {cache.parsed} parsed, {cache.hits} from cache, "
+          f"{len(records)} records", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+stable_output.py
+Byte-stable generated files: content-derived ids and a write that leaves unchanged
+files alone.
+
+- stable_hex / stable_uuid derive tstamps and UUIDs from a component's identity
+  (its ref), so the same design always gets the same ids.
+- build_date is the date stamped into headers: SOURCE_DATE_EPOCH when set (the
+  reproducible-builds convention), else the fixed FIXED_DATE. Never the clock or
+  file mtimes, so a fresh clone or a touch does not change the output.
+- write_if_changed compares the new text with the file on disk (size first, then
+  SHA-256) and only writes, atomically, when they differ; an unchanged file keeps
+  its mtime, so make, rsync and KiCad re-imports see nothing new. The temporary
+  file is unique per process and thread, so concurrent writers do not collide.
+"""
+
+import datetime
+import hashlib
+import os
+import threading
+import uuid
+
+READ_BLOCK = 1 << 20
+# Header date without SOURCE_DATE_EPOCH (the ZIP epoch, as reproducible wheels use)
+FIXED_DATE = datetime.datetime(1980, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def _digest(parts: tuple[str, ...]) -> bytes:
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).digest()
+
+
+def stable_hex(*parts: str, digits: int = 8) -> str:
+    """Lower-case hex id of the given identity parts, digits long."""
+    return _digest(parts).hex()[:digits]
+
+
+def stable_uuid(*parts: str) -> str:
+    """RFC 4122 style UUID (version 5 layout, SHA-256 based) of the given identity parts."""
+    return str(uuid.UUID(bytes=_digest(parts)[:16], version=5))
+
+
+def build_date() -> datetime.datetime:
+    """SOURCE_DATE_EPOCH when set, else FIXED_DATE."""
+    epoch = os.environ.get("SOURCE_DATE_EPOCH")
+    if epoch:
+        return datetime.datetime.fromtimestamp(int(epoch), tz=datetime.timezone.utc)
+    return FIXED_DATE
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(READ_BLOCK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def write_if_changed(path: str | os.PathLike, text: str, encoding: str = "utf-8") -> bool:
+    """Write text to path unless the file already holds exactly it. Returns True if written."""
+    path = os.fspath(path)
+    data = text.encode(encoding)
+    try:
+        same = (os.path.getsize(path) == len(data)
+                and file_sha256(path) == hashlib.sha256(data).hexdigest())
+    except OSError:
+        same = False
+    if same:
+        return False
+    # Per process and thread, like symbol_lib's sidecar; open() keeps the usual file mode
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except OSError:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    return True
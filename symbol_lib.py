@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+symbol_lib.py
+Part -> pin map (number, name, electrical type) read from KiCad symbol libraries,
+kept in a JSON sidecar (symbols.index.json) so libraries are only re-read when they change.
+
+Supported libraries:
+- .kicad_sym (KiCad 6+): pins come from the part's unit sub-symbols; a part that
+  (extends "Base") gets the pins of its base part
+- .lib (legacy KiCad 5): pins are the X lines of each DEF ... ENDDEF; ALIAS names
+  share the pins of their DEF
+
+Each library is keyed by its file stem, so parts are looked up as "Lib:Part" the
+same way KiCad names them, or by the bare part name (first library wins).
+On load, a library whose size and mtime match the sidecar is taken from it as-is;
+only new or changed files are parsed.
+"""
+
+import argparse
+import json
+import os
+from pathlib import Path
+
+from kicad_sexpr import find, find_all, iter_top_level, parse
+
+SYMBOL_DIR = "symbols"
+SYMBOL_CACHE = "symbols.index.json"
+INDEX_VERSION = 1
+
+# Legacy .lib electrical type letter -> .kicad_sym / netlist pin type
+LEGACY_PIN_TYPES = {
+    "I": "input",
+    "O": "output",
+    "B": "bidirectional",
+    "T": "tri_state",
+    "P": "passive",
+    "U": "unspecified",
+    "W": "power_in",
+    "w": "power_out",
+    "C": "open_collector",
+    "E": "open_emitter",
+    "N": "no_connect",
+}
+
+
+def _unique_pins(pins: list[list[str]]) -> list[list[str]]:
+    """Drop repeats of a pin number (alternate body styles, pins shared by several units)."""
+    seen = set()
+    unique = []
+    for pin in pins:
+        if pin[0] not in seen:
+            seen.add(pin[0])
+            unique.append(pin)
+    return unique
+
+
+def _sym_pins(node: list) -> list[list[str]]:
+    pins = []
+    for pin in find_all(node, "pin"):
+        name, number = find(pin, "name"), find(pin, "number")
+        if number is not None and len(number) > 1:
+            ptype = pin[1] if len(pin) > 1 and isinstance(pin[1], str) else "unspecified"
+            pins.append([number[1], name[1] if name is not None and len(name) > 1 else "~", ptype])
+    for unit in find_all(node, "symbol"):
+        pins.extend(_sym_pins(unit))
+    return pins
+
+
+def parse_kicad_sym(path: str) -> dict[str, list[list[str]]]:
+    """Part name -> [[number, name, type], ...] for one .kicad_sym library."""
+    parts: dict[str, list[list[str]]] = {}
+    bases: dict[str, str] = {}
+    for head, raw in iter_top_level(path):
+        if head != "symbol":
+            continue
+        node = parse(raw)
+        name = node[1]
+        base = find(node, "extends")
+        if base is not None and len(base) > 1:
+            bases[name] = base[1]
+        parts[name] = _unique_pins(_sym_pins(node))
+
+    for name, base in bases.items():
+        seen = {name}
+        while base in bases and base not in seen:   # derived from a derived part
+            seen.add(base)
+            base = bases[base]
+        if not parts[name] and base in parts:
+            parts[name] = parts[base]
+    return parts
+
+
+def parse_legacy_lib(path: str) -> dict[str, list[list[str]]]:
+    """Part name -> [[number, name, type], ...] for one legacy .lib library."""
+    parts: dict[str, list[list[str]]] = {}
+    names: list[str] = []
+    pins: list[list[str]] = []
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            toks = line.split()
+            if not toks:
+                continue
+            if toks[0] == "DEF" and len(toks) > 1:
+                names, pins = [toks[1].lstrip("~")], []
+            elif toks[0] == "ALIAS":
+                names.extend(toks[1:])
+            elif toks[0] == "X" and len(toks) > 11:
+                # X name number x y length orientation num_size name_size unit convert type [shape]
+                pins.append([toks[2], toks[1], LEGACY_PIN_TYPES.get(toks[11], "unspecified")])
+            elif toks[0] == "ENDDEF":
+                unique = _unique_pins(pins)
+                for name in names:
+                    parts[name] = unique
+                names, pins = [], []
+    return parts
+
+
+def parse_library(path: str) -> dict[str, list[list[str]]]:
+    if path.endswith(".kicad_sym"):
+        return parse_kicad_sym(path)
+    if path.endswith(".lib"):
+        return parse_legacy_lib(path)
+    raise ValueError(f"{path}: not a KiCad symbol library (.kicad_sym / .lib)")
+
+
+def library_paths(symbol_dir: str = SYMBOL_DIR) -> list[str]:
+    """Symbol libraries in symbol_dir; a .kicad_sym wins over a .lib of the same name."""
+    root = Path(symbol_dir)
+    if not root.is_dir():
+        return []
+    by_stem = {}
+    for path in sorted(root.glob("*.lib")) + sorted(root.glob("*.kicad_sym")):
+        by_stem[path.stem] = str(path)
+    return [by_stem[stem] for stem in sorted(by_stem)]
+
+
+def _file_state(path: str) -> dict:
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def build_index(paths: list[str], previous: dict | None = None) -> tuple[dict, int]:
+    """
+    Build the index, re-parsing only libraries whose file changed since previous.
+    Returns (index, number of libraries parsed).
+    """
+    old_libs = (previous or {}).get("libraries", {})
+    libraries = {}
+    parsed = 0
+    for path in paths:
+        lib = Path(path).stem
+        state = dict(_file_state(path), path=path)
+        old = old_libs.get(lib)
+        if old is not None and old["state"] == state:
+            libraries[lib] = old
+        else:
+            libraries[lib] = {"state": state, "parts": parse_library(path)}
+            parsed += 1
+    return {"version": INDEX_VERSION, "libraries": libraries}, parsed
+
+
+def _by_name(index: dict) -> dict[str, str]:
+    by_name: dict[str, str] = {}
+    for lib, section in index["libraries"].items():
+        for name in section["parts"]:
+            by_name.setdefault(name, lib)
+    return by_name
+
+
+def load_symbol_index(paths: list[str] | None = None, cache_path: str = SYMBOL_CACHE,
+                      rebuild: bool = False) -> dict:
+    """
+    Return the pin index for paths (default: the libraries in SYMBOL_DIR), refreshing
+    the sidecar when needed. The returned dict carries "refreshed": number of libraries
+    re-parsed (0 = up to date), and "by_name": part name -> library for bare lookups.
+    """
+    if paths is None:
+        paths = library_paths()
+    previous = None
+    if os.path.isfile(cache_path) and not rebuild:
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                previous = json.load(f)
+        except (OSError, ValueError):
+            previous = None
+        if previous is not None and previous.get("version") != INDEX_VERSION:
+            previous = None
+
+    index, parsed = build_index(paths, previous)
+    changed = parsed or previous is None or previous["libraries"].keys() != index["libraries"].keys()
+    if changed and (paths or previous is not None):
+        tmp = f"{cache_path}.{os.getpid()}.tmp"   # pipeline stages may refresh it at the same time
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(index, f, separators=(",", ":"), ensure_ascii=False)
+        os.replace(tmp, cache_path)
+    index["refreshed"] = parsed
+    index["by_name"] = _by_name(index)
+    return index
+
+
+def lookup_pins(index: dict | None, part: str) -> list[list[str]] | None:
+    """Pins of "Lib:Part" or of a bare part name (None if unknown or no index)."""
+    if not index or not part:
+        return None
+    lib, _, name = part.rpartition(":")
+    if not lib:
+        lib = index["by_name"].get(name, "")
+    section = index["libraries"].get(lib)
+    return section["parts"].get(name) if section else None
+
+
+def pin_numbers(pins: list[list[str]]) -> dict[str, str]:
+    """Pin number or name -> pin number; numbers take precedence, then the first pin of a name."""
+    nums = {num: num for num, _name, _type in pins}
+    for num, name, _type in pins:
+        if name != "~":
+            nums.setdefault(name, num)
+    return nums
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Build / refresh the part -> pin index from KiCad symbol libraries.")
+    ap.add_argument("-d", "--dir", default=SYMBOL_DIR, help="Directory of .kicad_sym / .lib files")
+    ap.add_argument("--cache", default=SYMBOL_CACHE, help="Index sidecar path")
+    ap.add_argument("--rebuild", action="store_true", help="Ignore the sidecar and parse every library")
+    ap.add_argument("parts", nargs="*", help="Optional Lib:Part (or Part) names to look up")
+    args = ap.parse_args()
+
+    index = load_symbol_index(library_paths(args.dir), args.cache, rebuild=args.rebuild)
+    total = sum(len(s["parts"]) for s in index["libraries"].values())
+    state = f"re-parsed {index['refreshed']} libraries" if index["refreshed"] else "up to date"
+    print(f"{len(index['libraries'])} libraries, {total} parts ({state})")
+    for part in args.parts:
+        pins = lookup_pins(index, part)
+        if pins is None:
+            print(f"{part}: not found")
+            continue
+        print(f"{part}: {len(pins)} pins")
+        for num, name, ptype in pins:
+            print(f"  {num:>6}  {name:<16} {ptype}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""Regression tests for spice_include: plain .lib includes and parameter precision."""
+
+from spice_include import ParseCache, resolve_records
+
+
+def _resolve(path):
+    return resolve_records(str(path), cache=ParseCache(None))
+
+
+def test_two_token_lib_includes_the_file(tmp_path):
+    (tmp_path / "models.lib").write_text("R9 x 0 9k\n")
+    top = tmp_path / "top.cir"
+    top.write_text("* top\n.lib models.lib\nR2 a 0 2k\nC1 b 0 1n\n")
+    assert _resolve(top) == ["R9 x 0 9k", "R2 a 0 2k", "C1 b 0 1n"]
+
+
+def test_lib_section_still_selects_a_block(tmp_path):
+    (tmp_path / "parts.lib").write_text(".lib fast\nR1 a 0 1k\n.endl\n.lib slow\nR1 a 0 10k\n.endl\n")
+    top = tmp_path / "top.cir"
+    top.write_text(".lib parts.lib slow\nC1 a 0 1n\n")
+    assert _resolve(top) == ["R1 a 0 10k", "C1 a 0 1n"]
+
+
+def test_param_keeps_full_precision(tmp_path):
+    top = tmp_path / "top.cir"
+    top.write_text(".param rbig=1.23456789meg rsmall=2k\nR1 a 0 {rbig}\nR2 a 0 {rsmall}\n")
+    assert _resolve(top) == ["R1 a 0 1234567.89", "R2 a 0 2000"]
+
+
+def test_subckt_param_stays_local(tmp_path):
+    top = tmp_path / "top.cir"
+    top.write_text(".param R=1k\n.subckt DIV a b\n.param R=5k\nR1 a b {R}\n.ends\nR9 n1 0 {R}\n.end\n")
+    assert _resolve(top) == [".subckt DIV a b", "R1 a b 5000", ".ends", "R9 n1 0 1000"]
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+wirelength.py
+Half-perimeter wirelength (HPWL) of a placement, per net and in total, with
+incremental scoring of component moves for placement tweaks and optimization loops.
+
+Pins are stored net-major (net i owns pins ptr[i]:ptr[i + 1]), so a net's HPWL is
+max - min of two list slices: min/max/count run over each slice in C, the same
+segment reduction np.minimum.reduceat would do.
+
+Moving components shifts their pins. delta() scores a move without applying it;
+apply() commits it. Only the nets of the moved pins are touched, and each keeps its
+bounding box with the number of pins on every edge:
+- a moved pin that was not alone on an edge updates the box in O(1)
+- only when the last pin leaves an edge is that net's box recomputed from its pins
+so moving a resistor on GND does not rescan every GND pin.
+
+    wl = Wirelength.from_board("output.kicad_pcb")
+    wl.total                                   # mm
+    wl.delta({"R1": (42.0, 18.5)})             # change if R1 moved there
+    wl.apply({"R1": (42.0, 18.5), "R2": (10.0, 18.5)})
+
+Sources:
+- from_board: pad positions of a placed .kicad_pcb (the fixed row old2 writes, or
+  anything edited in KiCad)
+- from_design: silixon_pcb.json pcb_position + the parse_nets connectivity; the JSON
+  has no pad geometry, so pins sit at their component's origin
+Moves translate components; rotation is not modelled.
+"""
+
+import argparse
+import json
+import random
+import time
+
+from connectivity_matrix import incidence
+from kicad_board import load_board
+from silixon_json_stream import iter_components
+from silixon_to_kicad import read_netlist_records
+
+UNITS_PER_MM = 10   # silixon_pcb.json positions are in 0.1 mm
+
+
+class Wirelength:
+    """HPWL of components at (x, y) whose pins sit at fixed offsets, grouped by net."""
+
+    def __init__(self, refs: list[str], positions: list[tuple[float, float]], net_names: list[str],
+                 net_pins: list[list[tuple[int, float, float]]]):
+        """net_pins[i]: (component index, dx, dy) of every pin on net_names[i]."""
+        self.refs = refs
+        self.index = {ref: i for i, ref in enumerate(refs)}
+        self.cx = [x for x, _y in positions]
+        self.cy = [y for _x, y in positions]
+        self.net_names = net_names
+
+        self.ptr = [0]
+        self.px: list[float] = []
+        self.py: list[float] = []
+        self.pin_net: list[int] = []
+        self.comp_pins: list[list[int]] = [[] for _ in refs]
+        for n, pins in enumerate(net_pins):
+            for c, dx, dy in pins:
+                self.comp_pins[c].append(len(self.px))
+                self.px.append(self.cx[c] + dx)
+                self.py.append(self.cy[c] + dy)
+                self.pin_net.append(n)
+            self.ptr.append(len(self.px))
+        self.recompute()
+
+    # ------------------------- building ------------------------- #
+
+    @classmethod
+    def from_board(cls, pcb_path: str) -> "Wirelength":
+        board = load_board(pcb_path)
+        codes = sorted(code for code in board["nets"] if code)
+        column = {code: i for i, code in enumerate(codes)}
+        net_pins: list[list[tuple[int, float, float]]] = [[] for _ in codes]
+        refs, positions = [], []
+        for c, fp in enumerate(board["footprints"]):
+            refs.append(fp["ref"])
+            positions.append((fp["x"], fp["y"]))
+            for pad in fp["pads"]:
+                n = column.get(pad["net"])
+                if n is not None:
+                    net_pins[n].append((c, pad["x"] - fp["x"], pad["y"] - fp["y"]))
+        return cls(refs, positions, [board["nets"][code] for code in codes], net_pins)
+
+    @classmethod
+    def from_design(cls, json_path: str, netlist_path: str = "silixon_netlist.txt",
+                    symbols: dict | None = None) -> "Wirelength":
+        components = list(iter_components(json_path))
+        matrix = incidence(components, read_netlist_records(netlist_path), symbols)
+        positions = []
+        for comp in components:
+            pos = comp.get("pcb_position") or {}
+            positions.append((float(pos.get("x", 0)) / UNITS_PER_MM, float(pos.get("y", 0)) / UNITS_PER_MM))
+        net_pins: list[list[tuple[int, float, float]]] = [[] for _ in matrix["nets"]]
+        indptr, indices = matrix["indptr"], matrix["indices"]
+        for c in range(len(components)):
+            for k in range(indptr[c], indptr[c + 1]):
+                net_pins[indices[k]].append((c, 0.0, 0.0))
+        return cls(matrix["components"], positions, matrix["nets"], net_pins)
+
+    # ------------------------- scoring ------------------------- #
+
+    def _box(self, xs: list[float], ys: list[float]) -> tuple:
+        """(xmin, n, xmax, n, ymin, n, ymax, n): the bounding box and the pin count on each edge."""
+        if not xs:
+            return (0.0, 0, 0.0, 0, 0.0, 0, 0.0, 0)
+        xmin, xmax, ymin, ymax = min(xs), max(xs), min(ys), max(ys)
+        return (xmin, xs.count(xmin), xmax, xs.count(xmax), ymin, ys.count(ymin), ymax, ys.count(ymax))
+
+    def recompute(self) -> float:
+        """Rebuild every net's box and the total from the pin positions (clears float drift)."""
+        ptr, px, py = self.ptr, self.px, self.py
+        self.boxes = [self._box(px[a:b], py[a:b]) for a, b in zip(ptr, ptr[1:])]
+        self.net_hpwl = [b[2] - b[0] + b[6] - b[4] for b in self.boxes]
+        self.total = sum(self.net_hpwl)
+        return self.total
+
+    def _moved_box(self, n: int, moved: list[tuple[int, float, float]]) -> tuple:
+        """Box of net n after its pins in moved go to their new (x, y)."""
+        xmin, nxmin, xmax, nxmax, ymin, nymin, ymax, nymax = self.boxes[n]
+        px, py = self.px, self.py
+        for p, _x, _y in moved:
+            x, y = px[p], py[p]
+            nxmin -= x == xmin
+            nxmax -= x == xmax
+            nymin -= y == ymin
+            nymax -= y == ymax
+        if not (nxmin and nxmax and nymin and nymax):
+            # The last pin left an edge: the box can shrink, rescan the net
+            a, b = self.ptr[n], self.ptr[n + 1]
+            xs, ys = px[a:b], py[a:b]
+            for p, x, y in moved:
+                xs[p - a] = x
+                ys[p - a] = y
+            return self._box(xs, ys)
+        for _p, x, y in moved:
+            if x < xmin:
+                xmin, nxmin = x, 1
+            elif x == xmin:
+                nxmin += 1
+            if x > xmax:
+                xmax, nxmax = x, 1
+            elif x == xmax:
+                nxmax += 1
+            if y < ymin:
+                ymin, nymin = y, 1
+            elif y == ymin:
+                nymin += 1
+            if y > ymax:
+                ymax, nymax = y, 1
+            elif y == ymax:
+                nymax += 1
+        return (xmin, nxmin, xmax, nxmax, ymin, nymin, ymax, nymax)
+
+    def _evaluate(self, moves: dict) -> tuple[float, dict[int, tuple], dict[int, list]]:
+        """(HPWL change, new box per touched net, moved pins per net) of moves {ref or index: (x, y)}."""
+        px, py, pin_net = self.px, self.py, self.pin_net
+        per_net: dict[int, list[tuple[int, float, float]]] = {}
+        for c, (x, y) in moves.items():
+            if not isinstance(c, int):
+                c = self.index[c]
+            dx, dy = x - self.cx[c], y - self.cy[c]
+            if not dx and not dy:
+                continue
+            for p in self.comp_pins[c]:
+                moved = per_net.get(pin_net[p])
+                if moved is None:
+                    moved = per_net[pin_net[p]] = []
+                moved.append((p, px[p] + dx, py[p] + dy))
+        delta = 0.0
+        boxes = {}
+        for n, moved in per_net.items():
+            box = boxes[n] = self._moved_box(n, moved)
+            delta += box[2] - box[0] + box[6] - box[4] - self.net_hpwl[n]
+        return delta, boxes, per_net
+
+    def delta(self, moves: dict) -> float:
+        """Change of total HPWL if moves {ref or component index: (x, y)} were applied."""
+        return self._evaluate(moves)[0]
+
+    def apply(self, moves: dict) -> float:
+        """Move the components; returns the change of total HPWL."""
+        delta, boxes, per_net = self._evaluate(moves)
+        for n, box in boxes.items():
+            self.boxes[n] = box
+            self.net_hpwl[n] = box[2] - box[0] + box[6] - box[4]
+            for p, x, y in per_net[n]:
+                self.px[p] = x
+                self.py[p] = y
+        for c, (x, y) in moves.items():
+            if not isinstance(c, int):
+                c = self.index[c]
+            self.cx[c], self.cy[c] = x, y
+        self.total += delta
+        return delta
+
+    def position(self, ref: str) -> tuple[float, float]:
+        c = self.index[ref]
+        return self.cx[c], self.cy[c]
+
+    def net_lengths(self) -> dict[str, float]:
+        return dict(zip(self.net_names, self.net_hpwl))
+
+
+def bench(wl: Wirelength, count: int, step: float = 5.0, seed: int = 0) -> float:
+    """Score count random single-component moves (none applied); returns moves per second."""
+    rng = random.Random(seed)
+    n = len(wl.refs)
+    moves = []
+    for _ in range(count):
+        c = rng.randrange(n)
+        moves.append({c: (wl.cx[c] + rng.uniform(-step, step), wl.cy[c] + rng.uniform(-step, step))})
+    t0 = time.perf_counter()
+    for move in moves:
+        wl.delta(move)
+    return count / (time.perf_counter() - t0)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Half-perimeter wirelength of a placement.")
+    ap.add_argument("board", nargs="?", help="Placed .kicad_pcb (default: silixon_pcb.json positions)")
+    ap.add_argument("--pcb", default="silixon_pcb.json", help="siliXon design JSON")
+    ap.add_argument("--netlist", default="silixon_netlist.txt", help="siliXon SPICE-like netlist")
+    ap.add_argument("--top", type=int, default=10, help="Longest nets to list")
+    ap.add_argument("--json", action="store_true", help="Print {net: hpwl, ...} as JSON")
+    ap.add_argument("--bench", type=int, default=0, help="Time this many random move evaluations")
+    args = ap.parse_args()
+
+    wl = Wirelength.from_board(args.board) if args.board else Wirelength.from_design(args.pcb, args.netlist)
+    lengths = wl.net_lengths()
+    if args.json:
+        print(json.dumps({"total": round(wl.total, 4), "nets": {k: round(v, 4) for k, v in lengths.items()}},
+                         indent=2))
+    else:
+        for name, length in sorted(lengths.items(), key=lambda kv: -kv[1])[:args.top]:
+            print(f"{length:10.2f} mm  {name}")
+        print(f"{wl.total:10.2f} mm  total HPWL, {len(lengths)} nets, {len(wl.px)} pins")
+    if args.bench:
+        rate = bench(wl, args.bench)
+        print(f"{rate * 60:,.0f} move evaluations per minute")
+
+
+if __name__ == "__main__":
+    main()